@@ -0,0 +1,101 @@
+"""
+Startup-time benchmark comparing loading the clean data from the CSVs against loading it from the compiled column
+stores. Both give the frames the app serves, whose text columns are categoricals: the stores load them that way,
+the CSVs are compacted after parsing (analysis.compact_text_columns).
+Run from the repository root with: python -m benchmarks.bench_datastore
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from src import analysis
+from src import datastore
+
+# Snippets run in a fresh interpreter, so that the cold-start cost (imports + load) is measured as a worker sees it
+CSV_SNIPPET = ("import pandas as pd; from src import analysis; from src import datastore; "
+               "analysis.compact_text_columns(pd.read_csv(datastore.PATH_CURRENCY)); "
+               "analysis.compact_text_columns(pd.read_csv(datastore.PATH_CRISIS))")
+STORE_SNIPPET = ("from src import datastore; "
+                 "datastore.load_frame(datastore.PATH_CURRENCY, {d!r}); datastore.load_frame(datastore.PATH_CRISIS, {d!r})")
+BASELINE_SNIPPET = "import pandas as pd; import numpy as np; from src import datastore"
+
+def time_in_process(fn, repeat: int) -> list:
+    """
+    Time a function call repeat times in the current process.
+
+    Arguments:
+        fn (callable): the function to time.
+        repeat (int): the number of times to call it.
+
+    Output:
+        (list): the elapsed time of each call, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def time_subprocess(snippet: str, repeat: int) -> list:
+    """
+    Time a code snippet in a fresh Python interpreter repeat times.
+
+    Arguments:
+        snippet (str): the code to run with python -c.
+        repeat (int): the number of interpreters to start.
+
+    Output:
+        (list): the elapsed wall time of each interpreter, in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', snippet], check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+def report(label: str, times: list) -> None:
+    """
+    Print the median and minimum of a list of timings.
+
+    """
+    print(f'{label:<40} median {statistics.median(times):8.2f} ms   min {min(times):8.2f} ms')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare CSV and compiled column store load times.')
+    parser.add_argument('--repeat', type=int, default=20, help='in-process repetitions, defaults to 20')
+    parser.add_argument('--cold-repeat', type=int, default=5, help='fresh interpreter repetitions, defaults to 5')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as compiled_dir:
+        for csv_path in (datastore.PATH_CURRENCY, datastore.PATH_CRISIS):
+            datastore.compile_csv(csv_path, compiled_dir)
+
+        # Sanity check that both paths produce the same frames before timing them
+        for csv_path in (datastore.PATH_CURRENCY, datastore.PATH_CRISIS):
+            pd.testing.assert_frame_equal(analysis.compact_text_columns(pd.read_csv(csv_path)),
+                                          datastore.load_frame(csv_path, compiled_dir))
+
+        print('In-process load of both data files:')
+        report('  CSV (pd.read_csv + compact)', time_in_process(
+            lambda: [analysis.compact_text_columns(pd.read_csv(p))
+                     for p in (datastore.PATH_CURRENCY, datastore.PATH_CRISIS)], args.repeat))
+        report('  compiled store (memory-mapped)', time_in_process(
+            lambda: [datastore.load_frame(p, compiled_dir) for p in (datastore.PATH_CURRENCY, datastore.PATH_CRISIS)],
+            args.repeat))
+
+        print('Fresh interpreter (imports + load):')
+        report('  imports only', time_subprocess(BASELINE_SNIPPET, args.cold_repeat))
+        report('  CSV (pd.read_csv + compact)', time_subprocess(CSV_SNIPPET, args.cold_repeat))
+        report('  compiled store (memory-mapped)', time_subprocess(STORE_SNIPPET.format(d=compiled_dir), args.cold_repeat))
+
+    return None
+
+if __name__ == '__main__':
+    main()
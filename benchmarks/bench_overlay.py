@@ -0,0 +1,75 @@
+"""
+Benchmark of the multi-country overlay chart (plots.plotly_overlay): the figure JSON size, the points sent and the
+build time when overlaying 1, 10 and all countries, with the LTTB downsampling to the point budget and without it
+(every point of every series), on a log scale. Results can be saved as JSON for benchmarks.compare.
+Run from the repository root with: python -m benchmarks.bench_overlay --output overlay.json
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import results
+from src import analysis
+from src import datastore
+from src import plots
+
+def measure(series: dict, point_budget: int, repeat: int) -> dict:
+    """
+    Build the overlay figure of some series several times, and measure it.
+
+    Arguments:
+        series (dict): the dictionary of country to its (x, y) arrays.
+        point_budget (int): the point budget passed to plots.plotly_overlay.
+        repeat (int): the number of timed builds.
+
+    Output:
+        (dict): the median build milliseconds, the figure JSON bytes and the number of points sent.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = plots.plotly_overlay(series, log_scale=True, point_budget=point_budget)
+        times.append((time.perf_counter() - start) * 1000)
+
+    # The JSON is what the callback sends the browser, serialized the same way Dash does
+    return {'build_ms': statistics.median(times),
+            'json_bytes': len(fig.to_json()),
+            'points': sum(len(trace.x) for trace in fig.data)}
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Measure the overlay chart at 1, 10 and all countries.')
+    parser.add_argument('--repeat', type=int, default=20, help='timed builds per case, defaults to 20')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to, for benchmarks.compare')
+    args = parser.parse_args()
+
+    exchange_df, exchange_partitions = analysis.partition_by_country(datastore.load_frame(datastore.PATH_CURRENCY))
+    countries = list(exchange_partitions)
+    all_series = {country: analysis.get_country_exchange_data(exchange_df, country, exchange_partitions)
+                  for country in countries}
+
+    # Build the template up front, so its one-off cost isn't counted against the first case
+    plots.get_overlay_template()
+
+    metrics = {}
+    print(f"{'countries':>9}  {'downsampling':<13}{'points':>8}{'JSON bytes':>12}{'build ms':>10}")
+    for count in (1, 10, len(countries)):
+        series = {country: all_series[country] for country in countries[:count]}
+        # A budget of every point of every series keeps them all
+        total_points = sum(len(x) for x, _ in series.values())
+        for downsampled, point_budget in ((False, total_points * count), (True, plots.OVERLAY_POINT_BUDGET)):
+            result = measure(series, point_budget, args.repeat)
+            print(f"{count:>9}  {'LTTB' if downsampled else 'none':<13}{result['points']:>8}"
+                  f"{result['json_bytes']:>12}{result['build_ms']:>10.2f}")
+
+            if downsampled:
+                metrics[f'countries_{count}.json_bytes'] = results.metric(result['json_bytes'], 'bytes')
+                metrics[f'countries_{count}.build_ms'] = results.metric(result['build_ms'], 'ms')
+
+    if args.output:
+        results.save_results(args.output, 'overlay', metrics)
+        print(f'Saved results to {args.output}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Measure the initial page weight of the app in server mode and in clientside mode (exchange data embedded in the
+page, currency filtering and rate lookups run in the browser), and which callbacks still hit the server.
+Run from the repository root with: python -m benchmarks.bench_page_weight
+"""
+import re
+
+from src import basicpage
+from src import clientside
+
+def get_page_weight(app) -> dict:
+    """
+    Fetch everything the browser loads on the first visit to the page through the Flask test client.
+
+    Arguments:
+        app (Dash): the app to measure.
+
+    Output:
+        (dict): the bytes of the index page, the scripts and stylesheets it references, the layout and the
+                callback dependencies.
+    """
+    client = app.server.test_client()
+    index = client.get('/').data
+    urls = re.findall(rb'(?:src|href)="(/[^"]+)"', index)
+
+    weight = {'index': len(index), 'scripts and styles': 0}
+    for url in urls:
+        weight['scripts and styles'] += len(client.get(url.decode()).data)
+    weight['layout'] = len(client.get('/_dash-layout').data)
+    weight['dependencies'] = len(client.get('/_dash-dependencies').data)
+    return weight
+
+def main() -> None:
+    exchange_data = clientside.encode_exchange_data(basicpage.data.filled_rate_index, basicpage.data.currency_options,
+                                                    basicpage.data.redenomination_chains)
+    size = clientside.get_encoded_size(exchange_data)
+    print(f'Encoded exchange data: {size} bytes (budget {clientside.CLIENTSIDE_DATA_BUDGET} bytes)')
+
+    for clientside_mode in (False, True):
+        app = basicpage.create_app(clientside_mode)
+        weight = get_page_weight(app)
+        dependencies = app.server.test_client().get('/_dash-dependencies').json
+        server_callbacks = [d['output'] for d in dependencies if not d.get('clientside_function')]
+
+        print(f"\n{'Clientside' if clientside_mode else 'Server'} mode:")
+        for name, size in weight.items():
+            print(f'  {name:<20}{size:>10} bytes')
+        print(f"  {'total':<20}{sum(weight.values()):>10} bytes")
+        print(f'  server callbacks: {", ".join(server_callbacks)}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
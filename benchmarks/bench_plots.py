@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the figure builders in src/plots.py: the template-based plotly_line / plotly_scatter against the
+plotly.express reference implementations, per-call build time and memory allocated, over every country. Also checks
+that both paths produce the same figure. Run from the repository root with: python -m benchmarks.bench_plots
+"""
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from src import analysis
+from src import datastore
+from src import plots
+
+def measure(build, args_list: list, repeat: int) -> tuple:
+    """
+    Time a figure builder over a list of argument tuples, and measure the memory allocated by one pass over them.
+
+    Arguments:
+        build (callable): the figure builder.
+        args_list (list): the argument tuples to call it with, one per country.
+        repeat (int): the number of timed passes over args_list.
+
+    Output:
+        (tuple): the median milliseconds per call, and the mean KiB allocated (traced peak) per call.
+    """
+    times = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            build(*args)
+            times.append((time.perf_counter() - start) * 1000)
+
+    peaks = []
+    for args in args_list:
+        tracemalloc.start()
+        build(*args)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+
+    return statistics.median(times), statistics.mean(peaks)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare template-based and plotly.express figure builders.')
+    parser.add_argument('--repeat', type=int, default=3, help='timed passes over every country, defaults to 3')
+    args = parser.parse_args()
+
+    exchange_df, exchange_partitions = analysis.partition_by_country(datastore.load_frame(datastore.PATH_CURRENCY))
+    crisis_df, crisis_partitions = analysis.partition_by_country(datastore.load_frame(datastore.PATH_CRISIS))
+
+    line_args = [analysis.get_country_exchange_data(exchange_df, country, exchange_partitions) 
+                 for country in exchange_partitions]
+    scatter_args = [(analysis.get_country_crisis_data(crisis_df, country, crisis_partitions),) 
+                    for country in crisis_partitions]
+
+    # Build the templates up front, so their one-off cost isn't counted against the first call
+    plots.get_line_template()
+    plots.get_scatter_template()
+
+    # Both paths must give the same figure for every country
+    for build, reference, args_list in ((plots.plotly_line, plots.plotly_line_express, line_args),
+                                        (plots.plotly_scatter, plots.plotly_scatter_express, scatter_args)):
+        for call_args in args_list:
+            assert json.loads(build(*call_args).to_json()) == json.loads(reference(*call_args).to_json())
+
+    print(f"{'builder':<26}{'ms per call':>14}{'KiB per call':>16}")
+    for name, build, args_list in (('plotly_line_express', plots.plotly_line_express, line_args),
+                                   ('plotly_line', plots.plotly_line, line_args),
+                                   ('plotly_scatter_express', plots.plotly_scatter_express, scatter_args),
+                                   ('plotly_scatter', plots.plotly_scatter, scatter_args)):
+        ms, kib = measure(build, args_list, args.repeat)
+        print(f'{name:<26}{ms:>14.2f}{kib:>16.1f}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Per-lookup latency of analysis.get_exchange_rate_val with the mask scan against the prebuilt rate index, and of the
+batch analysis.get_exchange_rate_vals. Run from the repository root with: python -m benchmarks.bench_rate_lookup
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src import analysis
+from src import datastore
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Compare exchange rate lookup latencies.')
+    parser.add_argument('--lookups', type=int, default=2000, help='number of scalar lookups, defaults to 2000')
+    parser.add_argument('--batch', type=int, default=100000, help='number of keys in the batch call, defaults to 100000')
+    args = parser.parse_args()
+
+    exchange_df = datastore.load_frame(datastore.PATH_CURRENCY)
+
+    start = time.perf_counter()
+    rate_index = analysis.build_rate_index(exchange_df)
+    print(f'Index build: {(time.perf_counter() - start) * 1000:.2f} ms for {len(rate_index)} keys')
+
+    # Sample existing keys, and shift some years so a share of the lookups miss
+    rng = np.random.default_rng(0)
+    rows = rng.integers(0, len(exchange_df), args.batch)
+    countries = exchange_df['country'].to_numpy()[rows]
+    currencies = exchange_df['currency_name'].to_numpy()[rows]
+    years = exchange_df['year'].to_numpy()[rows] + rng.integers(0, 2, args.batch)
+
+    keys = list(zip(countries[:args.lookups], currencies[:args.lookups], years[:args.lookups].astype(str)))
+
+    start = time.perf_counter()
+    scanned = [analysis.get_exchange_rate_val(exchange_df, *key) for key in keys]
+    scan_us = (time.perf_counter() - start) / len(keys) * 1e6
+
+    start = time.perf_counter()
+    indexed = [analysis.get_exchange_rate_val(exchange_df, *key, rate_index=rate_index) for key in keys]
+    index_us = (time.perf_counter() - start) / len(keys) * 1e6
+
+    assert scanned == indexed, 'indexed lookups disagree with the mask scan'
+
+    start = time.perf_counter()
+    rates = analysis.get_exchange_rate_vals(exchange_df, countries, currencies, years, rate_index)
+    batch_us = (time.perf_counter() - start) / args.batch * 1e6
+
+    print(f'Mask scan:      {scan_us:10.3f} us per lookup')
+    print(f'Rate index:     {index_us:10.3f} us per lookup ({scan_us / index_us:.0f}x faster)')
+    print(f'Batch ({args.batch} keys): {batch_us:10.3f} us per lookup, {np.isnan(rates).sum()} misses')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Check the background callbacks (background.LocalManager) the way the browser drives them, against the app's Flask
+test client, with the ranking slowed down to stand in for a heavy query:
+
+1. Starting the ranking returns at once, and a rate lookup sent while it runs isn't held up by it.
+2. Identical requests sent while the job runs are coalesced into that one job.
+3. Polling the job reports its progress, then returns the same table as running the ranking in the request.
+4. The cancel button stops the job, and no result is sent.
+
+Run from the repository root with: python -m benchmarks.check_background
+"""
+import argparse
+import json
+import re
+import time
+
+from benchmarks.check_payload_sizes import request_body
+from benchmarks.check_payload_sizes import submit
+from src import basicpage
+from src import timeseries
+
+# The period ranked, and the most a request sent while the ranking runs may take
+START_YEAR = '1950'
+END_YEAR = '2000'
+MAX_REQUEST_SECONDS = 0.25
+
+def get_end_id(client) -> str:
+    """
+    Helper function that reads the token the page echoes on every callback request, which Dash (from 4.0) binds the
+    background job handles to, from the page's config. None for Dash versions without it.
+
+    """
+    page = client.get('/').get_data(as_text=True)
+    config = re.search(r'<script id="_dash-config" type="application/json">(.*?)</script>', page, re.S)
+    return json.loads(config.group(1)).get('end_id')
+
+def ranking_body(clicks: int) -> dict:
+    """
+    Helper function that builds the body of the ranking callback request for a click on the rank-button.
+
+    """
+    return request_body(outputs=[('rank-output', 'children')],
+                        inputs=[('rank-button', 'n_clicks', clicks)],
+                        state=[('rank-start-year', 'value', START_YEAR), ('rank-end-year', 'value', END_YEAR)],
+                        changed=['rank-button.n_clicks'])
+
+def post(client, body: dict, query: dict) -> dict:
+    """
+    Send one callback request with the given query parameters, and get its JSON response, or {} for a 204.
+
+    """
+    response = client.post('/_dash-update-component', query_string={k: v for k, v in query.items() if v},
+                           data=json.dumps(body), content_type='application/json')
+    assert response.status_code in (200, 204), response.status_code
+    return json.loads(response.data) if response.status_code == 200 else {}
+
+def wait_for_result(client, body: dict, handles: dict, end_id: str, timeout: float) -> tuple:
+    """
+    Poll a background job the way the browser does, until it sends its result or stops.
+
+    Output:
+        (tuple): the response with the result (or without one, if the job was cancelled) and the progress seen.
+    """
+    progress = []
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        response = post(client, body, {'cacheKey': handles['cacheKey'], 'job': handles['job'], 'endId': end_id})
+        if 'progress' in response:
+            progress.append(response['progress'])
+
+        # A job that stopped without a result gets a 204 (no update)
+        if 'response' in response or not response:
+            return response, progress
+        time.sleep(0.02)
+    raise AssertionError(f'no result after {timeout} seconds')
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check the background callbacks against the Flask test client.')
+    parser.add_argument('--delay', type=float, default=1.0, help='seconds the ranking is slowed down by, defaults to 1')
+    parser.add_argument('--requests', type=int, default=5, help='identical requests to coalesce, defaults to 5')
+    args = parser.parse_args()
+
+    # The ranking in the request, to compare the background result with
+    expected = json.loads(json.dumps(basicpage.make_ranking_table(START_YEAR, END_YEAR).to_plotly_json(),
+                                     default=lambda component: component.to_plotly_json()))
+
+    # Slow the ranking down, so the checks can happen while it runs
+    rank_devaluations = timeseries.rank_devaluations
+    def slow_rank_devaluations(*rank_args):
+        time.sleep(args.delay)
+        return rank_devaluations(*rank_args)
+    timeseries.rank_devaluations = slow_rank_devaluations
+
+    app = basicpage.create_app(background_mode=True)
+    manager = app.callback_map['rank-output.children']['background']['manager']
+    client = app.server.test_client()
+    end_id = get_end_id(client)
+
+    # 1. The ranking is handed to the background, and a rate lookup meanwhile is answered straight away
+    start = time.perf_counter()
+    handles = post(client, ranking_body(1), {'endId': end_id})
+    start_seconds = time.perf_counter() - start
+    assert 'cacheKey' in handles and 'job' in handles, handles
+
+    start = time.perf_counter()
+    submit(client, 'Argentina', 'Gold Pesos', '1917', 'Argentina')
+    lookup_seconds = time.perf_counter() - start
+    assert start_seconds < MAX_REQUEST_SECONDS, f'{start_seconds:.3f} s to start the ranking'
+    assert lookup_seconds < MAX_REQUEST_SECONDS, f'{lookup_seconds:.3f} s for a rate lookup during the ranking'
+    print(f'Started a {args.delay:.1f} s ranking in {start_seconds * 1000:.1f} ms, '
+          f'a rate lookup meanwhile took {lookup_seconds * 1000:.1f} ms')
+
+    # 2. Identical requests while it runs (other users, other click counts) join the same job
+    before = manager.stats()
+    others = [post(client, ranking_body(clicks), {'endId': end_id}) for clicks in range(2, args.requests + 1)]
+    after = manager.stats()
+    assert after['started'] == before['started'], 'an identical request started another job'
+    assert after['coalesced'] - before['coalesced'] == len(others)
+    print(f'{len(others)} identical requests joined the running job, {after["started"]} job started in total')
+
+    # 3. Every request gets the same result as the ranking in the request, with the progress reported on the way
+    for request_handles in [handles] + others:
+        response, progress = wait_for_result(client, ranking_body(1), request_handles, end_id, args.delay * 5)
+        assert response['response']['rank-output']['children'] == expected, 'the background ranking differs'
+    assert progress, 'no progress was reported'
+    assert manager.stats()['running'] == 0
+    print(f'All {args.requests} requests got the ranking, progress seen: {progress[-1]}')
+
+    # 4. The cancel button stops a running job, which then sends nothing
+    handles = post(client, ranking_body(args.requests + 1), {'endId': end_id})
+    cancel = request_body(outputs=[('rank-cancel-button', 'id')], inputs=[('rank-cancel-button', 'n_clicks', 1)],
+                          state=[], changed=['rank-cancel-button.n_clicks'])
+    post(client, cancel, {'cancelJob': handles['job'], 'endId': end_id})
+    response, _ = wait_for_result(client, ranking_body(1), handles, end_id, args.delay * 5)
+    assert not response, response
+    assert manager.stats()['cancelled'] == 1
+    print('Cancelled a running ranking, no result was sent')
+
+    print('Background callbacks OK')
+
+    return None
+
+if __name__ == '__main__':
+    main()
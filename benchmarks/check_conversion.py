@@ -0,0 +1,59 @@
+"""
+Regression check of the conversions between currencies (conversion.build_rate_matrix), on the real exchange data,
+around Korea's Won in 2010, whose rows include a rate of 0, the data's marker for no rate:
+
+1. 100 Yen never converts to 0 Won in 2010, and Won never converts to an infinite amount of Yen.
+2. Every cell of the cross rate table of 2010 is a finite, positive rate.
+3. The Won's rate of 2010 is the observed one (analysis.build_rate_index), both in the rate index and in the
+   gap-filled index, rather than the marker or an estimate from the nearby years.
+
+Run from the repository root with: python -m benchmarks.check_conversion
+"""
+import warnings
+
+import numpy as np
+
+from src import analysis
+from src import conversion
+from src import datastore
+
+# The pair of currencies and the year where the data has a rate of 0
+YEN = ('Japan', 'Yen')
+WON = ('Korea', 'Won')
+YEAR = 2010
+OBSERVED_RATE = 1155.74
+
+def main() -> None:
+    exchange_df = datastore.load_frame(datastore.PATH_CURRENCY)
+    rate_index = analysis.build_rate_index(exchange_df)
+    matrix = conversion.build_rate_matrix(rate_index)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('error', RuntimeWarning)
+
+        # 1. No conversion to 0 or infinity
+        yen_to_won = conversion.convert(matrix, 100.0, YEN, WON, YEAR)
+        won_to_yen = conversion.convert(matrix, 100.0, WON, YEN, YEAR)
+        for amount in (yen_to_won, won_to_yen):
+            assert np.isfinite(amount) and amount > 0, amount
+        print(f'  100 Yen = {yen_to_won:,.2f} Won and 100 Won = {won_to_yen:,.2f} Yen in {YEAR}')
+
+        # 2. No 0 or infinite cross rates
+        table = conversion.cross_rate_table(matrix, YEAR).to_numpy()
+        assert np.isfinite(table).all() and (table > 0).all(), 'a cross rate of 0 or infinity'
+        print(f'  the {table.shape[0]} x {table.shape[1]} cross rate table of {YEAR} has only finite, positive rates')
+
+    # 3. The observed rate, not the marker of the duplicate row nor an estimate
+    rate = analysis.get_exchange_rate_val(exchange_df, *WON, YEAR, rate_index)
+    assert rate == OBSERVED_RATE, rate
+    filled_index = analysis.build_filled_rate_index(rate_index)
+    rate, observed = analysis.get_exchange_rate_estimate(filled_index, *WON, YEAR)
+    assert rate == OBSERVED_RATE and observed, (rate, observed)
+    print(f'  the Won is at its observed {rate:,.2f} per USD in {YEAR}, in the rate index and the gap-filled index')
+
+    print('Conversions OK')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+Regression check and timing of the vectorized crisis event derivation (etl.derive_crisis_events) against the
+row-by-row loop of data_handling/crisis_data_cleanup.ipynb, reproduced below as the reference:
+
+1. On generated raw data covering the edge cases (missing countries, years and flags, non-numeric flags, flags
+   other than 0 and 1, repeated currency start years, stray whitespace), both must write the same CSV.
+2. If the raw Global Crises Data by Country file is present (it isn't kept in the repository, pass --raw or put it at
+   data/global_crisis_data.csv), both must write exactly the committed data/clean_crisis_data.csv.
+
+Run from the repository root with: python -m benchmarks.check_crisis_events
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import datastore
+from src import etl
+
+def parse_currency_periods_loop(currency_str) -> list:
+    """
+    The notebook's parser of the national currency field, see etl.parse_currency_periods.
+
+    """
+    if pd.isna(currency_str):
+        return []
+
+    entries = []
+    for part in currency_str.split(','):
+        match = re.match(r'(\d{4})-(\d{4}|present)[-–](.*)', part.strip())
+        if match:
+            end_year = int(match.group(2)) if match.group(2) != 'present' else 9999
+            entries.append((int(match.group(1)), end_year, match.group(3).strip()))
+    return entries
+
+def derive_crisis_events_loop(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    The notebook's iterrows loop, from the read_raw_crisis output to the clean crisis data.
+
+    """
+    currency_timeline = {}
+    for country in df['Country'].dropna().unique():
+        currency_info = df[df['Country'] == country]['national_currency'].dropna()
+        if not currency_info.empty:
+            currency_timeline[country] = parse_currency_periods_loop(currency_info.iloc[0])
+        else:
+            currency_timeline[country] = []
+
+    last_independence = {}
+    last_gold_standard = {}
+    refined_events = []
+    for _, row in df.iterrows():
+        country = row['Country']
+        year = row['Year']
+        if pd.isna(country) or pd.isna(year):
+            continue
+
+        events = []
+        if row['banking_crisis'] == 1:
+            events.append(("Banking Crisis", row.get('banking_notes') if pd.notna(row.get('banking_notes')) else None))
+        if row['systemic_crisis'] == 1:
+            events.append(("Systemic Crisis", None))
+        if row['currency_crisis'] == 1:
+            events.append(("Currency Crisis", None))
+        if row['inflation_crisis'] == 1:
+            inflation = row[etl.INFLATION_COLUMN]
+            events.append(("Inflation Crisis", f"Inflation level: {inflation}" if pd.notna(inflation) else None))
+
+        curr_indep = row['independence']
+        if country in last_independence and curr_indep != last_independence[country]:
+            events.append(("Gain of Independence" if curr_indep == 1 else "Loss of Independence", None))
+        last_independence[country] = curr_indep
+
+        curr_gold = row['gold_standard']
+        if country in last_gold_standard and curr_gold != last_gold_standard[country]:
+            if curr_gold == 1:
+                events.append(("Incorporation of Gold Standard", None))
+            elif curr_gold == 0 and last_gold_standard[country] == 1:
+                events.append(("Removing of Gold Standard", None))
+        last_gold_standard[country] = curr_gold
+
+        for start_year, _, currency_name in currency_timeline.get(country, []):
+            if int(year) == start_year:
+                events.append(("Currency Change", f"New currency: {currency_name}"))
+
+        for event_type, note in events:
+            refined_events.append({'country': country, 'year': year, 'event': event_type, 'event_notes': note,
+                                   'domestic_notes': row.get('domestic_notes'),
+                                   'external_notes': row.get('external_notes')})
+
+    final_df = pd.DataFrame(refined_events)
+    final_df.sort_values(by=['country', 'year'], inplace=True)
+    final_df = final_df.apply(lambda x: x.str.strip() if not pd.api.types.is_numeric_dtype(x) and x.notna().any()
+                              else x)
+    final_df['event'] = final_df['event'].replace({"Incorporation of Gold Standard": "Gold Standard Adoption",
+                                                   "Removing of Gold Standard": "Gold Standard Suspension"})
+    final_df['country'] = final_df['country'].replace(etl.CRISIS_COUNTRY_NAMES)
+    return final_df
+
+def make_raw_crisis(countries: int, years: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a raw crisis file with the columns of the real one, and the edge cases of its values.
+
+    """
+    rng = np.random.default_rng(seed)
+    names = [f' Country {i} ' if i % 7 == 0 else f'Country {i}' for i in range(countries - 1)] + ['United States']
+    country = np.repeat(names, years).astype(object)
+    year = np.tile(np.arange(1800, 1800 + years), countries).astype(float)
+
+    def flags(p_one, extra=(0,)):
+        p = [p_one] + [(1 - p_one) / len(extra)] * len(extra)
+        values = rng.choice(np.array([1, *extra], dtype=object), len(country), p=p)
+        values[rng.random(len(country)) < 0.03] = np.nan
+        values[rng.random(len(country)) < 0.01] = 'n/a'
+        return values
+
+    # Independence and gold standard hold a value for stretches of years before switching to a random one
+    def runs(p_switch, values=(0, 1)):
+        switches = rng.random(len(country)) < p_switch
+        states = pd.Series(np.where(switches, rng.choice(values, len(country)), np.nan)).ffill().fillna(values[0])
+        states = states.to_numpy(dtype=object)
+        states[rng.random(len(country)) < 0.01] = np.nan
+        return states
+
+    notes = np.array([None, 'Bank runs. ', '  Two large banks fail.', 'Deposits frozen'], dtype=object)
+    currencies = ['1800-1850-Old coin, 1851-1900-New coin, junk, 1901-present-Franc',
+                  '1820-1820-First, 1820-1900–Second',
+                  None]
+
+    raw_df = pd.DataFrame({
+        'Country': country,
+        'Year': year,
+        'Banking Crisis ': flags(0.2),
+        'Banking_Crisis_Notes': rng.choice(notes, len(country)),
+        'Systemic Crisis': flags(0.15, extra=(0, 2)),
+        'Domestic_Debt_In_Default': flags(0.1),
+        'Domestic_Debt_ Notes/Sources': rng.choice(notes, len(country)),
+        'SOVEREIGN EXTERNAL DEBT 1: ...': flags(0.1),
+        'SOVEREIGN EXTERNAL DEBT 2: ...': flags(0.1),
+        'Defaults_External_Notes': rng.choice(notes, len(country)),
+        'Currency Crises': flags(0.3),
+        'Inflation Crises': flags(0.3),
+        'Independence': runs(0.02),
+        'Gold Standard': runs(0.05, values=(0, 1, 2)),
+        'national currency': rng.choice(np.array(currencies, dtype=object), len(country)),
+        etl.INFLATION_COLUMN: np.round(rng.normal(20, 30, len(country)), 1),
+    })
+    raw_df.loc[rng.random(len(raw_df)) < 0.01, 'Country'] = np.nan
+    raw_df.loc[rng.random(len(raw_df)) < 0.01, 'Year'] = np.nan
+    raw_df.loc[rng.random(len(raw_df)) < 0.05, etl.INFLATION_COLUMN] = np.nan
+    return raw_df
+
+def timed(function, *args) -> tuple:
+    """
+    Helper function that calls a function once, and gets its result and the seconds it took.
+
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+def check(raw_path: str, expected_csv: str = None) -> None:
+    """
+    Derive the events from a raw file both ways, check they write the same CSV (and the expected one, if given),
+    and print how long each took.
+
+    """
+    raw_df = etl.read_raw_crisis(raw_path)
+    loop_df, loop_seconds = timed(derive_crisis_events_loop, raw_df)
+    vectorized_df, vectorized_seconds = timed(etl.derive_crisis_events, raw_df)
+
+    loop_csv = loop_df.to_csv(index=False)
+    vectorized_csv = vectorized_df.to_csv(index=False)
+    assert vectorized_csv == loop_csv, 'the vectorized events differ from the loop'
+    if expected_csv is not None:
+        with open(expected_csv, newline='') as f:
+            assert vectorized_csv == f.read(), f'the events differ from {expected_csv}'
+
+    print(f'  {len(raw_df)} raw rows -> {len(vectorized_df)} events, identical'
+          f"{' to ' + os.path.basename(expected_csv) if expected_csv else ''}")
+    print(f'  iterrows loop: {loop_seconds * 1000:9.1f} ms')
+    print(f'  vectorized:    {vectorized_seconds * 1000:9.1f} ms ({loop_seconds / vectorized_seconds:.0f}x faster)')
+
+    return None
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check the vectorized crisis events against the notebook loop.')
+    parser.add_argument('--raw', dest='raw_path', default=etl.PATH_RAW_CRISIS,
+                        help='the raw Global Crises Data by Country CSV, defaults to data/global_crisis_data.csv')
+    parser.add_argument('--countries', type=int, default=70, help='countries in the generated data, defaults to 70')
+    parser.add_argument('--years', type=int, default=220, help='years per country in the generated data, defaults to 220')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        generated_path = os.path.join(tmp, 'generated_crisis_data.csv')
+        make_raw_crisis(args.countries, args.years).to_csv(generated_path, index=False)
+        print('Generated raw data:')
+        check(generated_path)
+
+    if os.path.exists(args.raw_path):
+        print(f'{args.raw_path}:')
+        check(args.raw_path, expected_csv=datastore.PATH_CRISIS)
+    else:
+        print(f'Skipped the check against {os.path.basename(datastore.PATH_CRISIS)}: '
+              f'{args.raw_path} not found, pass its path with --raw')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Check the hot reload of the data (hotreload.DataWatcher and basicpage.swap_data) on copies of the clean data files
+and their compiled stores, with requests sent to the app's Flask test client throughout:
+
+1. Changing one country's rows (France's exchange rates, rewritten and recompiled the way the ETL pipeline does)
+   swaps in new data, rebuilding only France's figures: every other country's cached figures are still hits.
+2. The data served before the swap still reads its original values, although its compiled column files were
+   rewritten under it.
+3. Touching a file without changing its rows reloads it but doesn't swap, and a broken file is counted as a failure
+   while the data already served is kept.
+
+No request sent while the data is swapped may fail.
+
+It reports the time of each reload and the number of swaps.
+Run from the repository root with: python -m benchmarks.check_hot_reload
+"""
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.check_payload_sizes import figures
+from benchmarks.check_payload_sizes import submit
+from src import basicpage
+from src import datastore
+from src import hotreload
+
+# The country whose rows are changed, and a few whose cached figures must survive the reload
+CHANGED_COUNTRY = 'France'
+KEPT_COUNTRIES = ['Germany', 'Japan', 'United Kingdom', 'Argentina']
+
+def send_requests(app, stop: threading.Event, latencies: list, errors: list) -> None:
+    """
+    Send rate lookups and figure requests, like a user switching countries, until stopped.
+
+    """
+    client = app.server.test_client()
+    countries = [CHANGED_COUNTRY] + KEPT_COUNTRIES
+    while not stop.is_set():
+        for country in countries:
+            start = time.perf_counter()
+            try:
+                submit(client, country, basicpage.data.currency_options[country][0]['value'], '1990', country)
+                figures(client, country)
+            except Exception as e:
+                errors.append(repr(e))
+            latencies.append(time.perf_counter() - start)
+
+    return None
+
+def write_csv(df: pd.DataFrame, path: str, compiled_dir: str) -> None:
+    """
+    Helper function that writes a clean data file and compiles it, the way the ETL pipeline does.
+
+    """
+    df.to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    datastore.compile_csv(path, compiled_dir)
+
+    return None
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        compiled_dir = os.path.join(tmp, 'compiled')
+        paths = tuple(os.path.join(tmp, os.path.basename(path))
+                      for path in (basicpage.PATH_CURRENCY, basicpage.PATH_CRISIS, basicpage.PATH_INFLATION))
+        for source, path in zip((basicpage.PATH_CURRENCY, basicpage.PATH_CRISIS, basicpage.PATH_INFLATION), paths):
+            if os.path.exists(source):
+                shutil.copy(source, path)
+                datastore.compile_csv(path, compiled_dir)
+
+        # Serve the copies, from their compiled stores, with every figure cached
+        build = functools.partial(hotreload.build_snapshot, *paths, basicpage.GAP_FILL_METHOD, compiled_dir)
+        basicpage.data = build()
+        app = basicpage.create_app()
+        watcher = hotreload.DataWatcher(build=build, publish=functools.partial(basicpage.publish_data, app, False),
+                                        files=basicpage.data.files)
+        basicpage.prewarm_figure_cache()
+        served = basicpage.data
+        served_rates = served.exchange_df['exchange_rate'].to_numpy().copy()
+        old_line = basicpage.get_line_fig(CHANGED_COUNTRY)
+
+        # 1. Double France's rates, the next check swaps in the new data while requests keep coming
+        stop, latencies, errors = threading.Event(), [], []
+        sender = threading.Thread(target=send_requests, args=(app, stop, latencies, errors))
+        sender.start()
+        try:
+            time.sleep(0.2)
+            exchange_df = pd.read_csv(paths[0])
+            exchange_df.loc[exchange_df['country'] == CHANGED_COUNTRY, 'exchange_rate'] *= 2
+            write_csv(exchange_df, paths[0], compiled_dir)
+            swapped = watcher.check()
+            time.sleep(0.2)
+        finally:
+            stop.set()
+            sender.join()
+        stats = watcher.stats()
+        assert swapped and basicpage.data is not served, 'the change of the exchange data was not swapped in'
+        assert stats['swaps'] == 1 and stats['last_changed_countries'] == 1, stats
+        print(f"Changed {CHANGED_COUNTRY}'s rows: reloaded and swapped in {stats['last_reload_seconds'] * 1000:.0f} ms")
+
+        # No request failed, however they fell around the swap
+        assert not errors, errors[:3]
+        print(f'  {len(latencies)} requests during the reload, none failed, slowest {max(latencies) * 1000:.0f} ms')
+
+        # Only France's figures are rebuilt, its old ones were dropped from the cache at the swap
+        cache_stats = basicpage.figure_cache.stats()
+        for country in KEPT_COUNTRIES:
+            assert basicpage.get_line_key(country) == basicpage.get_line_key(country, served)
+            basicpage.get_line_fig(country)
+            basicpage.get_timeline_fig(country)
+        assert basicpage.figure_cache.stats()['misses'] == cache_stats['misses'], 'a kept figure was rebuilt'
+        assert basicpage.get_line_fig(CHANGED_COUNTRY) != old_line, f"{CHANGED_COUNTRY}'s line graph wasn't rebuilt"
+        assert basicpage.figure_cache.discard([basicpage.get_line_key(CHANGED_COUNTRY, served)]) == 0
+        print(f'  the cached figures of {len(KEPT_COUNTRIES)} other countries are still hits, '
+              f"{CHANGED_COUNTRY}'s old figures were dropped")
+
+        # 2. The data served before still reads its own values
+        assert np.array_equal(served.exchange_df['exchange_rate'].to_numpy(), served_rates)
+        print('  the data served before the swap still reads its original values')
+
+        # 3. A touched file reloads without a swap, a broken one fails and keeps the data
+        current = basicpage.data
+        time.sleep(0.01)
+        os.utime(paths[1])
+        assert not watcher.check() and basicpage.data is current
+        with open(paths[0] + '.tmp', 'w') as f:
+            f.write('not,the,exchange,data\n1,2,3,4\n')
+        os.replace(paths[0] + '.tmp', paths[0])
+        with warnings.catch_warnings(record=True):
+            warnings.simplefilter('always')
+            assert not watcher.check() and basicpage.data is current
+        stats = watcher.stats()
+        assert (stats['reloads'], stats['swaps'], stats['failures']) == (2, 1, 1), stats
+        print(f"  a touched file reloaded in {stats['last_reload_seconds'] * 1000:.0f} ms without a swap, "
+              f"a broken file failed and the data was kept")
+
+    print(f"Reloads: {stats['reloads']}, swaps: {stats['swaps']}, failures: {stats['failures']}, "
+          f"total reload time {stats['total_reload_seconds'] * 1000:.0f} ms")
+    print('Hot reload OK')
+
+    return None
+
+if __name__ == '__main__':
+    main()
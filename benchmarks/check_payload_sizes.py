@@ -0,0 +1,107 @@
+"""
+Check the size of the callback responses the page gets back from /_dash-update-component: a submit that keeps the
+same country must only send the rate text (a few hundred bytes), while the figures are only sent when the country
+changes. Run from the repository root with: python -m benchmarks.check_payload_sizes
+"""
+import json
+
+from src import basicpage
+from src import realrates
+
+# A submit for an unchanged country must stay under this many bytes
+RATE_ONLY_BUDGET = 500
+
+def request_body(outputs: list, inputs: list, state: list, changed: list) -> dict:
+    """
+    Build the body of one callback request to /_dash-update-component the way the browser does.
+
+    Arguments:
+        outputs (list): the (component id, property) pairs of the callback outputs.
+        inputs (list): the (component id, property, value) triples of the callback inputs.
+        state (list): the (component id, property, value) triples of the callback state.
+        changed (list): the "id.property" strings of the inputs that triggered the callback.
+
+    Output:
+        (dict): the JSON-serializable request body.
+    """
+    if len(outputs) > 1:
+        output = '..' + '...'.join(f'{i}.{p}' for i, p in outputs) + '..'
+    else:
+        output = f'{outputs[0][0]}.{outputs[0][1]}'
+
+    return {'output': output,
+            'outputs': [{'id': i, 'property': p} for i, p in outputs] if len(outputs) > 1 
+                       else {'id': outputs[0][0], 'property': outputs[0][1]},
+            'inputs': [{'id': i, 'property': p, 'value': v} for i, p, v in inputs],
+            'state': [{'id': i, 'property': p, 'value': v} for i, p, v in state],
+            'changedPropIds': changed}
+
+def dash_request(client, outputs: list, inputs: list, state: list, changed: list) -> bytes:
+    """
+    Send one callback request to the Dash server the way the browser does.
+
+    Arguments:
+        client (FlaskClient): the test client of the app's Flask server.
+        outputs, inputs, state, changed: the callback request, see request_body.
+
+    Output:
+        (bytes): the raw response body, empty if the server answered 204 (nothing to update).
+    """
+    body = request_body(outputs, inputs, state, changed)
+    response = client.post('/_dash-update-component', data=json.dumps(body), content_type='application/json')
+    assert response.status_code in (200, 204), response.status_code
+    return response.data
+
+def submit(client, country: str, currency: str, year: str, figure_country: str, convert_to: str = None) -> bytes:
+    """
+    Send the two_buttons callback request for a click on the submit-val button.
+
+    """
+    return dash_request(client,
+                        outputs=[('exchange-output', 'children'), ('select-country', 'value'),
+                                 ('select-currency', 'value'), ('select-year', 'value'),
+                                 ('select-convert-to', 'value'), ('figure-country', 'data'),
+                                 ('select-amount', 'value')],
+                        inputs=[('submit-val', 'n_clicks', 1), ('reset-button', 'n_clicks', 0)],
+                        state=[('select-country', 'value', country), ('select-currency', 'value', currency),
+                               ('select-year', 'value', year), ('select-convert-to', 'value', convert_to),
+                               ('figure-country', 'data', figure_country), ('select-amount', 'value', None)],
+                        changed=['submit-val.n_clicks'])
+
+def figures(client, country: str) -> tuple:
+    """
+    Send the figure callback requests that follow a change of the figure-country store.
+
+    """
+    line = dash_request(client, outputs=[('line-figure', 'figure'), ('line-graph-title', 'children')],
+                        inputs=[('figure-country', 'data', country), ('select-rate-mode', 'value', 'nominal'),
+                                ('select-base-year', 'value', realrates.DEFAULT_BASE_YEAR)],
+                        state=[], changed=['figure-country.data'])
+    timeline = dash_request(client, outputs=[('timeline-figure', 'figure'), ('timeline-title', 'children')],
+                            inputs=[('figure-country', 'data', country)], state=[], changed=['figure-country.data'])
+    return line, timeline
+
+def main() -> None:
+    client = basicpage.create_app().server.test_client()
+
+    # Same country as the figures already show: only the rate text comes back, the store isn't updated
+    same_country = submit(client, 'Argentina', 'Gold Pesos', '1917', 'Argentina')
+    assert 'figure-country' not in json.loads(same_country)['response'], 'figure-country updated for same country'
+    assert len(same_country) <= RATE_ONLY_BUDGET, f'{len(same_country)} bytes for a rate-only submit'
+    print(f'Submit, same country:      {len(same_country):8d} bytes')
+
+    # New country: the store changes, which then makes the figure callbacks fire
+    new_country = submit(client, 'Argentina', 'Gold Pesos', '1917', basicpage.DEFAULT_COUNTRY)
+    assert json.loads(new_country)['response']['figure-country']['data'] == 'Argentina'
+    assert len(new_country) <= RATE_ONLY_BUDGET, f'{len(new_country)} bytes for a country-changing submit'
+    line, timeline = figures(client, 'Argentina')
+    print(f'Submit, new country:       {len(new_country):8d} bytes')
+    print(f'  + line figure callback:  {len(line):8d} bytes')
+    print(f'  + timeline callback:     {len(timeline):8d} bytes')
+
+    print('Payload sizes OK')
+
+    return None
+
+if __name__ == '__main__':
+    main()
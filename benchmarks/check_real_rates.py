@@ -0,0 +1,115 @@
+"""
+Regression check and timing of the real (inflation-adjusted) exchange rates (realrates.build_real_rates), on
+generated inflation for every country of the exchange data, built through the inflation pipeline
+(python -m src.etl inflation):
+
+1. The vectorized real rates must match a row-by-row loop that chains each country's price level year by year.
+2. The USD's real rate is 1 wherever it is defined, and every real rate equals the nominal rate in its base year.
+
+It also times building the table once against looking up a country's real rates, which is all a request does.
+Run from the repository root with: python -m benchmarks.check_real_rates
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.check_crisis_events import make_raw_crisis
+from src import analysis
+from src import datastore
+from src import etl
+from src import realrates
+
+def real_rates_loop(exchange_df: pd.DataFrame,
+                    inflation_df: pd.DataFrame,
+                    base_year: int) -> np.ndarray:
+    """
+    The reference: chain each country's price level year by year, starting a new chain after a gap in the years or
+    a missing figure, then adjust every exchange rate one row at a time.
+
+    """
+    levels = {}
+    chain, level, previous = -1, 1.0, None
+    for row in inflation_df.sort_values(['country', 'year'], kind='stable').itertuples():
+        if (previous is None or row.country != previous.country or row.year != previous.year + 1
+                or pd.isna(row.inflation) or row.inflation <= -100):
+            chain, level = chain + 1, 1.0
+        else:
+            level *= 1 + row.inflation / 100
+        levels[(row.country, row.year)] = (chain, level)
+        previous = row
+
+    usd = realrates.USD_COUNTRY
+    rates = []
+    for row in exchange_df.itertuples():
+        here, base = levels.get((row.country, row.year)), levels.get((row.country, base_year))
+        usd_here, usd_base = levels.get((usd, row.year)), levels.get((usd, base_year))
+        if None in (here, base, usd_here, usd_base) or here[0] != base[0] or usd_here[0] != usd_base[0]:
+            rates.append(np.nan)
+        else:
+            rates.append(row.exchange_rate * (usd_here[1] / usd_base[1]) / (here[1] / base[1]))
+    return np.array(rates)
+
+def make_inflation(exchange_df: pd.DataFrame, tmp: str) -> pd.DataFrame:
+    """
+    Generate a raw crisis file, with its inflation gaps and missing figures, for the countries of the exchange data,
+    and build the clean inflation data from it with the inflation pipeline.
+
+    """
+    countries = [country for country in exchange_df['country'].unique() if country != realrates.USD_COUNTRY]
+    raw_df = make_raw_crisis(len(countries) + 1, 230)
+    raw_df['Country'] = raw_df['Country'].str.strip().replace({f'Country {i}': country
+                                                               for i, country in enumerate(countries)})
+    raw_df[etl.INFLATION_COLUMN] /= 4
+
+    raw_path = os.path.join(tmp, 'global_crisis_data.csv')
+    output_path = os.path.join(tmp, 'clean_inflation_data.csv')
+    raw_df.to_csv(raw_path, index=False)
+    etl.run_inflation_pipeline(raw_path, output_path, compiled_dir=tmp, stage_dir=tmp)
+    return datastore.load_frame(output_path, tmp)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check the real exchange rates against a row-by-row loop.')
+    parser.add_argument('--repeat', type=int, default=200, help='lookups to time, defaults to 200')
+    args = parser.parse_args()
+
+    exchange_df, partitions = analysis.partition_by_country(datastore.load_frame(datastore.PATH_CURRENCY))
+    with tempfile.TemporaryDirectory() as tmp:
+        inflation_df = make_inflation(exchange_df, tmp)
+
+    start = time.perf_counter()
+    real_rates = realrates.build_real_rates(exchange_df, inflation_df)
+    build_seconds = time.perf_counter() - start
+
+    # 1. The same real rates as the loop, in the prices of every base year
+    nominal = exchange_df['exchange_rate'].to_numpy()
+    years = exchange_df['year'].to_numpy()
+    usd_rows = (exchange_df['country'] == realrates.USD_COUNTRY).to_numpy()
+    for base_year in real_rates.base_years:
+        rates = real_rates.rates[base_year]
+        expected = real_rates_loop(exchange_df, inflation_df, base_year)
+        assert np.allclose(rates, expected, rtol=1e-9, equal_nan=True), f'the {base_year} real rates differ'
+
+        # 2. The USD is worth one USD in any year's prices, and the base year's prices are its own
+        defined = ~np.isnan(rates)
+        assert np.allclose(rates[usd_rows & defined], 1.0)
+        assert np.allclose(rates[defined & (years == base_year)], nominal[defined & (years == base_year)])
+        print(f'  {base_year} prices: {defined.sum()} of {len(rates)} rows have a real rate, identical to the loop')
+
+    # A request only looks up a country's slice of the table
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        realrates.get_country_real_data(real_rates, exchange_df, 'Argentina', realrates.DEFAULT_BASE_YEAR, partitions)
+    lookup_seconds = (time.perf_counter() - start) / args.repeat
+
+    print(f'Built the table of {len(real_rates.base_years)} base years in {build_seconds * 1000:.1f} ms, '
+          f'a country lookup takes {lookup_seconds * 1e6:.1f} us')
+    print('Real rates OK')
+
+    return None
+
+if __name__ == '__main__':
+    main()
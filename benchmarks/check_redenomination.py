@@ -0,0 +1,114 @@
+"""
+Regression check and timing of the redenomination chains (redenomination.build_redenomination_chains), on the real
+exchange data:
+
+1. Every known redenomination converts at its legal factor, both ways, between the last year of the old currency
+   and the first year of the new one, and converting across a change with no known factor raises an error naming
+   that change.
+2. Each year of a segment has that segment's currency in use, and a currency that comes back (Belgium's Francs)
+   converts from the segment in use closest to the year asked for.
+3. The vectorized convert_many gives the same amounts as convert, one amount at a time, and NaN where convert
+   raises (an unknown factor, or a year with no currency).
+4. The conversion text of the app converts a country's currencies by redenomination, and reports an unknown
+   factor instead of a conversion (China).
+
+It also times building the chains once against a conversion, which is all a request does, and against a
+conversion of many amounts at once.
+Run from the repository root with: python -m benchmarks.check_redenomination
+"""
+import argparse
+import time
+
+import numpy as np
+
+from src import basicpage
+from src import datastore
+from src import redenomination
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check the redenomination chains against their legal factors.')
+    parser.add_argument('--repeat', type=int, default=10_000, help='conversions to time, defaults to 10000')
+    args = parser.parse_args()
+
+    exchange_df = datastore.load_frame(datastore.PATH_CURRENCY)
+    start = time.perf_counter()
+    chains = redenomination.build_redenomination_chains(exchange_df)
+    build_seconds = time.perf_counter() - start
+    links = chains.links
+
+    # 1. The legal factor of each known change, and an error naming each unknown one
+    for link in links.itertuples():
+        before, after = link.year - 1, link.year
+        while (link.country, before) not in chains.in_use:
+            before -= 1
+        if np.isnan(link.factor):
+            try:
+                redenomination.convert(chains, 1.0, link.country, before, after)
+            except ValueError as e:
+                assert f'from {link.from_currency} to {link.to_currency} in {link.year}' in str(e), str(e)
+            else:
+                raise AssertionError(f'{link.country} converted across an unknown change')
+            continue
+
+        forward = redenomination.convert(chains, 1.0, link.country, before, after)
+        backward = redenomination.convert(chains, 1.0, link.country, after, before)
+        assert np.isclose(forward, 1 / link.factor), f'{link.country} {link.from_currency} to {link.to_currency}'
+        assert np.isclose(backward, link.factor), f'{link.country} {link.to_currency} to {link.from_currency}'
+    known = links['factor'].notna()
+    print(f'  {known.sum()} of {len(links)} changes of currency convert at their legal factor, both ways, '
+          f'the other {(~known).sum()} report their unknown factor')
+
+    # 2. The segment in use in every year of the data, and the closest segment of a currency that comes back
+    for row in exchange_df[['country', 'currency_name', 'year']].itertuples():
+        run = chains.in_use[(row.country, row.year)]
+        assert chains.runs['currency_name'].iat[run] == row.currency_name, f'{row.country} in {row.year}'
+    assert redenomination.get_currency_year(chains, 'Belgium', 'Francs', 1930) == 1926
+    assert redenomination.get_currency_year(chains, 'Belgium', 'Francs', 1942) == 1945
+    assert np.isclose(redenomination.convert(chains, 5.0, 'Belgium', 1926, 1930), 1.0)
+    print(f"  {len(exchange_df)} rows have their segment's currency in use, Belgium's Francs convert from the "
+          f"closest of their two segments")
+
+    # 3. The same amounts one at a time and all at once, between the first and last year of every pair of segments
+    # of each country, and with a year before each country's first currency
+    runs = chains.runs
+    pairs = [(country, from_year, to_year) for country, group in runs.groupby('country', sort=False)
+             for from_year in group['start'].tolist() + group['end'].tolist() + [group['start'].min() - 1]
+             for to_year in group['start'].tolist() + group['end'].tolist()]
+    amounts = np.arange(1, len(pairs) + 1, dtype=np.float64)
+    countries, from_years, to_years = (np.array(column) for column in zip(*pairs))
+    many = redenomination.convert_many(chains, amounts, countries, from_years, to_years)
+    one = []
+    for amount, pair in zip(amounts, pairs):
+        try:
+            one.append(redenomination.convert(chains, amount, *pair))
+        except ValueError:
+            one.append(np.nan)
+    assert np.allclose(many, one, equal_nan=True), 'convert_many differs from convert'
+    print(f'  {len(pairs)} pairs of years convert the same one at a time and all at once, '
+          f'{np.isnan(many).sum()} of them NaN where convert raises')
+
+    # 4. The app's conversion text, by redenomination and with an unknown factor
+    text = basicpage.get_conversion_text('France', 'Old Francs', '1950', 'France|Francs', 1000)
+    assert text == ' (1000 Old Francs = 10 Francs by redenomination)', text
+    text = basicpage.get_conversion_text('China', 'Old Yuan', '1925', 'China|New Yuan', 1)
+    assert 'No known factor for the change from Old Yuan to New Yuan in 1933' in text, text
+    print(f'  the app reports{text}')
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        redenomination.convert(chains, 1000.0, 'France', 1950, 1990)
+    convert_seconds = (time.perf_counter() - start) / args.repeat
+
+    start = time.perf_counter()
+    redenomination.convert_many(chains, np.full(args.repeat, 1000.0), np.full(args.repeat, 'France'),
+                                np.full(args.repeat, 1950), np.full(args.repeat, 1990))
+    many_seconds = (time.perf_counter() - start) / args.repeat
+
+    print(f'Built the chains of {len(chains.runs)} segments in {build_seconds * 1000:.1f} ms, '
+          f'a conversion takes {convert_seconds * 1e6:.2f} us, {many_seconds * 1e6:.2f} us each with convert_many')
+    print('Redenomination chains OK')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Compare a benchmark results file against a saved baseline and flag the metrics that got worse by more than a
+threshold, exiting with status 1 if any did. Both files are written by benchmarks.suite or benchmarks.load_test
+with --output. Run from the repository root with: python -m benchmarks.compare BASELINE RESULTS
+"""
+import argparse
+import sys
+
+from benchmarks import results
+
+# A metric is a regression if it got worse by more than this fraction of the baseline
+DEFAULT_THRESHOLD = 0.20
+
+# ...and by more than this much in its own unit, so sub-microsecond timings don't trip on noise
+DEFAULT_MIN_DELTA = 0.05
+
+def compare_metrics(baseline: dict,
+                    current: dict,
+                    threshold: float = DEFAULT_THRESHOLD,
+                    min_delta: float = DEFAULT_MIN_DELTA) -> list:
+    """
+    Compare the metrics that both results have.
+
+    Arguments:
+        baseline (dict): the metrics of the baseline results.
+        current (dict): the metrics of the results to check.
+        threshold (float): the relative change past which a worse metric is a regression, defaults to
+                           DEFAULT_THRESHOLD.
+        min_delta (float): the absolute change a worse metric must also exceed, defaults to DEFAULT_MIN_DELTA.
+
+    Output:
+        (list): one (name, baseline value, current value, relative change, status) tuple per metric, where the
+                relative change is positive when the metric got worse and status is "REGRESSION", "improved" or "".
+    """
+    rows = []
+    for name in sorted(baseline.keys() & current.keys()):
+        before = baseline[name]['value']
+        after = current[name]['value']
+
+        # Orient the change so that positive is always worse
+        worse_by = after - before if baseline[name]['better'] == 'lower' else before - after
+        change = worse_by / before if before else 0.0
+
+        status = ''
+        if change > threshold and worse_by > min_delta:
+            status = 'REGRESSION'
+        elif change < -threshold and -worse_by > min_delta:
+            status = 'improved'
+        rows.append((name, before, after, change, status))
+    return rows
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Flag benchmark regressions against a saved baseline.')
+    parser.add_argument('baseline', help='the baseline JSON results file')
+    parser.add_argument('current', help='the JSON results file to check')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'relative change that counts as a regression, defaults to {DEFAULT_THRESHOLD}')
+    parser.add_argument('--min-delta', type=float, default=DEFAULT_MIN_DELTA,
+                        help=f'absolute change a regression must also exceed, defaults to {DEFAULT_MIN_DELTA}')
+    args = parser.parse_args()
+
+    baseline = results.load_results(args.baseline)
+    current = results.load_results(args.current)
+    if baseline['suite'] != current['suite']:
+        raise SystemExit(f"Can't compare {baseline['suite']} results against {current['suite']} results")
+
+    print(f"Baseline {baseline.get('commit')} ({baseline['created']}) vs {current.get('commit')} ({current['created']})")
+    rows = compare_metrics(baseline['metrics'], current['metrics'], args.threshold, args.min_delta)
+    print(f"{'metric':<36} {'baseline':>12}    {'current':>12} {'unit':<11} {'worse by':>8}")
+    for name, before, after, change, status in rows:
+        unit = current['metrics'][name]['unit']
+        print(f'{name:<36} {before:12.3f} -> {after:12.3f} {unit:<11} {change:+8.1%}  {status}')
+
+    missing = baseline['metrics'].keys() - current['metrics'].keys()
+    if missing:
+        print(f"Not in the current results: {', '.join(sorted(missing))}")
+
+    regressions = [row[0] for row in rows if row[4] == 'REGRESSION']
+    if regressions:
+        print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+    print('No regressions')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Local load test of the production entry point: starts gunicorn --preload on wsgi:server with each worker count in
+turn, sends the page's callback requests to /_dash-update-component from concurrent client processes, and reports
+the throughput, the p50/p95/p99 request latency and how much of each worker's memory is still shared with the
+others. Needs gunicorn (pip install gunicorn), or --server flask for the single-process development server, and
+Linux for the memory figures. Results can be saved as JSON for benchmarks.compare.
+Run from the repository root with: python -m benchmarks.load_test --workers 1 2 4 --output load.json
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks import results
+from benchmarks.check_payload_sizes import submit, figures
+from src import datastore
+
+HOST = '127.0.0.1'
+
+class HTTPClient:
+    """
+    Just enough of the Flask test client interface over a real HTTP connection for check_payload_sizes.submit and
+    check_payload_sizes.figures to send their requests to a running server. Records the latency of every request.
+    """
+    class Response:
+        def __init__(self, status_code: int, data: bytes):
+            self.status_code = status_code
+            self.data = data
+
+    def __init__(self, port: int):
+        self.port = port
+        self.latencies = []
+
+    def post(self, path: str, data: str, content_type: str) -> 'HTTPClient.Response':
+        # The gunicorn sync workers close the connection after every response, so open one per request
+        start = time.perf_counter()
+        connection = http.client.HTTPConnection(HOST, self.port, timeout=30)
+        try:
+            connection.request('POST', path, body=data, headers={'Content-Type': content_type})
+            response = connection.getresponse()
+            response = HTTPClient.Response(response.status, response.read())
+        finally:
+            connection.close()
+        self.latencies.append((time.perf_counter() - start) * 1000)
+        return response
+
+def get_request_keys() -> list:
+    """
+    Get the (country, currency, year) keys the clients submit, every row of the exchange data.
+
+    """
+    exchange_df = datastore.load_frame(datastore.PATH_CURRENCY)
+    return list(zip(exchange_df['country'].tolist(),
+                    exchange_df['currency_name'].tolist(),
+                    exchange_df['year'].astype(str).tolist()))
+
+def run_client(port: int, keys: list, duration: float, seed: int) -> list:
+    """
+    Send requests for a fixed time the way a user of the page does: mostly rate submits, and every fourth submit
+    switches country, which also fetches both of that country's figures.
+
+    Output:
+        (list): the latency in milliseconds of every request that completed.
+    """
+    client = HTTPClient(port)
+    rng = random.Random(seed)
+    submits = 0
+    stop = time.perf_counter() + duration
+    while time.perf_counter() < stop:
+        country, currency, year = rng.choice(keys)
+        if submits % 4 == 0:
+            submit(client, country, currency, year, figure_country='')
+            figures(client, country)
+        else:
+            submit(client, country, currency, year, figure_country=country)
+        submits += 1
+    return client.latencies
+
+def get_workers(pid: int) -> list:
+    """
+    Helper function that gets the process ids of the processes serving requests, on Linux: the children of a
+    server process (the gunicorn workers), or the server process itself if it has none.
+
+    """
+    path = f'/proc/{pid}/task/{pid}/children'
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [int(child) for child in f.read().split()] or [pid]
+
+def get_memory(pid: int) -> dict:
+    """
+    Helper function that reads the memory of a process from /proc, on Linux: Rss is all of its resident memory,
+    Private is the part only it uses (including pages copied on write after the fork), and Pss counts shared
+    pages divided between the processes sharing them.
+
+    Output:
+        (dict): the Rss, Pss and Private memory in MB, empty if not available.
+    """
+    path = f'/proc/{pid}/smaps_rollup'
+    if not os.path.exists(path):
+        return {}
+
+    fields = {}
+    with open(path) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {'Rss': fields.get('Rss', 0.0),
+            'Pss': fields.get('Pss', 0.0),
+            'Private': fields.get('Private_Clean', 0.0) + fields.get('Private_Dirty', 0.0)}
+
+def wait_until_up(port: int, timeout: float) -> None:
+    """
+    Helper function that waits for the server to answer the page request.
+
+    """
+    stop = time.perf_counter() + timeout
+    while time.perf_counter() < stop:
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=5)
+            connection.request('GET', '/')
+            if connection.getresponse().status == 200:
+                return None
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError(f'The server did not answer on port {port} within {timeout} s')
+
+def get_server_command(server: str, workers: int, port: int) -> list:
+    """
+    Helper function that gets the command starting the server on a port.
+
+    Arguments:
+        server (str): "gunicorn" for gunicorn --preload on wsgi:server, or "flask" for the threaded development
+                      server, which only runs one process.
+        workers (int): the number of gunicorn workers.
+        port (int): the port to listen on.
+
+    Output:
+        (list): the command and its arguments.
+    """
+    if server == 'flask':
+        return [sys.executable, '-c', f'import wsgi; wsgi.app.run(host={HOST!r}, port={port}, threaded=True)']
+    return ['gunicorn', '--preload', '--workers', str(workers), '--bind', f'{HOST}:{port}',
+            '--log-level', 'warning', 'wsgi:server']
+
+def run_load(server_name: str, workers: int, clients: int, duration: float, port: int, keys: list) -> dict:
+    """
+    Start the server with a number of workers, run the clients against it and stop it.
+
+    Output:
+        (dict): the requests per second, the p50/p95/p99 latency and the mean memory per worker.
+    """
+    server = subprocess.Popen(get_server_command(server_name, workers, port))
+    try:
+        wait_until_up(port, timeout=120)
+
+        with multiprocessing.Pool(clients) as pool:
+            start = time.perf_counter()
+            latencies = pool.starmap(run_client, [(port, keys, duration, seed) for seed in range(clients)])
+            elapsed = time.perf_counter() - start
+
+        # Memory is read after the load, so it includes anything the requests copied into the workers
+        memory = [get_memory(pid) for pid in get_workers(server.pid)]
+        memory = [m for m in memory if m]
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = [latency for client_latencies in latencies for latency in client_latencies]
+    percentiles = statistics.quantiles(latencies, n=100)
+    result = {'workers': workers,
+              'requests_per_second': len(latencies) / elapsed,
+              'p50_ms': percentiles[49],
+              'p95_ms': percentiles[94],
+              'p99_ms': percentiles[98]}
+    for field in ('Rss', 'Pss', 'Private'):
+        result[field] = sum(m[field] for m in memory) / len(memory) if memory else float('nan')
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test the server entry point with different worker counts.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='worker counts, defaults to 1 2 4')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent client processes, defaults to 8')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds per worker count, defaults to 10')
+    parser.add_argument('--port', type=int, default=8051, help='port to run the server on, defaults to 8051')
+    parser.add_argument('--server', choices=['gunicorn', 'flask'], default='gunicorn',
+                        help='server to run, defaults to gunicorn')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to, for benchmarks.compare')
+    args = parser.parse_args()
+
+    if args.server == 'gunicorn' and shutil.which('gunicorn') is None:
+        raise SystemExit('The load test needs gunicorn, install it with: pip install gunicorn, '
+                         'or run it against the development server with --server flask')
+    if args.server == 'flask' and args.workers != [1]:
+        raise SystemExit('The flask development server only runs one process, use --workers 1')
+
+    keys = get_request_keys()
+    print(f"{'workers':>8} {'requests/s':>11} {'speedup':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'Rss MB':>8} {'Pss MB':>8} {'Private MB':>11}")
+    metrics = {}
+    baseline = None
+    for workers in args.workers:
+        result = run_load(args.server, workers, args.clients, args.duration, args.port, keys)
+        baseline = baseline or result['requests_per_second']
+        print(f"{workers:8d} {result['requests_per_second']:11.1f} "
+              f"{result['requests_per_second'] / baseline:7.2f}x "
+              f"{result['p50_ms']:8.2f} {result['p95_ms']:8.2f} {result['p99_ms']:8.2f} "
+              f"{result['Rss']:8.1f} {result['Pss']:8.1f} {result['Private']:11.1f}")
+
+        metrics[f'workers_{workers}.requests_per_second'] = results.metric(result['requests_per_second'],
+                                                                           'requests/s', better='higher')
+        for percentile in ('p50_ms', 'p95_ms', 'p99_ms'):
+            metrics[f'workers_{workers}.{percentile}'] = results.metric(result[percentile], 'ms')
+
+    if args.output:
+        results.save_results(args.output, f'load-{args.server}', metrics)
+        print(f'Saved results to {args.output}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Report the bytes of the figure callback responses (the line and timeline figures sent when the country changes) for
+every country, in each wire format: plain JSON lists of numbers, Plotly's own typed arrays (64-bit floats and
+integers), the compacted typed arrays the app sends (wire.compact_figure), and that compacted response gzipped, and
+brotli compressed if the brotli package is installed. Results can be saved as JSON for benchmarks.compare.
+Run from the repository root with: python -m benchmarks.report_payload_bytes --output payload.json
+"""
+import argparse
+import json
+
+from plotly.io.json import to_json_plotly
+
+from benchmarks import results
+from benchmarks.check_payload_sizes import figures
+from src import basicpage
+from src import wire
+
+# The outputs of each figure callback that hold its figure, in the order check_payload_sizes.figures sends them
+FIGURE_OUTPUTS = (('line', 'line-figure', basicpage.make_line_fig),
+                  ('timeline', 'timeline-figure', basicpage.make_timeline_fig))
+
+def response_sizes(response: bytes, component: str, fig) -> dict:
+    """
+    Measure one figure callback response in every wire format, by putting the figure into the response the app sent
+    in each of its forms.
+
+    Arguments:
+        response (bytes): the response body the app sent, with the compacted figure.
+        component (str): the id of the figure component in the response.
+        fig (plots.go.Figure): the figure the response was built from.
+
+    Output:
+        (dict): the dictionary of format name to response bytes.
+    """
+    body = json.loads(response)
+    plotly_fig = json.loads(fig.to_json())
+
+    def size_with(figure):
+        body['response'][component]['figure'] = figure
+        return len(to_json_plotly(body))
+
+    brotli = wire.get_brotli()
+    sizes = {'lists': size_with(wire.decode_figure(plotly_fig)),
+             'plotly': size_with(plotly_fig),
+             'compact': len(response),
+             'gzip': len(wire.compress(response, 'gzip'))}
+    if brotli is not None:
+        sizes['br'] = len(wire.compress(response, 'br', brotli))
+    return sizes
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Report the figure callback response bytes in every wire format.')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to, for benchmarks.compare')
+    args = parser.parse_args()
+
+    # The uncompressed app, the compression is measured here so each format is compared on the same body
+    client = basicpage.create_app().server.test_client()
+    formats = ['lists', 'plotly', 'compact', 'gzip'] + (['br'] if wire.get_brotli() is not None else [])
+    totals = {(name, fmt): 0 for name, _, _ in FIGURE_OUTPUTS for fmt in formats}
+
+    print(f"{'country':<34}{'figure':<10}" + ''.join(f'{fmt:>10}' for fmt in formats))
+    for country in basicpage.data.exchange_partitions:
+        for response, (name, component, make) in zip(figures(client, country), FIGURE_OUTPUTS):
+            sizes = response_sizes(response, component, make(country))
+            print(f'{country[:33]:<34}{name:<10}' + ''.join(f'{sizes[fmt]:>10}' for fmt in formats))
+            for fmt in formats:
+                totals[(name, fmt)] += sizes[fmt]
+
+    print()
+    for name, _, _ in FIGURE_OUTPUTS:
+        print(f"{'total':<34}{name:<10}" + ''.join(f'{totals[(name, fmt)]:>10}' for fmt in formats))
+        lists = totals[(name, 'lists')]
+        print(f"{'  % of plain lists':<44}" + ''.join(f'{totals[(name, fmt)] / lists:>10.0%}' for fmt in formats))
+
+    if args.output:
+        metrics = {f'{name}.{fmt}_bytes': results.metric(totals[(name, fmt)], 'bytes')
+                   for name, _, _ in FIGURE_OUTPUTS for fmt in formats}
+        results.save_results(args.output, 'payload_bytes', metrics)
+        print(f'Saved results to {args.output}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+Report the cold start of the app as a fresh server process sees it: the time to import it, to create it (which
+builds the layout), and to answer the first page and layout requests, with and without the default layout saved by
+python -m src.layoutcache. The imports are timed with python -X importtime, and the slowest packages are listed.
+Results can be saved as JSON for benchmarks.compare.
+Run from the repository root with: python -m benchmarks.report_startup --output startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+from benchmarks import results
+
+# Run in a fresh interpreter, {setup} runs before the app is imported, the timings are printed as JSON on stdout
+STARTUP_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+from src import layoutcache
+{setup}
+from src import basicpage
+imported = time.perf_counter()
+app = basicpage.create_app()
+created = time.perf_counter()
+client = app.server.test_client()
+client.get('/')
+client.get('/_dash-layout')
+served = time.perf_counter()
+print(json.dumps({{'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000,
+                  'first_request_ms': (served - created) * 1000, 'total_ms': (served - start) * 1000,
+                  'plotly_express': 'plotly.express' in sys.modules}}))
+"""
+
+# The ways the app is started: reading the saved default layout, or building it as if none was saved
+MODES = {'saved': '',
+         'built': 'layoutcache.load_default_layout = lambda stamp: None'}
+
+# Timings reported for each mode, in the order printed
+TIMINGS = ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms')
+
+def start_app(setup: str) -> tuple:
+    """
+    Start the app in a fresh interpreter with -X importtime.
+
+    Arguments:
+        setup (str): the code run before the app is imported.
+
+    Output:
+        (tuple): the dictionary of timings printed by the snippet, and the importtime report from stderr.
+    """
+    finished = subprocess.run([sys.executable, '-X', 'importtime', '-c', STARTUP_SNIPPET.format(setup=setup)],
+                              capture_output=True, text=True, check=True)
+    return json.loads(finished.stdout.strip().splitlines()[-1]), finished.stderr
+
+def get_package_import_times(importtime: str) -> dict:
+    """
+    Helper function that reads the cumulative import time of each top-level package (pandas, dash, src, ...) from a
+    python -X importtime report, the time of its first and outermost import.
+
+    Output:
+        (dict): the dictionary of package name to its import time, in milliseconds.
+    """
+    packages = {}
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = max(packages.get(package, 0), int(cumulative) / 1000)
+    return packages
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Report the import, create_app and first request times of a fresh '
+                                                 'server process.')
+    parser.add_argument('--repeat', type=int, default=3, help='fresh interpreters per mode, defaults to 3')
+    parser.add_argument('--top', type=int, default=10, help='number of slowest packages to list, defaults to 10')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to, for benchmarks.compare')
+    args = parser.parse_args()
+
+    # Save the default layout of the current data and code, so the saved mode reads it
+    subprocess.run([sys.executable, '-m', 'src.layoutcache'], check=True)
+
+    metrics = {}
+    print(f"\n{'layout':<10}" + ''.join(f'{timing:>18}' for timing in TIMINGS) + f"{'plotly.express':>16}")
+    for mode, setup in MODES.items():
+        runs = [start_app(setup) for _ in range(args.repeat)]
+        medians = {timing: statistics.median(timings[timing] for timings, _ in runs) for timing in TIMINGS}
+        express = any(timings['plotly_express'] for timings, _ in runs)
+        print(f'{mode:<10}' + ''.join(f'{medians[timing]:>18.1f}' for timing in TIMINGS)
+              + f"{'imported' if express else 'not imported':>16}")
+        metrics.update({f'{mode}.{timing}': results.metric(medians[timing], 'ms') for timing in TIMINGS})
+
+    # The slowest imports of a start with the saved layout
+    saved_importtime = start_app(MODES['saved'])[1]
+    packages = get_package_import_times(saved_importtime)
+    print('\nSlowest packages to import (cumulative, with the saved layout):')
+    for package, milliseconds in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {package:<40}{milliseconds:>10.1f} ms')
+
+    if args.output:
+        results.save_results(args.output, 'startup', metrics)
+        print(f'Saved results to {args.output}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+Reading and writing benchmark results as JSON, shared by benchmarks.suite, benchmarks.load_test and
+benchmarks.compare. A results file records where it was measured and one entry per metric:
+
+    {"suite": "functions", "created": "...", "commit": "...", "python": "...", "platform": "...",
+     "metrics": {"make_line_fig.median_ms": {"value": 1.3, "unit": "ms", "better": "lower"}, ...}}
+"""
+import datetime
+import json
+import platform
+import subprocess
+
+def metric(value: float, unit: str, better: str = 'lower') -> dict:
+    """
+    Helper function that makes one metric entry.
+
+    Arguments:
+        value (float): the measured value.
+        unit (str): the unit of the value, ex. "ms" or "requests/s".
+        better (str): "lower" if a smaller value is an improvement, "higher" if a larger one is, defaults to "lower".
+
+    Output:
+        (dict): the metric entry.
+    """
+    return {'value': float(value), 'unit': unit, 'better': better}
+
+def get_commit() -> str:
+    """
+    Helper function that gets the git commit of the working tree, if it is a git checkout.
+
+    """
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(path: str, suite: str, metrics: dict) -> None:
+    """
+    Write the metrics of a benchmark run to a JSON results file.
+
+    Arguments:
+        path (str): the path of the JSON file to write.
+        suite (str): the name of the benchmark that produced the metrics.
+        metrics (dict): the dictionary of metric name to its entry from metric().
+    """
+    results = {'suite': suite,
+               'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+               'commit': get_commit(),
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'metrics': metrics}
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    return None
+
+def load_results(path: str) -> dict:
+    """
+    Read a JSON results file written by save_results.
+
+    Arguments:
+        path (str): the path of the JSON file.
+
+    Output:
+        (dict): the results, with the metrics under the "metrics" key.
+    """
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,126 @@
+"""
+Latency benchmark of the data access, figure and callback functions behind the page, each timed over every country
+in the dataset. Prints the median, 95th percentile and slowest country per function, and optionally saves them as
+JSON for benchmarks.compare. Run from the repository root with: python -m benchmarks.suite --output results.json
+"""
+import argparse
+import statistics
+import time
+
+from benchmarks import results
+from benchmarks.check_payload_sizes import submit
+from src import analysis
+from src import basicpage
+from src import conversion
+from src import eventstudy
+from src import plots
+from src import timeseries
+
+def time_calls(function, args_by_country: dict, repeat: int) -> dict:
+    """
+    Time a function called once per country, over several passes.
+
+    Arguments:
+        function (callable): the function to time.
+        args_by_country (dict): the dictionary of country to the argument tuple to call the function with.
+        repeat (int): the number of passes over the countries.
+
+    Output:
+        (dict): the median and 95th percentile milliseconds over all calls, and the country with the slowest median.
+    """
+    # One untimed pass first, so one-off costs (ex. building the figure templates) aren't counted
+    for args in args_by_country.values():
+        function(*args)
+
+    times = {country: [] for country in args_by_country}
+    for _ in range(repeat):
+        for country, args in args_by_country.items():
+            start = time.perf_counter()
+            function(*args)
+            times[country].append((time.perf_counter() - start) * 1000)
+
+    all_times = [t for country_times in times.values() for t in country_times]
+    slowest = max(times, key=lambda country: statistics.median(times[country]))
+    return {'median_ms': statistics.median(all_times),
+            'p95_ms': statistics.quantiles(all_times, n=20)[-1] if len(all_times) > 1 else all_times[0],
+            'slowest_country': slowest,
+            'slowest_ms': statistics.median(times[slowest])}
+
+def get_benchmarks() -> dict:
+    """
+    Build the argument tuples of every benchmarked function for every country the user can select.
+
+    Output:
+        (dict): the dictionary of benchmark name to (function, {country: argument tuple}).
+    """
+    data = basicpage.data
+    exchange_df = data.exchange_df
+    crisis_df = data.crisis_df
+    countries = list(data.exchange_partitions)
+
+    # One (currency, year) key per country, from the country's first row of exchange data
+    keys = {}
+    for country in countries:
+        first = exchange_df.iloc[data.exchange_partitions[country].start]
+        keys[country] = (first['currency_name'], str(first['year']))
+
+    series = {country: analysis.get_country_exchange_data(exchange_df, country, data.exchange_partitions)
+              for country in countries}
+    crises = {country: analysis.get_country_crisis_data(crisis_df, country, data.crisis_partitions)
+              for country in countries}
+
+    # two_buttons reads the clicked button from the callback context, so it is sent as a click of the submit-val
+    # button through the app's Flask test client, and its timing includes handling the request
+    client = basicpage.create_app().server.test_client()
+
+    # Rank the devaluations over the years each country has data for
+    matrix = conversion.get_rate_matrix(data.rate_index, data.exchange_data_version)
+    periods = {country: (series[country][0].min(), series[country][0].max()) for country in countries}
+
+    return {
+        'get_country_exchange_data': (analysis.get_country_exchange_data,
+                                      {c: (exchange_df, c, data.exchange_partitions) for c in countries}),
+        'get_country_crisis_data': (analysis.get_country_crisis_data,
+                                    {c: (crisis_df, c, data.crisis_partitions) for c in countries}),
+        'get_exchange_rate_val': (analysis.get_exchange_rate_val,
+                                  {c: (exchange_df, c, *keys[c], data.rate_index) for c in countries}),
+        'plotly_line': (plots.plotly_line, {c: series[c] for c in countries}),
+        'plotly_scatter': (plots.plotly_scatter, {c: (crises[c],) for c in countries if not crises[c].empty}),
+        'make_line_fig': (basicpage.make_line_fig, {c: (c,) for c in countries}),
+        'make_timeline_fig': (basicpage.make_timeline_fig, {c: (c,) for c in countries}),
+        'make_stats_panel': (basicpage.make_stats_panel, {c: (c,) for c in countries}),
+        'rank_devaluations': (timeseries.rank_devaluations, {c: (matrix, *periods[c]) for c in countries}),
+        'build_event_study': (eventstudy.build_event_study, {'all countries': (exchange_df, crisis_df, matrix)}),
+        'make_event_study_fig': (basicpage.make_event_study_fig, 
+                                 {e: (e, eventstudy.DEFAULT_WINDOW) for e in basicpage.get_event_types()}),
+        'update_currency_options': (basicpage.update_currency_options, {c: (c,) for c in countries}),
+        'two_buttons': (submit, {c: (client, c, *keys[c], c) for c in countries}),
+    }
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Time the analysis, plot and callback functions over every country.')
+    parser.add_argument('--repeat', type=int, default=5, help='passes over the countries, defaults to 5')
+    parser.add_argument('--only', nargs='+', default=None, help='names of the benchmarks to run, defaults to all')
+    parser.add_argument('--output', default=None, help='JSON file to save the results to, for benchmarks.compare')
+    args = parser.parse_args()
+
+    metrics = {}
+    print(f"{'benchmark':<26} {'median ms':>10} {'p95 ms':>10}   slowest country")
+    for name, (function, args_by_country) in get_benchmarks().items():
+        if args.only and name not in args.only:
+            continue
+
+        timing = time_calls(function, args_by_country, args.repeat)
+        print(f"{name:<26} {timing['median_ms']:10.3f} {timing['p95_ms']:10.3f}   "
+              f"{timing['slowest_country']} ({timing['slowest_ms']:.3f} ms)")
+        metrics[f'{name}.median_ms'] = results.metric(timing['median_ms'], 'ms')
+        metrics[f'{name}.p95_ms'] = results.metric(timing['p95_ms'], 'ms')
+
+    if args.output:
+        results.save_results(args.output, 'functions', metrics)
+        print(f'Saved results to {args.output}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
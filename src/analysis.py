@@ -1,7 +1,106 @@
+import numpy as np
 import pandas as pd
 
+from src import metrics
+
+# The ways build_filled_rate_index can estimate the rate of a year with no data
+GAP_FILL_METHODS = ('linear', 'log-linear', 'nearest', 'previous')
+
+def partition_by_country(df: pd.DataFrame) -> tuple:
+    """
+    Partition a DataFrame by country once, when the data is loaded, so that getting a country's rows is a slice 
+    instead of a scan over the whole table. Rows are stably sorted by country (keeping the year order within a 
+    country) only if they aren't already, so no copy is made of the clean data files, which are already sorted.
+
+    Arguments:
+        df (pd.DataFrame): the full exchange or crisis DataFrame to partition.
+    
+    Output:
+        df (pd.DataFrame): the DataFrame with each country's rows contiguous, to be used in place of the input.
+        partitions (dict): the dictionary of country to the slice of its rows in df.
+    """
+    if not df['country'].is_monotonic_increasing:
+        df = df.sort_values('country', kind='stable', ignore_index=True)
+
+    # Find the row positions where the country changes, which are the boundaries of each country's slice
+    countries = df['country'].to_numpy()
+    boundaries = np.flatnonzero(countries[1:] != countries[:-1]) + 1
+    starts = np.concatenate(([0], boundaries)).tolist()
+    stops = np.concatenate((boundaries, [len(df)])).tolist()
+
+    partitions = {countries[start]: slice(start, stop) for start, stop in zip(starts, stops) if stop > start}
+    return df, partitions
+
+def build_currency_options(exchange_df: pd.DataFrame) -> dict:
+    """
+    Build the select-currency dropdown options for every country at once, so the country dropdown callback is a 
+    dictionary lookup.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data.
+    
+    Output:
+        (dict): the dictionary of country to its list of {"label": currency_range, "value": currency_name} options, 
+                in the order the currency ranges first appear in the data.
+    """
+    unique_currency_ranges = exchange_df[['country', 'currency_name', 'currency_range']].drop_duplicates()
+
+    options = {}
+    for country, currency_name, currency_range in zip(unique_currency_ranges['country'].tolist(),
+                                                      unique_currency_ranges['currency_name'].tolist(),
+                                                      unique_currency_ranges['currency_range'].tolist()):
+        options.setdefault(country, []).append({"label": currency_range, "value": currency_name})
+    return options
+
+def build_country_versions(df: pd.DataFrame, 
+                           partitions: dict) -> dict:
+    """
+    Build a version stamp for each country's rows, a hash of their contents, so that anything derived from a 
+    country's data (ex. cached figures) can tell when that data has changed.
+
+    Arguments:
+        df (pd.DataFrame): the full exchange or crisis DataFrame, partitioned by partition_by_country.
+        partitions (dict): the country slices of df from partition_by_country.
+    
+    Output:
+        (dict): the dictionary of country to its integer version stamp.
+    """
+    # Hash every row once, then combine the row hashes of each country's slice
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+    versions = {}
+    for country, rows in partitions.items():
+        country_hashes = row_hashes[rows]
+        
+        # Weight each row hash by its position, so reordering rows also changes the version
+        weights = np.arange(1, len(country_hashes) + 1, dtype=np.uint64)
+        versions[country] = int((country_hashes * weights).sum())
+    return versions
+
+def compact_text_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store every text column of a DataFrame as a categorical: an integer code array per column plus one small array
+    of the distinct strings. Besides taking a fraction of the memory, this keeps the data shareable between forked
+    server workers, since reading an object column touches the reference count of every string it reads, which
+    copies the memory page holding it into the worker, while reading the codes writes nothing.
+
+    Arguments:
+        df (pd.DataFrame): the exchange or crisis DataFrame to compact.
+
+    Output:
+        (pd.DataFrame): the DataFrame with the same values, with its text columns stored as categoricals.
+    """
+    # The columns loaded from a compiled store are categoricals already, only the others are encoded
+    text_columns = [column for column in df.columns if not pd.api.types.is_numeric_dtype(df[column])
+                    and not isinstance(df[column].dtype, pd.CategoricalDtype)]
+    if not text_columns:
+        return df
+    return df.astype({column: 'category' for column in text_columns})
+
+@metrics.timed('analysis.get_country_exchange_data')
 def get_country_exchange_data(exchange_df: pd.DataFrame, 
-                              price_country: str) -> list:
+                              price_country: str,
+                              partitions: dict = None) -> list:
     """
     Given a country, subset the exchange rate DataFrame into the Series of years for a that country and the 
     corresponding exchange rates. This function is used to create the exchange rate line graph figures.
@@ -9,12 +108,17 @@ def get_country_exchange_data(exchange_df: pd.DataFrame,
     Arguments:
         exchange_df (pd.DataFrame): the full DataFrame of exchange data to subset.
         price_country (str): the selected country with which to subset the DataFrame by.
+        partitions (dict): the country slices of exchange_df from partition_by_country, if given the subset is a 
+                           slice instead of a scan.
     
     Output:
         (list): the two pd.Series objects, the years for a given country and the corresponding exchange rates for 
                 that country.
     """
-    country_subset_df = exchange_df[exchange_df["country"] == price_country]
+    if partitions is not None:
+        country_subset_df = exchange_df.iloc[partitions.get(price_country, slice(0, 0))]
+    else:
+        country_subset_df = exchange_df[exchange_df["country"] == price_country]
 
     # Set the soon-to-be axes to their corresponding Series
     x = country_subset_df["year"]
@@ -22,8 +126,10 @@ def get_country_exchange_data(exchange_df: pd.DataFrame,
 
     return x, y
 
+@metrics.timed('analysis.get_country_crisis_data')
 def get_country_crisis_data(crisis_df: pd.DataFrame, 
-                            price_country: str) -> pd.DataFrame:
+                            price_country: str,
+                            partitions: dict = None) -> pd.DataFrame:
     """
     Given a country, subset the crisis DataFrame into the list of years for a that country and the corresponding 
     historical event points.
@@ -31,18 +137,43 @@ def get_country_crisis_data(crisis_df: pd.DataFrame,
     Arguments:
         crisis_df (pd.DataFrame): the full DataFrame of crisis data to subset.
         price_country (str): the selected country with which to subset the DataFrame by.
+        partitions (dict): the country slices of crisis_df from partition_by_country, if given the subset is a 
+                           slice instead of a scan.
     
     Output:
         country_subset_df (pd.DataFrame): the subsetted crisis DataFrame with data for the given country.
     """
     # Subset the crisis data to a given country's info
+    if partitions is not None:
+        return crisis_df.iloc[partitions.get(price_country, slice(0, 0))]
+    
     country_subset_df = crisis_df[crisis_df["country"] == price_country]
     return country_subset_df
 
+def build_rate_index(exchange_df: pd.DataFrame) -> pd.Series:
+    """
+    Build the keyed exchange rate index used to look up rates without scanning the whole exchange rate DataFrame. 
+    This function is called once when the data is loaded.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data to index.
+    
+    Output:
+        (pd.Series): the exchange rates, indexed by a unique (country, currency_name, year) MultiIndex. Rows with
+                     no rate (NaN, or 0, the data's marker for no rate) are left out, and where the data has other
+                     duplicate rows for a key, the first one is kept.
+    """
+    # Drop the rows with no rate first, so an observed rate always wins over the marker of a duplicate row
+    observed = exchange_df[exchange_df['exchange_rate'] > 0]
+    deduplicated = observed.drop_duplicates(subset=['country', 'currency_name', 'year'], keep='first')
+    return deduplicated.set_index(['country', 'currency_name', 'year'])['exchange_rate']
+
+@metrics.timed('analysis.get_exchange_rate_val')
 def get_exchange_rate_val(exchange_df: pd.DataFrame, 
                           country: str, 
                           currency: str, 
-                          year: str) -> float:
+                          year: str,
+                          rate_index: pd.Series = None) -> float:
     """
     Given a country, subset the exchange rate DataFrame into the given year, country, and currency to acquire the 
     exchange rate associated.
@@ -54,18 +185,32 @@ def get_exchange_rate_val(exchange_df: pd.DataFrame,
         country (str): the selected country with which to subset the DataFrame by.
         currency (str): the selected currency with which to subset the DataFrame by.
         year (str): the selected year with which to subset the DataFrame by.
+        rate_index (pd.Series): the prebuilt index from build_rate_index, if given the rate is looked up by key 
+                                instead of scanning exchange_df.
     
     Output:
-        rate (float): the exchange rate value gathered from the exchange_df DataFrame for the given fields.
+        rate (float): the exchange rate value gathered from the exchange_df DataFrame for the given fields, the first 
+                      rate above 0 where the data has duplicate rows, or 0.0 if there is none.
     """
 
     # Year starts out as a string input field, convert to int
     year = int(year)
 
+    # Use the prebuilt index when we have one, a single hashed lookup
+    if rate_index is not None:
+        try:
+            return rate_index.iloc[rate_index.index.get_loc((country, currency, year))]
+        
+        # No data was found for this combination of inputs
+        except KeyError:
+            return 0.0
+
+    # Skip the rows with no rate (0, the data's marker), so a duplicate row with an observed rate wins, as in the index
     subset = exchange_df[
         (exchange_df['country'] == country) &
         (exchange_df['currency_name'] == currency) &
-        (exchange_df['year'] == year)
+        (exchange_df['year'] == year) &
+        (exchange_df['exchange_rate'] > 0)
     ]
 
     # No data was found for this combination of inputs, 
@@ -75,4 +220,144 @@ def get_exchange_rate_val(exchange_df: pd.DataFrame,
     
     # Get the exchange rate from this DataFrame subset
     rate = subset.iloc[0]['exchange_rate']
-    return rate
\ No newline at end of file
+    return rate
+
+def coerce_years(years: np.ndarray) -> np.ndarray:
+    """
+    Helper function that parses an array-like of years (integers, floats or strings) into a float array, with NaN 
+    for the missing years and those that aren't whole numbers, instead of failing on them.
+
+    """
+    years = pd.to_numeric(pd.Series(np.asarray(years, dtype=object)), errors='coerce').to_numpy(dtype=np.float64)
+    return np.where(np.isfinite(years) & (years == np.floor(years)), years, np.nan)
+
+def get_exchange_rate_vals(exchange_df: pd.DataFrame,
+                           countries: np.ndarray,
+                           currencies: np.ndarray,
+                           years: np.ndarray,
+                           rate_index: pd.Series = None) -> np.ndarray:
+    """
+    The batch version of get_exchange_rate_val, resolving many (country, currency, year) keys in one vectorized 
+    lookup against the rate index.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data, only used to build the index if rate_index 
+                                    isn't given.
+        countries (np.ndarray): array-like of countries, one per key.
+        currencies (np.ndarray): array-like of currencies, one per key.
+        years (np.ndarray): array-like of years (integers or integer strings), one per key. Missing years and years 
+                            that aren't whole numbers (ex. "19x0") have no data.
+        rate_index (pd.Series): the prebuilt index from build_rate_index.
+    
+    Output:
+        rates (np.ndarray): the float array of exchange rates, one per key, with NaN where there is no data.
+    """
+    if rate_index is None:
+        rate_index = build_rate_index(exchange_df)
+
+    # Look up the keys with an invalid year under year -1, which no currency has
+    years = coerce_years(years)
+    valid = ~np.isnan(years)
+    keys = pd.MultiIndex.from_arrays([np.asarray(countries, dtype=object),
+                                      np.asarray(currencies, dtype=object),
+                                      np.where(valid, years, -1).astype(np.int64)])
+    
+    # Positions of each key in the index, -1 where the key doesn't exist
+    positions = rate_index.index.get_indexer(keys)
+    rates = np.where(positions >= 0, rate_index.to_numpy()[positions], np.nan)
+    return rates
+
+def build_filled_rate_index(rate_index: pd.Series, 
+                            method: str = 'linear') -> pd.DataFrame:
+    """
+    Fill in the years with no exchange rate inside each (country, currency) series, between its first and last 
+    observed year, so that every year of a currency's range has a rate. This is done for all series at once when the 
+    data is loaded. Rates of 0 are treated as missing.
+
+    Arguments:
+        rate_index (pd.Series): the prebuilt index from build_rate_index.
+        method (str): how to estimate the missing years, one of GAP_FILL_METHODS: "linear" interpolation of the rate,
+                      "log-linear" interpolation (constant growth rate between observations), "nearest" observed year
+                      (ties go to the earlier year), or "previous" observed year. Defaults to "linear".
+    
+    Output:
+        (pd.DataFrame): the exchange_rate and observed (bool) columns, indexed by a unique (country, currency_name, 
+                        year) MultiIndex covering every year of every currency's range.
+    """
+    if method not in GAP_FILL_METHODS:
+        raise ValueError(f"Unknown gap filling method {method!r}, expected one of {GAP_FILL_METHODS}")
+
+    # Pivot into a dense year x (country, currency) matrix, so all series are filled in the same vectorized operations
+    wide = rate_index.where(rate_index > 0).unstack(['country', 'currency_name'])
+    years = np.arange(wide.index.min(), wide.index.max() + 1)
+    wide = wide.reindex(years)
+    values = wide.to_numpy(dtype=np.float64)
+    observed = ~np.isnan(values)
+
+    # For every cell, the row of the closest observation at or before it and at or after it (-1 / len if none)
+    rows = np.arange(len(years))[:, np.newaxis]
+    previous_row = np.maximum.accumulate(np.where(observed, rows, -1), axis=0)
+    next_row = np.minimum.accumulate(np.where(observed, rows, len(years))[::-1], axis=0)[::-1]
+
+    # Only fill inside a currency's range, not before its first or after its last observation
+    inside = (previous_row >= 0) & (next_row < len(years))
+    columns = np.broadcast_to(np.arange(values.shape[1]), values.shape)
+    previous_value = values[np.clip(previous_row, 0, None), columns]
+    next_value = values[np.clip(next_row, 0, len(years) - 1), columns]
+
+    if method == 'previous':
+        filled = previous_value
+    elif method == 'nearest':
+        filled = np.where(rows - previous_row <= next_row - rows, previous_value, next_value)
+    else:
+        # Fraction of the way from the previous observation to the next one (0 on observed years)
+        span = np.where(next_row > previous_row, next_row - previous_row, 1)
+        weight = (rows - previous_row) / span
+        if method == 'linear':
+            filled = previous_value + weight * (next_value - previous_value)
+        else:
+            filled = np.exp(np.log(previous_value) + weight * (np.log(next_value) - np.log(previous_value)))
+
+    filled = np.where(observed, values, np.where(inside, filled, np.nan))
+
+    # Back to one row per (country, currency, year) that has a rate
+    currency_columns, year_rows = np.nonzero(~np.isnan(filled.T))
+    index = pd.MultiIndex.from_arrays([wide.columns.get_level_values('country')[currency_columns],
+                                       wide.columns.get_level_values('currency_name')[currency_columns],
+                                       years[year_rows]],
+                                      names=['country', 'currency_name', 'year'])
+    return pd.DataFrame({'exchange_rate': filled[year_rows, currency_columns],
+                         'observed': observed[year_rows, currency_columns]},
+                        index=index).sort_index()
+
+@metrics.timed('analysis.get_exchange_rate_estimate')
+def get_exchange_rate_estimate(filled_index: pd.DataFrame, 
+                               country: str, 
+                               currency: str, 
+                               year: str) -> tuple:
+    """
+    Given a country, currency and year, look up the exchange rate in the gap-filled index, along with whether it was 
+    observed in the data or estimated.
+
+    Arguments:
+        filled_index (pd.DataFrame): the prebuilt index from build_filled_rate_index.
+        country (str): the selected country.
+        currency (str): the selected currency.
+        year (str): the selected year.
+    
+    Output:
+        rate (float): the exchange rate, 0.0 if the year is outside the currency's range (or there is no such 
+                      currency).
+        observed (bool): whether the rate was observed in the data, rather than estimated.
+    """
+    # Year starts out as a string input field, convert to int
+    year = int(year)
+
+    try:
+        position = filled_index.index.get_loc((country, currency, year))
+    
+    # No data was found for this combination of inputs
+    except KeyError:
+        return 0.0, False
+    
+    return filled_index['exchange_rate'].iloc[position], bool(filled_index['observed'].iloc[position])
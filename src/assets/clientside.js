@@ -0,0 +1,198 @@
+// Clientside versions of the currency dropdown and exchange rate callbacks, used when the app is created with
+// clientside_mode=True. The exchange data is embedded in the page by the exchange-data store (see
+// src/clientside.py for its encoding), so these run in the browser without a request to the server. They mirror
+// update_currency_options, two_buttons and get_conversion_text in src/basicpage.py.
+
+(function () {
+    const DEFAULT_COUNTRY = 'United States of America';
+    const CONVERT_TO_SEPARATOR = '|';
+
+    // The series of the exchange data keyed by "country|currency", rebuilt only when the store data changes
+    let cachedData = null;
+    let cachedSeries = null;
+
+    function getSeries(data) {
+        if (data !== cachedData) {
+            cachedSeries = new Map();
+            for (const [country, currency, firstYear, rates, estimated] of data.series) {
+                cachedSeries.set(data.countries[country] + CONVERT_TO_SEPARATOR + data.currencies[currency],
+                                 {firstYear: firstYear, rates: rates, estimated: new Set(estimated)});
+            }
+            cachedData = data;
+        }
+        return cachedSeries;
+    }
+
+    // Look up the rate of a currency in a year, along with whether it was observed rather than estimated
+    function lookupRate(data, country, currency, year) {
+        const series = getSeries(data).get(country + CONVERT_TO_SEPARATOR + currency);
+        if (series === undefined) {
+            return null;
+        }
+        const offset = year - series.firstYear;
+        if (offset < 0 || offset >= series.rates.length) {
+            return null;
+        }
+        return {rate: series.rates[offset], observed: !series.estimated.has(offset)};
+    }
+
+    // Python's exponent notation, at least two digits with a sign
+    function exponent(exp) {
+        return 'e' + (exp < 0 ? '-' : '+') + String(Math.abs(exp)).padStart(2, '0');
+    }
+
+    // Format a number the way Python's str() formats a float
+    function formatRepr(x) {
+        if (x !== 0 && (Math.abs(x) < 1e-4 || Math.abs(x) >= 1e16)) {
+            const [mantissa, exp] = x.toExponential().split('e');
+            return mantissa + exponent(parseInt(exp, 10));
+        }
+        const text = String(x);
+        return Number.isInteger(x) ? text + '.0' : text;
+    }
+
+    // Format a number the way Python's f"{x:.6g}" does
+    function formatG(x, precision) {
+        if (x === 0) {
+            return '0';
+        }
+        const [mantissa, exp] = x.toExponential(precision - 1).split('e');
+        const power = parseInt(exp, 10);
+        if (power < -4 || power >= precision) {
+            return mantissa.replace(/\.?0+$/, '') + exponent(power);
+        }
+        const text = x.toFixed(Math.max(precision - 1 - power, 0));
+        return text.includes('.') ? text.replace(/\.?0+$/, '') : text;
+    }
+
+    function changedCountry(figureCountry, country) {
+        return country === figureCountry ? window.dash_clientside.no_update : country;
+    }
+
+    // The segment of a country's chain where a currency was in use closest to a year, or -1, see
+    // redenomination.get_currency_year
+    function currencyRun(runs, currency, year) {
+        let best = -1;
+        let bestDistance = Infinity;
+        runs.forEach(function (run, index) {
+            if (run[0] === currency) {
+                const distance = Math.abs(Math.min(Math.max(year, run[1]), run[2]) - year);
+                if (distance < bestDistance) {
+                    best = index;
+                    bestDistance = distance;
+                }
+            }
+        });
+        return best;
+    }
+
+    // Convert between two currencies of a country at the factors of the redenominations between the segments in
+    // use closest to the year, null if the country never used one of them, see redenomination.convert
+    function redenominate(data, amount, country, fromCurrency, toCurrency, year) {
+        const runs = (data.redenominations || {})[country];
+        if (runs === undefined) {
+            return null;
+        }
+        const from = currencyRun(runs, fromCurrency, year);
+        const to = currencyRun(runs, toCurrency, year);
+        if (from < 0 || to < 0) {
+            return null;
+        }
+        if (runs[from][3] === runs[to][3]) {
+            return {amount: amount * runs[from][4] / runs[to][4]};
+        }
+
+        // Name the first change between them that starts a new chain, which is the one with no known factor
+        let run = Math.min(from, to) + 1;
+        while (runs[run][3] === runs[run - 1][3]) {
+            run += 1;
+        }
+        return {error: `No known factor for the change from ${runs[run - 1][0]} to ${runs[run][0]} in ${runs[run][1]}`};
+    }
+
+    function conversionText(data, country, currency, year, convertTo, amount) {
+        const [toCountry, toCurrency] = convertTo.split(CONVERT_TO_SEPARATOR);
+        amount = (amount === null || amount === undefined) ? 1 : amount;
+
+        // A currency the country's currency was redenominated into, or from
+        if (toCountry === country && toCurrency !== currency) {
+            const converted = redenominate(data, amount, country, currency, toCurrency, year);
+            if (converted !== null && converted.error !== undefined) {
+                return ` (${converted.error}, can't convert ${currency} to ${toCurrency})`;
+            }
+            if (converted !== null) {
+                return ` (${formatG(amount, 6)} ${currency} = ${formatG(converted.amount, 6)} ${toCurrency} ` +
+                       'by redenomination)';
+            }
+        }
+
+        // Conversions only go through observed rates
+        const from = lookupRate(data, country, currency, year);
+        const to = lookupRate(data, toCountry, toCurrency, year);
+        if (from === null || to === null || !from.observed || !to.observed) {
+            return ` (no data for ${toCurrency} (${toCountry}) in ${year})`;
+        }
+        return ` (${formatG(amount, 6)} ${currency} = ${formatG(amount * (to.rate / from.rate), 6)} ${toCurrency} ` +
+               `(${toCountry}))`;
+    }
+
+    window.dash_clientside = Object.assign({}, window.dash_clientside, {
+        currency_capsule: {
+            update_currency_options: function (selectedCountry, data) {
+                if (selectedCountry === null || selectedCountry === undefined) {
+                    return [];
+                }
+                return data.options[selectedCountry] || [];
+            },
+
+            two_buttons: function (submitValClicks, resetClicks, country, currency, year, convertTo,
+                                   figureCountry, amount, data) {
+                const noUpdate = window.dash_clientside.no_update;
+                const triggered = window.dash_clientside.callback_context.triggered;
+
+                if (!triggered || triggered.length === 0) {
+                    return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                }
+                const triggeredId = triggered[0].prop_id.split('.')[0];
+
+                if (triggeredId === 'reset-button') {
+                    return ['Exchange Rate:', null, null, '', null, changedCountry(figureCountry, DEFAULT_COUNTRY),
+                            null];
+                }
+
+                if (triggeredId === 'submit-val') {
+                    if (!country || !currency || !year) {
+                        return ['Exchange rate: (missing data)',
+                                noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                    }
+                    if (!/^\s*[+-]?\d+\s*$/.test(year)) {
+                        return ['Exchange rate: Please enter a valid four-digit year.',
+                                noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+                    }
+
+                    const found = lookupRate(data, country, currency, parseInt(year, 10));
+                    if (found === null) {
+                        return [`Exchange rate: no data for ${country} and/or ${currency} in ${year}.`,
+                                noUpdate, noUpdate, noUpdate, noUpdate, changedCountry(figureCountry, country),
+                                noUpdate];
+                    }
+
+                    let output;
+                    if (found.observed) {
+                        output = `Exchange rate: ${formatRepr(found.rate)} ${currency} per USD`;
+                    } else {
+                        output = `Exchange rate: ${formatG(found.rate, 6)} ${currency} per USD ` +
+                                 `(estimated from nearby years, no data for ${year})`;
+                    }
+                    if (convertTo) {
+                        output += conversionText(data, country, currency, parseInt(year, 10), convertTo, amount);
+                    }
+                    return [output, noUpdate, noUpdate, noUpdate, noUpdate, changedCountry(figureCountry, country),
+                            noUpdate];
+                }
+
+                return [noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate, noUpdate];
+            }
+        }
+    });
+})();
@@ -0,0 +1,376 @@
+import itertools
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from dash.background_callback.managers import BaseBackgroundCallbackManager
+from dash.exceptions import PreventUpdate
+
+# Set this environment variable to 1 before starting the production server to run the heavy callbacks in the
+# background, only with a single server process (ex. gunicorn --workers 1 --threads 8), see LocalManager
+BACKGROUND_ENV_VAR = 'CURRENCY_CAPSULE_BACKGROUND'
+ENABLED = os.environ.get(BACKGROUND_ENV_VAR, '') == '1'
+
+# Number of background jobs that run at once, the others wait for a free worker
+BACKGROUND_WORKERS = 2
+
+# Milliseconds between the browser's requests for a background job's progress and result
+POLL_INTERVAL = 250
+
+# Seconds a finished result is kept for waiters that haven't collected it (ex. a closed page) before it is dropped
+RESULT_TTL = 300
+
+class JobCancelled(Exception):
+    """
+    Raised inside a background job when it reports its progress after every waiter has cancelled it, which stops it.
+    """
+
+class Job:
+    """
+    One background computation, shared by every request waiting on the same callback with the same arguments.
+
+    key: the cache key Dash built from the callback and its arguments.
+    handles: the handles of the requests waiting on it, each releases its own when it collects the result or cancels.
+    future: the job's future on the worker pool, None for a result from the cache.
+    done: whether the job has finished, successfully or not.
+    cancelled: whether every waiter cancelled the job before it finished.
+    finished: the time.monotonic() the job finished at, or None.
+    """
+    def __init__(self, key: str):
+        """
+        Arguments:
+            key (str): the cache key of the job.
+        """
+        self.key = key
+        self.handles = set()
+        self.future = None
+        self.done = False
+        self.cancelled = False
+        self.finished = None
+
+class JobWriter:
+    """
+    The store the job functions (see make_job_fn) write their result and progress to, passing them to the manager,
+    which knows which job is writing from the worker thread.
+    """
+    def __init__(self, manager):
+        """
+        Arguments:
+            manager (LocalManager): the manager that owns the jobs.
+        """
+        self.manager = manager
+
+    def set(self, key: str, value) -> None:
+        """
+        Store a value written by the job running on this thread.
+
+        Arguments:
+            key (str): the job's cache key, with "-progress" or "-set_props" for its progress and set_props updates.
+            value: the value written.
+        """
+        self.manager.write(key, value)
+
+        return None
+
+def make_job_fn(fn, writer: JobWriter, progress: bool):
+    """
+    Wrap a callback into the job function a manager runs for it: the job calls the callback with its arguments
+    (after the function setting its progress, if it reports any) and writes the result the way Dash's own managers
+    do, as no update for PreventUpdate, and as the message and traceback of any other error.
+
+    The callbacks run in the background (the ranking and the event study) only use their arguments, so the job
+    doesn't set up the callback context: dash.ctx and set_props aren't available inside it.
+
+    Arguments:
+        fn (callable): the callback function.
+        writer (JobWriter): the store the job writes its result and progress to.
+        progress (bool): whether the callback reports its progress, taking the function setting it first.
+
+    Output:
+        (callable): the job function, called with the result key, progress key, callback arguments and context.
+    """
+    def job_fn(result_key, progress_key, user_callback_args, context):
+        def set_progress(progress_value):
+            if not isinstance(progress_value, (list, tuple)):
+                progress_value = [progress_value]
+            writer.set(progress_key, progress_value)
+
+        maybe_progress = [set_progress] if progress else []
+        try:
+            if isinstance(user_callback_args, dict):
+                output = fn(*maybe_progress, **user_callback_args)
+            elif isinstance(user_callback_args, (list, tuple)):
+                output = fn(*maybe_progress, *user_callback_args)
+            else:
+                output = fn(*maybe_progress, user_callback_args)
+        except PreventUpdate:
+            writer.set(result_key, {'_dash_no_update': '_dash_no_update'})
+        except Exception as e:
+            writer.set(result_key, {'background_callback_error': {'msg': str(e), 'tb': traceback.format_exc()}})
+        else:
+            writer.set(result_key, output)
+
+        return None
+
+    return job_fn
+
+class LocalManager(BaseBackgroundCallbackManager):
+    """
+    A Dash background callback manager that runs the jobs on a pool of worker threads in the server process, with
+    the results kept in memory, so it needs no other service or package (unlike DiskcacheManager and CeleryManager).
+    The jobs read the data, indexes and caches the server has already built, and fill the caches for later requests.
+
+    Identical requests are coalesced: a request for a callback with the same arguments as a job that is still running
+    (or whose result is still waiting to be collected) waits on that job instead of starting another, so N users
+    asking for the same result trigger one computation. Each request gets its own handle, so cancelling one request
+    only cancels the job when no other request is still waiting on it.
+
+    The jobs live in one process, so the browser's progress and result requests must reach the process that started
+    the job: use it with the development server or a single server process with several threads.
+    """
+    def __init__(self,
+                 max_workers: int = BACKGROUND_WORKERS,
+                 cache_by: list = None,
+                 result_ttl: float = RESULT_TTL):
+        """
+        Arguments:
+            max_workers (int): the number of jobs that run at once, defaults to BACKGROUND_WORKERS.
+            cache_by (list): zero-argument functions whose return values are added to the cache keys, which enables
+                             keeping the results for later requests until result_ttl, defaults to None for no caching.
+            result_ttl (float): the seconds a finished result is kept for, defaults to RESULT_TTL.
+        """
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='background-callback')
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._handle_ids = itertools.count(1)
+        self._signing_secret = None
+
+        # The jobs by cache key and by handle, and what they wrote by cache key
+        self._jobs = {}
+        self._handles = {}
+        self._results = {}
+        self._progress = {}
+        self._set_props = {}
+
+        # Counters of the jobs, exported with the metrics
+        self.started = 0
+        self.coalesced = 0
+        self.cancelled = 0
+
+        super().__init__(cache_by)
+
+    def make_job_fn(self, fn, progress, key=None):
+        """
+        Wrap a callback into the job function Dash calls with the callback's arguments and context.
+
+        """
+        return make_job_fn(fn, JobWriter(self), progress)
+
+    def call_job_fn(self, key, job_fn, args, context):
+        """
+        Start a job for a callback request, or join the running job with the same cache key.
+
+        Arguments:
+            key (str): the cache key Dash built from the callback and its arguments.
+            job_fn (callable): the job function from make_job_fn.
+            args: the callback's arguments.
+            context (dict): the callback context.
+
+        Output:
+            (int): the handle of this request's wait on the job.
+        """
+        with self._lock:
+            self._purge()
+            job = self._jobs.get(key)
+            if job is not None:
+                self.coalesced += 1
+            else:
+                job = Job(key)
+                self._jobs[key] = job
+
+                # A result kept from an earlier job (with cache_by) is served as an already finished job
+                if key in self._results:
+                    job.done = True
+                    job.finished = self._results[key][1]
+                else:
+                    self.started += 1
+                    job.future = self._executor.submit(self._run, job, job_fn, args, context)
+
+            handle = next(self._handle_ids)
+            job.handles.add(handle)
+            self._handles[handle] = job
+            return handle
+
+    def _run(self, job: Job, job_fn, args, context) -> None:
+        """
+        Run one job on a worker thread, and mark it finished.
+
+        """
+        self._local.job = job
+        try:
+            job_fn(job.key, self._make_progress_key(job.key), args, context)
+        finally:
+            self._local.job = None
+            with self._lock:
+                job.done = True
+                job.finished = time.monotonic()
+
+        return None
+
+    def write(self, key: str, value) -> None:
+        """
+        Store a result, progress or set_props update written by the job running on this thread. A job reporting
+        progress after it was cancelled is stopped, and a cancelled job's result is dropped.
+
+        """
+        job = self._local.job
+        with self._lock:
+            if key == self._make_progress_key(job.key):
+                if job.cancelled:
+                    raise JobCancelled(f'Background job {job.key} was cancelled')
+                self._progress[job.key] = value
+            elif job.cancelled:
+                pass
+            elif key == self._make_set_props_key(job.key):
+                self._set_props.setdefault(job.key, {}).update(value)
+            else:
+                self._results[job.key] = (value, time.monotonic())
+
+        return None
+
+    def _release(self, handle) -> None:
+        """
+        Helper function that ends a request's wait on its job, and drops the job once nobody waits on it anymore.
+        Must be called with the lock held.
+
+        """
+        job = self._handles.pop(int(handle), None)
+        if job is None:
+            return None
+        job.handles.discard(int(handle))
+        if job.handles or self._jobs.get(job.key) is not job:
+            return None
+
+        # The last waiter left: stop the job if it is still queued or running (it may have written its result just
+        # before it is marked done), and forget it
+        del self._jobs[job.key]
+        if not job.done and job.key not in self._results:
+            job.cancelled = True
+            job.future.cancel()
+            self.cancelled += 1
+        if self.cache_by is None or job.cancelled:
+            self._results.pop(job.key, None)
+        self._progress.pop(job.key, None)
+
+        return None
+
+    def _purge(self) -> None:
+        """
+        Helper function that drops the finished jobs and results older than the result_ttl, which their waiters
+        never collected. Must be called with the lock held.
+
+        """
+        expired = time.monotonic() - self.result_ttl
+        for job in list(self._jobs.values()):
+            if job.done and job.finished < expired:
+                for handle in list(job.handles):
+                    self._release(handle)
+        for key, (_, finished) in list(self._results.items()):
+            if finished < expired and key not in self._jobs:
+                del self._results[key]
+                self._progress.pop(key, None)
+                self._set_props.pop(key, None)
+
+        return None
+
+    def terminate_job(self, job):
+        """
+        Cancel a request's wait on its job, see _release.
+
+        """
+        if job is None:
+            return None
+        with self._lock:
+            self._release(job)
+
+        return None
+
+    def terminate_unhealthy_job(self, job):
+        """
+        Jobs are threads of the server process, so they never outlive it.
+
+        """
+        return False
+
+    def job_running(self, job):
+        """
+        Tell if the job a request is waiting on is still queued or running.
+
+        """
+        with self._lock:
+            found = self._handles.get(int(job))
+            return found is not None and not found.done
+
+    def get_progress(self, key):
+        """
+        Get the latest progress the job reported, the same for every request waiting on it.
+
+        """
+        with self._lock:
+            return self._progress.get(key)
+
+    def result_ready(self, key):
+        """
+        Tell if the job has a result.
+
+        """
+        with self._lock:
+            return key in self._results
+
+    def get_result(self, key, job):
+        """
+        Get the job's result for one waiting request, ending that request's wait.
+
+        Output:
+            the callback's output, or UNDEFINED if the job hasn't finished.
+        """
+        with self._lock:
+            if key not in self._results:
+                return self.UNDEFINED
+            result = self._results[key][0]
+            if job is not None:
+                self._release(job)
+            return result
+
+    def get_updated_props(self, key):
+        """
+        Get the set_props updates the job made, which are sent with its result.
+
+        """
+        with self._lock:
+            return self._set_props.pop(key, {})
+
+    def get_or_create_signing_secret(self, generate):
+        """
+        Get the secret Dash signs the job handles with, the same for every request to this process.
+
+        """
+        with self._lock:
+            if self._signing_secret is None:
+                self._signing_secret = generate()
+            return self._signing_secret
+
+    def stats(self) -> dict:
+        """
+        Get the job counters.
+
+        Output:
+            (dict): the started, coalesced and cancelled job counts, and the number of jobs running now.
+        """
+        with self._lock:
+            running = sum(not job.done for job in self._jobs.values())
+            return {'started': self.started, 'coalesced': self.coalesced, 'cancelled': self.cancelled,
+                    'running': running}
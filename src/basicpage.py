@@ -1,29 +1,137 @@
+import functools
+import gc
+import json
 import os
+import warnings
 import pandas as pd
 
 from dash import Dash, html, dcc, no_update
-from dash import Input, Output, callback, State, ctx
+from dash import Input, Output, State, ctx, ClientsideFunction
 import dash_bootstrap_components as dbc
 
 from src import analysis 
+from src import background
+from src import clientside
+from src import conversion
+from src import datastore
+from src import eventstudy
+from src import figcache
+from src import hotreload
+from src import layoutcache
+from src import metrics
 from src import plots
+from src import realrates
+from src import redenomination
+from src import timeseries
+from src import wire
 
 # Set the path to the data files
-PATH_CURRENCY = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'clean_exchange_data.csv'))
-PATH_CRISIS = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data', 'clean_crisis_data.csv'))
+PATH_CURRENCY = datastore.PATH_CURRENCY
+PATH_CRISIS = datastore.PATH_CRISIS
+PATH_INFLATION = datastore.PATH_INFLATION
 
 PATH_FAVICON = os.path.join('assets','favicon.ico')
 PATH_ICON = os.path.join('assets', 'icon.png')
 PATH_PAGE_DIV = os.path.join('assets', 'fancy_underline.png')
 
-exchange_df = pd.read_csv(PATH_CURRENCY)
-crisis_df = pd.read_csv(PATH_CRISIS)
+# Fill in the missing years inside each currency's range when the data is loaded, so estimated rates are lookups too
+GAP_FILL_METHOD = 'linear'
 
-def run_app() -> None:
+# Load the data and build everything derived from it (the partitions, indexes, versions and precomputed tables) once, 
+# as one snapshot, which a reload replaces by swapping this reference (see swap_data). Functions read it once into a 
+# local, so each sees a single version of the data even if it is swapped while they run.
+data = hotreload.build_snapshot(PATH_CURRENCY, PATH_CRISIS, PATH_INFLATION, GAP_FILL_METHOD)
+
+# The country the page shows before the user selects one
+DEFAULT_COUNTRY = "United States of America"
+
+# The countries the overlay chart compares before the user selects others, on a log scale
+DEFAULT_OVERLAY_COUNTRIES = ["United Kingdom", "France", "Japan"]
+DEFAULT_OVERLAY_SCALE = "log"
+
+# The event type the event study shows before the user selects one
+DEFAULT_EVENT_TYPE = "Currency Crisis"
+
+# The style of the progress bars and cancel buttons when no background callback is running
+HIDDEN = {'display': 'none'}
+
+# The steps of building the ranking table, reported as its progress when it runs as a background callback
+RANKING_STEPS = 3
+
+# Separates the country and currency in the select-convert-to dropdown values
+CONVERT_TO_SEPARATOR = "|"
+
+# Send the numeric arrays of the figures in their shortest exact form (ex. years as 16-bit integer typed arrays), 
+# set to False to send them the way Plotly encodes them
+COMPACT_FIGURES = True
+
+def encode_figure(fig: plots.go.Figure) -> str:
+    """
+    Helper function that serializes a built figure for the figure cache, compacting its arrays if COMPACT_FIGURES.
+
+    """
+    if not COMPACT_FIGURES:
+        return fig.to_json()
+    return json.dumps(wire.compact_figure(json.loads(fig.to_json())))
+
+# Cache of built figures, large enough to hold every figure prewarm_figure_cache builds
+FIGURE_CACHE_SIZE = 192
+figure_cache = figcache.FigureCache(maxsize=FIGURE_CACHE_SIZE, serialize=encode_figure)
+
+def run_app(prewarm: bool = False, 
+            clientside_mode: bool = False,
+            compress: bool = False,
+            background_mode: bool = True,
+            hot_reload: bool = hotreload.ENABLED) -> None:
     """
     Instantiate Dash app, giving it a title, icon, and layout, and then run the app.
 
+    Arguments:
+        prewarm (bool): whether to build and cache the figures for every country before starting the app, 
+                        defaults to False.
+        clientside_mode (bool): whether to embed the exchange data in the page and run the currency dropdown and 
+                                exchange rate callbacks in the browser, defaults to False.
+        compress (bool): whether to gzip (or brotli) compress the responses, defaults to False.
+        background_mode (bool): whether to run the ranking and event study callbacks in the background, defaults to 
+                                True since the development server is a single process.
+        hot_reload (bool): whether to reload the data when the data files change, defaults to hotreload.ENABLED.
+
+    """
+    if prewarm:
+        prewarm_figure_cache()
+
+    app = create_app(clientside_mode, compress, background_mode, hot_reload)
+
+    # This runs the app 
+    app.run(debug=False)
+
+    return None
+
+def create_app(clientside_mode: bool = False,
+               compress: bool = False,
+               background_mode: bool = False,
+               hot_reload: bool = False) -> Dash:
+    """
+    Instantiate the Dash app, giving it a title, icon, layout, and callbacks, without running it.
+
+    Arguments:
+        clientside_mode (bool): whether to embed the exchange data in the page and run the currency dropdown and 
+                                exchange rate callbacks in the browser, defaults to False. Falls back to running 
+                                them on the server if the encoded data is over CLIENTSIDE_DATA_BUDGET.
+        compress (bool): whether to compress the callback responses, the page, its scripts and styles with brotli 
+                         (if installed) or gzip when they are over wire.COMPRESS_MIN_BYTES, defaults to False.
+        background_mode (bool): whether to run the ranking and event study callbacks as background callbacks on a 
+                                background.LocalManager, defaults to False. Only for a single server process, since 
+                                the jobs are kept in the process that started them.
+        hot_reload (bool): whether to watch the data files and swap in the reloaded data when they change, without 
+                           restarting the server, defaults to False.
+
+    Output:
+        app (Dash): the Dash app, ready to be run.
     """
+    # Encode the exchange data for the browser, if it fits within the page weight budget
+    exchange_data = get_clientside_data(data) if clientside_mode else None
+
     # Create the application
     app = Dash(__name__, suppress_callback_exceptions=False)
 
@@ -34,26 +142,128 @@ def run_app() -> None:
     app._favicon = (PATH_FAVICON)
 
     # Create a layout
-    create_layout(app)
+    create_layout(app, exchange_data)
 
-    # This runs the app 
-    app.run(debug=False)
+    # Register the callbacks, in the browser or on the server, the heavy ones in the background if enabled
+    background_manager = background.LocalManager() if background_mode else None
+    register_callbacks(app, clientside_mode=exchange_data is not None, background_manager=background_manager)
 
-    return None
+    # Time the callback requests and serve /metrics, only if the metrics are enabled
+    collectors = (get_figure_cache_metrics,)
+    if background_manager is not None:
+        collectors += (functools.partial(get_background_metrics, background_manager),)
+
+    # Watch the data files from the first request of each server process on, since a forked worker doesn't inherit 
+    # the watcher's thread, and swap in the new data and page layout when they change
+    if hot_reload:
+        watcher = hotreload.DataWatcher(build=functools.partial(hotreload.build_snapshot, PATH_CURRENCY, PATH_CRISIS, 
+                                                                PATH_INFLATION, GAP_FILL_METHOD),
+                                        publish=functools.partial(publish_data, app, exchange_data is not None),
+                                        files=data.files)
+        app.server.before_request(watcher.start)
+        collectors += (functools.partial(get_reload_metrics, watcher),)
+    metrics.instrument_server(app.server, collectors=collectors)
+
+    # Compress the responses, registered after the metrics so they record the compressed sizes
+    if compress:
+        wire.compress_responses(app.server)
+
+    return app
+
+def get_clientside_data(snapshot: hotreload.DataSnapshot) -> dict:
+    """
+    Helper function that encodes the exchange data of a snapshot for the clientside callbacks, or gives None if it is 
+    over the page weight budget, to run them on the server instead.
+
+    """
+    exchange_data = clientside.encode_exchange_data(snapshot.filled_rate_index, snapshot.currency_options, 
+                                                    snapshot.redenomination_chains)
+    size = clientside.get_encoded_size(exchange_data)
+    if size > clientside.CLIENTSIDE_DATA_BUDGET:
+        warnings.warn(f"Encoded exchange data is {size} bytes, over the {clientside.CLIENTSIDE_DATA_BUDGET} byte "
+                      f"budget, running the callbacks on the server instead")
+        return None
+    return exchange_data
+
+def swap_data(snapshot: hotreload.DataSnapshot) -> int:
+    """
+    Publish a reloaded snapshot of the data in place of the current one with a single reference swap, so requests 
+    already running finish on the data they started with and the next ones get the new data. The cached figures 
+    of the countries whose rows changed are dropped, every other cached figure keeps its key and stays cached.
+
+    Arguments:
+        snapshot (hotreload.DataSnapshot): the reloaded data, from hotreload.build_snapshot.
+    
+    Output:
+        (int): the number of countries whose rows changed, 0 if none did, in which case the current data is kept.
+    """
+    global data
+    previous = data
+    changed = hotreload.get_changed_countries(previous, snapshot)
+    if not changed:
+        return 0
+    data = snapshot
+
+    # The keys of the changed countries' figures (and of the event study, if any country changed) are no longer 
+    # used, so drop their figures now instead of waiting for them to be evicted
+    figure_cache.discard(set(get_figure_keys(previous)) - set(get_figure_keys(snapshot)))
+
+    # Build the rate matrix of the new data here, rather than in the first request that needs it
+    conversion.get_rate_matrix(snapshot.rate_index, snapshot.exchange_data_version)
+
+    return len(changed)
+
+def publish_data(app: Dash, 
+                 clientside_mode: bool,
+                 snapshot: hotreload.DataSnapshot) -> int:
+    """
+    Swap in a reloaded snapshot of the data (see swap_data), and rebuild the app's layout from it, so new pages show 
+    the new default figures and dropdown options. Called by the hotreload.DataWatcher of create_app.
 
-def make_line_fig(price_country: str = "United States of America") -> plots.go.Figure:
+    Arguments:
+        app (Dash): the app serving the data.
+        clientside_mode (bool): whether the app runs the clientside callbacks, which need the exchange data encoded 
+                                again.
+        snapshot (hotreload.DataSnapshot): the reloaded data, from hotreload.build_snapshot.
+    
+    Output:
+        (int): the number of countries whose rows changed, 0 if none did and nothing was swapped.
+    """
+    changed = swap_data(snapshot)
+    if changed:
+        create_layout(app, get_clientside_data(snapshot) if clientside_mode else None)
+    return changed
+
+def get_figure_keys(snapshot: hotreload.DataSnapshot) -> list:
+    """
+    Helper function that lists the figure cache keys of every cacheable figure of a snapshot's data.
+
+    """
+    keys = []
+    for country in snapshot.exchange_partitions.keys() | snapshot.crisis_partitions.keys():
+        keys += [get_line_key(country, snapshot), get_timeline_key(country, snapshot)]
+        keys += [get_real_line_key(country, base_year, snapshot) for base_year in realrates.BASE_YEARS]
+    for event_type in plots.EVENTS:
+        keys += [get_event_study_key(event_type, window, snapshot) for window in eventstudy.WINDOW_OPTIONS]
+    return keys
+
+@metrics.timed('basicpage.make_line_fig')
+def make_line_fig(price_country: str = "United States of America",
+                  snapshot: hotreload.DataSnapshot = None) -> plots.go.Figure:
     """
     Given a country, gather the years and the exchange rate data use that to create the figure.
 
     Arguments:
         price_country (str): the country selected, associated with the exchange rate line graph, defaulting
                              to the USA for a baseline.
+        snapshot (hotreload.DataSnapshot): the data to build the figure from, defaults to None for the current data.
     
     Output:
         fig (plots.go.Figure): the Plotly line graph figure object that will be displayed in the app. 
     """
     # Get the exchange rate data (x is the years, y is the exchange rates) for the selected country
-    x, y = analysis.get_country_exchange_data(exchange_df, price_country)
+    snapshot = snapshot or data
+    x, y = analysis.get_country_exchange_data(snapshot.exchange_df, price_country, snapshot.exchange_partitions)
     fig = plots.plotly_line(x, y)
 
     # Set margins
@@ -61,34 +271,75 @@ def make_line_fig(price_country: str = "United States of America") -> plots.go.F
 
     return fig
 
-def make_timeline_fig(crisis_country: str = "United States of America") -> plots.go.Figure:
+def make_no_data_fig(title_text: str) -> plots.go.Figure:
+    """
+    Helper function that builds the empty placeholder figure shown in place of a figure with no data, with the 
+    reason as its title.
+
+    """
+    fig = plots.go.Figure()
+    fig.update_layout(
+        title_text=title_text,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(24,34,37,0.7)',
+        font=dict(color='#b59e5f'),
+        xaxis=dict(visible=False),
+        yaxis=dict(visible=False),
+        height=600
+    )
+    return fig
+
+@metrics.timed('basicpage.make_real_line_fig')
+def make_real_line_fig(price_country: str = "United States of America", 
+                       base_year: int = realrates.DEFAULT_BASE_YEAR,
+                       snapshot: hotreload.DataSnapshot = None) -> plots.go.Figure:
+    """
+    Given a country and a base year, look up the years and the real exchange rates in that year's prices, and use 
+    them to create the figure.
+
+    Arguments:
+        price_country (str): the country selected, defaulting to the USA for a baseline.
+        base_year (int): the year whose prices the exchange rates are shown in, one of realrates.BASE_YEARS.
+        snapshot (hotreload.DataSnapshot): the data to build the figure from, defaults to None for the current data.
+    
+    Output:
+        fig (plots.go.Figure): the Plotly line graph figure object that will be displayed in the app. 
+    """
+    # Countries without inflation data, or whose price index doesn't reach the base year, have no real rates
+    snapshot = snapshot or data
+    x, y = realrates.get_country_real_data(snapshot.real_rates, snapshot.exchange_df, price_country, base_year, 
+                                           snapshot.exchange_partitions)
+    if price_country not in snapshot.real_rates.countries or pd.isna(y).all():
+        return make_no_data_fig(f"No inflation data to adjust {price_country}'s rates to {base_year} prices")
+
+    fig = plots.plotly_line(x, y)
+    fig.update_layout(margin=dict(t=3, b=30, l=30, r=30),
+                      yaxis_title=f"Real Exchange Rate (relative to USD, {base_year} prices)")
+
+    return fig
+
+@metrics.timed('basicpage.make_timeline_fig')
+def make_timeline_fig(crisis_country: str = "United States of America",
+                      snapshot: hotreload.DataSnapshot = None) -> plots.go.Figure:
     """
     Given a country, gather the years and the crisis data use that to create the figure.
 
     Arguments:
         crisis_country (str): the country selected, associated with the crisis scatter graph, defaulting
                               to the USA for a baseline.
+        snapshot (hotreload.DataSnapshot): the data to build the figure from, defaults to None for the current data.
     
     Output:
         fig (plots.go.Figure): the Plotly scatter graph figure object that will be displayed in the app. 
     """
     # Get the historical crisis/events dataframe for the selected country
-    subset_crisis_df = analysis.get_country_crisis_data(crisis_df, crisis_country)
+    snapshot = snapshot or data
+    subset_crisis_df = analysis.get_country_crisis_data(snapshot.crisis_df, crisis_country, snapshot.crisis_partitions)
 
     # Hong Kong, Europe, and Israel have exchange rate data but not crisis data
     # Return an empty placeholder figure if no crisis data exists for the selected country
     if subset_crisis_df.empty:
-        fig = plots.go.Figure()
-        fig.update_layout(
-            title_text=f"No crisis data available for {crisis_country}",
-            paper_bgcolor='rgba(0,0,0,0)',
-            plot_bgcolor='rgba(24,34,37,0.7)',
-            font=dict(color='#b59e5f'),
-            xaxis=dict(visible=False),
-            yaxis=dict(visible=False),
-            height=600
-        )
-        return fig
+        return make_no_data_fig(f"No crisis data available for {crisis_country}")
     
     # Generate the scatter plot using the crisis data
     fig = plots.plotly_scatter(subset_crisis_df)
@@ -96,20 +347,491 @@ def make_timeline_fig(crisis_country: str = "United States of America") -> plots
 
     return fig
 
+def get_line_key(price_country: str,
+                 snapshot: hotreload.DataSnapshot = None) -> tuple:
+    """
+    Helper function that builds the figure cache key of a country's line graph, which changes with its data.
+
+    """
+    snapshot = snapshot or data
+    return ("line", price_country, snapshot.exchange_versions.get(price_country))
+
+def get_timeline_key(crisis_country: str,
+                     snapshot: hotreload.DataSnapshot = None) -> tuple:
+    """
+    Helper function that builds the figure cache key of a country's timeline, which changes with its data.
+
+    """
+    snapshot = snapshot or data
+    return ("timeline", crisis_country, snapshot.crisis_versions.get(crisis_country))
+
+def get_real_line_key(price_country: str, 
+                      base_year: int,
+                      snapshot: hotreload.DataSnapshot = None) -> tuple:
+    """
+    Helper function that builds the figure cache key of a country's real rate line graph, which changes with its 
+    exchange and inflation data, and the US inflation data.
+
+    """
+    snapshot = snapshot or data
+    return ("real-line", price_country, base_year, snapshot.exchange_versions.get(price_country), 
+            snapshot.inflation_versions.get(price_country), snapshot.inflation_versions.get(realrates.USD_COUNTRY))
+
+def get_line_fig(price_country: str = "United States of America") -> dict:
+    """
+    Given a country, get its exchange rate line graph figure from the figure cache, building it on a miss.
+
+    Arguments:
+        price_country (str): the country selected, defaulting to the USA for a baseline.
+    
+    Output:
+        (dict): a copy of the cached line graph figure dict, which can be modified freely.
+    """
+    # Key and build the figure from the same data, which a reload may swap in between
+    snapshot = data
+    return figure_cache.get(get_line_key(price_country, snapshot), lambda: make_line_fig(price_country, snapshot))
+
+def get_real_line_fig(price_country: str = "United States of America", 
+                      base_year: int = realrates.DEFAULT_BASE_YEAR) -> dict:
+    """
+    Given a country and a base year, get its real exchange rate line graph figure from the figure cache, building it 
+    on a miss.
+
+    Arguments:
+        price_country (str): the country selected, defaulting to the USA for a baseline.
+        base_year (int): the year whose prices the exchange rates are shown in, one of realrates.BASE_YEARS.
+    
+    Output:
+        (dict): a copy of the cached line graph figure dict, which can be modified freely.
+    """
+    snapshot = data
+    return figure_cache.get(get_real_line_key(price_country, base_year, snapshot), 
+                            lambda: make_real_line_fig(price_country, base_year, snapshot))
+
+def get_timeline_fig(crisis_country: str = "United States of America") -> dict:
+    """
+    Given a country, get its historical crisis timeline figure from the figure cache, building it on a miss.
+
+    Arguments:
+        crisis_country (str): the country selected, defaulting to the USA for a baseline.
+    
+    Output:
+        (dict): a copy of the cached timeline figure dict, which can be modified freely.
+    """
+    snapshot = data
+    return figure_cache.get(get_timeline_key(crisis_country, snapshot), 
+                            lambda: make_timeline_fig(crisis_country, snapshot))
+
+@metrics.timed('basicpage.make_overlay_fig')
+def make_overlay_fig(countries: list, 
+                     log_scale: bool = False, 
+                     x_range: tuple = None,
+                     snapshot: hotreload.DataSnapshot = None) -> plots.go.Figure:
+    """
+    Given several countries, gather each one's years and exchange rate data and overlay them on one figure.
+
+    Arguments:
+        countries (list): the countries selected, in the order to draw them.
+        log_scale (bool): whether to show the exchange rates on a log scale, defaults to False.
+        x_range (tuple): the (first, last) years the user has zoomed in on, defaults to None for all years.
+        snapshot (hotreload.DataSnapshot): the data to build the figure from, defaults to None for the current data.
+    
+    Output:
+        fig (plots.go.Figure): the Plotly overlay line graph figure object that will be displayed in the app. 
+    """
+    snapshot = snapshot or data
+    series = {country: analysis.get_country_exchange_data(snapshot.exchange_df, country, snapshot.exchange_partitions) 
+              for country in countries if country in snapshot.exchange_partitions}
+    return plots.plotly_overlay(series, log_scale=log_scale, x_range=x_range)
+
+def get_overlay_fig(countries: list, 
+                    log_scale: bool = False, 
+                    x_range: tuple = None) -> dict:
+    """
+    Given several countries, build their overlay figure as a dict ready to send, encoded like the cached figures. 
+    Overlay figures aren't cached, there is one for every combination of countries, scale and zoom.
+
+    Arguments:
+        countries (list): the countries selected, in the order to draw them.
+        log_scale (bool): whether to show the exchange rates on a log scale, defaults to False.
+        x_range (tuple): the (first, last) years the user has zoomed in on, defaults to None for all years.
+    
+    Output:
+        (dict): the overlay figure dict.
+    """
+    return json.loads(encode_figure(make_overlay_fig(countries, log_scale, x_range)))
+
+def get_relayout_x_range(relayout_data: dict):
+    """
+    Helper function that reads the visible years out of the overlay chart's relayoutData after the user zooms or pans.
+
+    Arguments:
+        relayout_data (dict): the relayoutData of the overlay-figure graph.
+    
+    Output:
+        (tuple | None | bool): the (first, last) visible years, None if the user reset the zoom, or False if the 
+                               change wasn't to the visible years.
+    """
+    relayout_data = relayout_data or {}
+    if relayout_data.get("xaxis.autorange"):
+        return None
+    if "xaxis.range[0]" in relayout_data and "xaxis.range[1]" in relayout_data:
+        return relayout_data["xaxis.range[0]"], relayout_data["xaxis.range[1]"]
+    if "xaxis.range" in relayout_data:
+        return tuple(relayout_data["xaxis.range"])
+    return False
+
+def get_event_study(snapshot: hotreload.DataSnapshot = None) -> eventstudy.EventStudy:
+    """
+    Get the crisis event study of the current data, which is built on the first call and again after a data change.
+
+    Arguments:
+        snapshot (hotreload.DataSnapshot): the data to get the study of, defaults to None for the current data.
+
+    Output:
+        (eventstudy.EventStudy): every crisis event aligned with its country's exchange rates.
+    """
+    snapshot = snapshot or data
+    matrix = conversion.get_rate_matrix(snapshot.rate_index, snapshot.exchange_data_version)
+    return eventstudy.get_event_study(snapshot.exchange_df, snapshot.crisis_df, matrix, 
+                                      (snapshot.exchange_data_version, snapshot.crisis_data_version))
+
+def get_event_types(snapshot: hotreload.DataSnapshot = None) -> list:
+    """
+    Get the event types the event study has events for, in the order of the timeline's event types.
+
+    Arguments:
+        snapshot (hotreload.DataSnapshot): the data to get the event types of, defaults to None for the current data.
+
+    Output:
+        (list): the event types, the options of the select-event-type dropdown.
+    """
+    aligned = set(get_event_study(snapshot).events['event'])
+    return [event for event in plots.EVENTS if event in aligned]
+
+@metrics.timed('basicpage.make_event_study_fig')
+def make_event_study_fig(event_type: str, 
+                         window: int = eventstudy.DEFAULT_WINDOW,
+                         snapshot: hotreload.DataSnapshot = None) -> plots.go.Figure:
+    """
+    Given an event type and window, gather its response curve across all countries and use that to create the figure.
+
+    Arguments:
+        event_type (str): the event type selected, ex. "Banking Crisis".
+        window (int): the number of years before and after the event to show.
+        snapshot (hotreload.DataSnapshot): the data to build the figure from, defaults to None for the current data.
+    
+    Output:
+        fig (plots.go.Figure): the Plotly line graph figure object that will be displayed in the app. 
+    """
+    curve = eventstudy.get_response_curve(get_event_study(snapshot), event_type, window)
+    return plots.plotly_event_study(curve, event_type)
+
+def get_event_study_key(event_type: str, 
+                        window: int,
+                        snapshot: hotreload.DataSnapshot = None) -> tuple:
+    """
+    Helper function that builds the figure cache key of an event study figure, which changes with the exchange or 
+    crisis data. It is the version of the event study (see get_event_study), without building the study.
+
+    """
+    snapshot = snapshot or data
+    return ("event-study", event_type, window, (snapshot.exchange_data_version, snapshot.crisis_data_version))
+
+def get_event_study_fig(event_type: str, 
+                        window: int = eventstudy.DEFAULT_WINDOW) -> dict:
+    """
+    Given an event type and window, get its event study figure from the figure cache, building it on a miss.
+
+    Arguments:
+        event_type (str): the event type selected, ex. "Banking Crisis".
+        window (int): the number of years before and after the event to show.
+    
+    Output:
+        (dict): a copy of the cached event study figure dict, which can be modified freely.
+    """
+    snapshot = data
+    return figure_cache.get(get_event_study_key(event_type, window, snapshot), 
+                            lambda: make_event_study_fig(event_type, window, snapshot))
+
+def prewarm_figure_cache() -> None:
+    """
+    Build and cache the line graph and timeline figures for every country in the exchange data, which are all the 
+    countries the user can select, their real rate line graphs in the default base year's prices if there is 
+    inflation data, and the event study figure of every event type and window.
+
+    """
+    snapshot = data
+    for country in snapshot.exchange_partitions:
+        get_line_fig(country)
+        get_timeline_fig(country)
+        if snapshot.real_rates.countries:
+            get_real_line_fig(country, realrates.DEFAULT_BASE_YEAR)
+
+    for event_type in get_event_types():
+        for window in eventstudy.WINDOW_OPTIONS:
+            get_event_study_fig(event_type, window)
+
+    return None
+
+def build_default_layout(snapshot: hotreload.DataSnapshot = None) -> tuple:
+    """
+    Build the figures and dropdown options the page shows before the user selects anything, which are saved to disk
+    by python -m src.layoutcache so the app can start without building them.
+
+    Arguments:
+        snapshot (hotreload.DataSnapshot): the data to build them from, defaults to None for the current data.
+
+    Output:
+        (tuple): the dictionary of figure name to its serialized figure, and the dictionary of dropdown name to its 
+                 options.
+    """
+    snapshot = snapshot or data
+    figures = {"line": encode_figure(make_line_fig(DEFAULT_COUNTRY, snapshot)),
+               "timeline": encode_figure(make_timeline_fig(DEFAULT_COUNTRY, snapshot)),
+               "overlay": encode_figure(make_overlay_fig(DEFAULT_OVERLAY_COUNTRIES, DEFAULT_OVERLAY_SCALE == "log", 
+                                                         snapshot=snapshot)),
+               "event-study": encode_figure(make_event_study_fig(DEFAULT_EVENT_TYPE, eventstudy.DEFAULT_WINDOW, 
+                                                                 snapshot))}
+
+    options = {"country": snapshot.exchange_df['country'].unique().tolist(),
+               "currency": snapshot.exchange_df['currency_name'].unique().tolist(),
+               "convert-to": get_convert_to_options(snapshot),
+               "event-type": get_event_types(snapshot)}
+
+    return figures, options
+
+def get_default_layout(snapshot: hotreload.DataSnapshot = None) -> tuple:
+    """
+    Get the figures and dropdown options the page shows before the user selects anything, from the layout saved by 
+    python -m src.layoutcache if it was built from the same data and code, otherwise by building them. The figures 
+    the callbacks cache are put into the figure cache, so the first requests for them are hits either way.
+
+    Arguments:
+        snapshot (hotreload.DataSnapshot): the data to get them for, defaults to None for the current data.
+
+    Output:
+        (tuple): the dictionary of figure name to its figure dict, and the dictionary of dropdown name to its options.
+    """
+    snapshot = snapshot or data
+    saved = layoutcache.load_default_layout(snapshot.layout_stamp)
+    if saved is not None:
+        figures, options = saved['figures'], saved['options']
+    else:
+        figures, options = build_default_layout(snapshot)
+
+    # Seed the figure cache under this process's keys, the data versions in them differ between processes
+    cache_keys = {"line": get_line_key(DEFAULT_COUNTRY, snapshot),
+                  "timeline": get_timeline_key(DEFAULT_COUNTRY, snapshot),
+                  "event-study": get_event_study_key(DEFAULT_EVENT_TYPE, eventstudy.DEFAULT_WINDOW, snapshot)}
+    for name, key in cache_keys.items():
+        figure_cache.put(key, figures[name])
+
+    return {name: json.loads(fig_json) for name, fig_json in figures.items()}, options
+
+def preload() -> None:
+    """
+    Build everything the requests need before a multi-worker server (ex. gunicorn --preload) forks its workers, so
+    each worker starts with the data, the indexes and the figures already built in memory shared with the others 
+    instead of building its own copy. Call it once, after the app is created and before the fork.
+
+    """
+    # Build the figure of every country, the cache holds them as strings, which workers read without copying
+    prewarm_figure_cache()
+
+    # Build the hash tables behind the indexes, which are otherwise built lazily by each worker's first lookup
+    snapshot = data
+    analysis.get_exchange_rate_val(snapshot.exchange_df, DEFAULT_COUNTRY, "", 0, snapshot.rate_index)
+    analysis.get_exchange_rate_estimate(snapshot.filled_rate_index, DEFAULT_COUNTRY, "", 0)
+    conversion.get_rate_matrix(snapshot.rate_index, snapshot.exchange_data_version).currencies.get_indexer([])
+    snapshot.currency_stats.summary.index.get_indexer([])
+
+    # Move every object built so far out of the garbage collector's reach, since a collection in a worker would
+    # otherwise write to the header of each of them and copy all of their memory pages into that worker
+    gc.collect()
+    gc.freeze()
+
+    return None
+
+def get_figure_cache_metrics() -> list:
+    """
+    Get the figure cache counters to export with the metrics.
+
+    Output:
+        (list): the (name, type, help, value) samples, see metrics.render.
+    """
+    stats = figure_cache.stats()
+    return [('figure_cache_hits_total', 'counter', 'Figure cache lookups that found the figure.', stats['hits']),
+            ('figure_cache_misses_total', 'counter', 'Figure cache lookups that built the figure.', stats['misses']),
+            ('figure_cache_evictions_total', 'counter', 'Figures evicted from the cache.', stats['evictions']),
+            ('figure_cache_size', 'gauge', 'Figures in the cache.', stats['size'])]
+
+def get_background_metrics(background_manager: background.LocalManager) -> list:
+    """
+    Get the background job counters to export with the metrics.
+
+    Arguments:
+        background_manager (background.LocalManager): the manager running the background callbacks.
+
+    Output:
+        (list): the (name, type, help, value) samples, see metrics.render.
+    """
+    stats = background_manager.stats()
+    return [('background_jobs_started_total', 'counter', 'Background callback jobs started.', stats['started']),
+            ('background_jobs_coalesced_total', 'counter', 'Background callback requests that joined a job with '
+             'the same arguments instead of starting one.', stats['coalesced']),
+            ('background_jobs_cancelled_total', 'counter', 'Background callback jobs cancelled by every request '
+             'waiting on them.', stats['cancelled']),
+            ('background_jobs_running', 'gauge', 'Background callback jobs queued or running.', stats['running'])]
+
+def get_reload_metrics(watcher: hotreload.DataWatcher) -> list:
+    """
+    Get the data reload counters and timings to export with the metrics.
+
+    Arguments:
+        watcher (hotreload.DataWatcher): the watcher reloading the data.
+
+    Output:
+        (list): the (name, type, help, value) samples, see metrics.render.
+    """
+    stats = watcher.stats()
+    return [('data_reloads_total', 'counter', 'Reloads of the data after a change of the data files.', 
+             stats['reloads']),
+            ('data_swaps_total', 'counter', 'Reloaded data swapped in for the data being served.', stats['swaps']),
+            ('data_reload_failures_total', 'counter', 'Reloads of the data that failed.', stats['failures']),
+            ('data_reload_seconds_total', 'counter', 'Time spent reloading the data.', 
+             stats['total_reload_seconds']),
+            ('data_last_reload_seconds', 'gauge', 'Time the last reload of the data took.', 
+             stats['last_reload_seconds']),
+            ('data_last_reload_changed_countries', 'gauge', 'Countries whose rows changed in the last reload.', 
+             stats['last_changed_countries'])]
+
+def get_convert_to_options(snapshot: hotreload.DataSnapshot = None) -> list:
+    """
+    Get the select-convert-to dropdown options, one for every currency of every country in the exchange data.
+
+    Arguments:
+        snapshot (hotreload.DataSnapshot): the data to get the options of, defaults to None for the current data.
+
+    Output:
+        (list): the list of {"label": "currency (country)", "value": "country|currency"} options.
+    """
+    snapshot = snapshot or data
+    matrix = conversion.get_rate_matrix(snapshot.rate_index, snapshot.exchange_data_version)
+    return [{"label": f"{currency} ({country})", "value": f"{country}{CONVERT_TO_SEPARATOR}{currency}"} 
+            for country, currency in matrix.currencies]
+
+def format_change(value: float) -> str:
+    """
+    Helper function that formats a % change for the stats panel and the ranking, with its sign.
+
+    """
+    if value is None or pd.isna(value):
+        return "n/a"
+    return f"{value:+.1f}%"
+
+def make_stats_panel(country: str = "United States of America") -> html.Table:
+    """
+    Given a country, build the stats panel shown under its exchange rate line graph: one row of analytics per 
+    currency, in the order of the select-currency dropdown.
+
+    Arguments:
+        country (str): the country selected, defaulting to the USA for a baseline.
+    
+    Output:
+        (html.Table): the table of each currency's years, largest drawdown, worst year, and latest change and 
+                      volatility.
+    """
+    header = html.Tr([html.Th(column) for column in ("Currency", "Largest drawdown", "Worst year", 
+                                                     "Latest change", f"{timeseries.VOLATILITY_WINDOW}-year volatility")])
+    rows = []
+    snapshot = data
+    for option in snapshot.currency_options.get(country, []):
+        summary = timeseries.get_currency_summary(snapshot.currency_stats, country, option["value"])
+        if not summary:
+            continue
+
+        # A currency with a single year of data has no drawdown, change or volatility to show
+        drawdown = "n/a"
+        if summary["drawdown_trough_year"] is not None and summary["max_drawdown"] > 0:
+            drawdown = (f"{format_change(-summary['max_drawdown'])} "
+                        f"({summary['drawdown_peak_year']}-{summary['drawdown_trough_year']})")
+        worst = "n/a"
+        if summary["worst_year"] is not None:
+            worst = f"{format_change(summary['worst_change'])} ({summary['worst_year']})"
+        volatility = "n/a" if summary["latest_volatility"] is None else f"{summary['latest_volatility']:.1f}%"
+
+        rows.append(html.Tr([html.Td(option["label"]), html.Td(drawdown), html.Td(worst), 
+                             html.Td(format_change(summary["latest_change"])), html.Td(volatility)]))
+    
+    return html.Table([header] + rows, className='stats_table')
+
+def make_ranking_table(start_year: str, 
+                       end_year: str,
+                       set_progress=None) -> html.Div:
+    """
+    Rank every currency by the value it lost against the USD between two years, and build the ranking table.
+
+    Arguments:
+        start_year (str): the first year of the period, from the rank-start-year textbox.
+        end_year (str): the last year of the period, from the rank-end-year textbox.
+        set_progress (callable): called with the (steps done, RANKING_STEPS) progress when run as a background 
+                                 callback, defaults to None.
+    
+    Output:
+        (html.Div): the ranking table with its caption, or a message if the years aren't valid.
+    """
+    try:
+        start_year, end_year = int(start_year), int(end_year)
+    except (TypeError, ValueError):
+        return html.Div("Please enter a valid four-digit start and end year.")
+    if start_year >= end_year:
+        return html.Div("Please enter a start year before the end year.")
+
+    if set_progress is not None:
+        set_progress((0, RANKING_STEPS))
+    snapshot = data
+    matrix = conversion.get_rate_matrix(snapshot.rate_index, snapshot.exchange_data_version)
+
+    if set_progress is not None:
+        set_progress((1, RANKING_STEPS))
+    ranking = timeseries.rank_devaluations(matrix, start_year, end_year)
+    if ranking.empty:
+        return html.Div(f"No currency has data for two or more years between {start_year} and {end_year}.")
+    
+    if set_progress is not None:
+        set_progress((2, RANKING_STEPS))
+    header = html.Tr([html.Th(column) for column in ("Rank", "Currency", "Years", "Change in USD value")])
+    rows = [html.Tr([html.Td(rank), html.Td(f"{currency} ({country})"), html.Td(f"{from_year}-{to_year}"), 
+                     html.Td(format_change(change))])
+            for rank, (country, currency, from_year, to_year, change) 
+            in enumerate(zip(ranking['country'].tolist(), ranking['currency_name'].tolist(), 
+                             ranking['from_year'].tolist(), ranking['to_year'].tolist(), 
+                             ranking['change'].tolist()), start=1)]
+
+    return html.Div([html.P(f"{len(ranking)} currencies with data between {start_year} and {end_year}, "
+                            f"largest devaluation first:"),
+                     html.Table([header] + rows, className='stats_table')])
+
 # image credits:
 # https://www.vecteezy.com/png/12634764-art-deco-outline-stroke-in-golden-color-for-classy-and-luxury-style-premium-vintage-line-art-design-element 
-def create_layout(app: Dash) -> None:
+def create_layout(app: Dash, 
+                  exchange_data: dict = None) -> None:
     """
     Create the layout for the Dash app.
 
     Arguments:
         app (Dash): the app whose layout attribute will be this created layout.
+        exchange_data (dict): the exchange data encoded by clientside.encode_exchange_data, embedded in the page 
+                              for the clientside callbacks if given.
     
     """
-    # Get the list of countries and currencies from the exchange_df dataframe
-    # and convert them to lists for the dropdown options
-    country_list = exchange_df['country'].unique().tolist()
-    currency_list = exchange_df['currency_name'].unique().tolist()
+    # Get the default figures and the dropdown options (the lists of countries, currencies and event types), 
+    # read from disk if they were built ahead of time
+    snapshot = data
+    figures, options = get_default_layout(snapshot)
+    country_list = options["country"]
+    currency_list = options["currency"]
 
     # Create the layout for the app
     layout = html.Div(id='main-div',
@@ -177,6 +899,28 @@ def create_layout(app: Dash) -> None:
                                                                  maxLength = 4, 
                                                                  minLength =4),
 
+                                                    dcc.Input(id='select-amount',
+                                                              type='number',
+                                                              placeholder='Amount (1)...',
+                                                              style={'width': '110px',
+                                                                     'height': '35px',
+                                                                     'marginLeft': '10px',
+                                                                     'paddingLeft': '5px',
+                                                                     'boxSizing': 'border-box',
+                                                                     'fontFamily': 'Unica One',
+                                                                     'backgroundColor': '#182225',
+                                                                     'color': '#FFFFFF'}),
+
+                                                    dcc.Dropdown(options = options["convert-to"],
+                                                                 id='select-convert-to', 
+                                                                 placeholder = 'Convert to..',
+                                                                 style={'backgroundColor': '#182225',
+                                                                        'color': '#b59e5f',
+                                                                        'width': '300px', 
+                                                                        'fontFamily': 'Unica One',
+                                                                        'marginLeft': '10px',
+                                                                        'marginRight': '10px'}),
+
                                                     html.Button('Estimate Exchange Rate!', 
                                                                 id='submit-val', 
                                                                 n_clicks=0,
@@ -210,7 +954,7 @@ def create_layout(app: Dash) -> None:
                                                      n_clicks=0, 
                                                      className = "popover-icon"),
 
-                                          dbc.Popover([dbc.PopoverBody("Note: the values shown here are nominal exchange rates, which means that inflation and consumer pricing index is not accounted for. The comparison to the USD in the exchange rate refers to the contemporaneous USD.")],
+                                          dbc.Popover([dbc.PopoverBody("Note: the values shown here are nominal exchange rates, which means that inflation and consumer pricing index is not accounted for. The comparison to the USD in the exchange rate refers to the contemporaneous USD. Switch the line graph to Real to adjust its rates for the inflation of both countries, in the consumer prices of the chosen base year.")],
                                                                        target="note-nominal-er",
                                                                        trigger="hover")
                                 ],
@@ -227,7 +971,40 @@ def create_layout(app: Dash) -> None:
                                                                                  "(Compared to the USD)"], 
                                                                      style={'textAlign': 'center'}),
 
-                                                            dcc.Graph(id='line-figure', figure=make_line_fig()),
+                                                            # Nominal or real (inflation-adjusted) exchange rates, real 
+                                                            # only if there is inflation data, in a base year's prices
+                                                            html.Div([dcc.RadioItems(options=[{"label": "Nominal", "value": "nominal"}, 
+                                                                                              {"label": "Real", "value": "real", 
+                                                                                               "disabled": not snapshot.real_rates.countries}],
+                                                                                     value="nominal",
+                                                                                     id='select-rate-mode',
+                                                                                     inline=True,
+                                                                                     style={'fontFamily': 'Unica One', 
+                                                                                            'marginRight': '10px'}),
+
+                                                                      dcc.Dropdown(options=[{"label": f"{year} prices", "value": year} 
+                                                                                            for year in realrates.BASE_YEARS],
+                                                                                   value=realrates.DEFAULT_BASE_YEAR,
+                                                                                   id='select-base-year',
+                                                                                   clearable=False,
+                                                                                   disabled=not snapshot.real_rates.countries,
+                                                                                   style={'backgroundColor': '#182225',
+                                                                                          'color': '#b59e5f',
+                                                                                          'fontFamily': 'Unica One',
+                                                                                          'width': '150px'})
+                                                            ],
+                                                                     style={'display': 'flex', 
+                                                                            'flexDirection': 'row', 
+                                                                            'alignItems': 'center',
+                                                                            'justifyContent': 'center'}
+                                                            ),
+
+                                                            dcc.Graph(id='line-figure', figure=figures["line"]),
+
+                                                            # Analytics of each of the country's currencies
+                                                            html.Div(id='stats-panel', 
+                                                                     children=make_stats_panel(DEFAULT_COUNTRY),
+                                                                     style={'padding': '8px'}),
                                                     ], 
                                                     style={'flex': '1', 'display': 'inline-block', 'border': '1px solid #b59e5f'}
                                                     ),
@@ -236,7 +1013,7 @@ def create_layout(app: Dash) -> None:
                                                                     children = ["Timeline of Historical Events in United States of America"],
                                                                     style = {'textAlign':'center'}),
 
-                                                            dcc.Graph(id='timeline-figure', figure= make_timeline_fig())
+                                                            dcc.Graph(id='timeline-figure', figure=figures["timeline"])
                                                   ], 
                                                             style={'flex': '1','display': 'inline-block', 'border': '1px solid #b59e5f'}
                                                   )   
@@ -257,6 +1034,143 @@ def create_layout(app: Dash) -> None:
                                 ],
                                           style={'padding':'8px'}
                                 ),
+                                # Div for the overlay chart, comparing the exchange rates of several countries
+                                html.Div([html.H3("Compare Exchange Rates:", 
+                                                  style={"textDecoration": "underline"}),
+
+                                          html.Div([dcc.Dropdown(options = country_list, 
+                                                                 value = DEFAULT_OVERLAY_COUNTRIES,
+                                                                 multi = True,
+                                                                 id='select-overlay', 
+                                                                 placeholder = 'Select countries to compare..',
+                                                                 style={'backgroundColor': '#182225',
+                                                                        'color': '#b59e5f',
+                                                                        'fontFamily': 'Unica One',
+                                                                        'width': '600px', 
+                                                                        'marginRight': '10px'}),
+
+                                                    dcc.RadioItems(options = [{"label": "Linear", "value": "linear"}, 
+                                                                              {"label": "Log scale", "value": "log"}],
+                                                                   value = DEFAULT_OVERLAY_SCALE,
+                                                                   id='overlay-scale', 
+                                                                   inline=True,
+                                                                   inputStyle={'marginRight': '5px', 'marginLeft': '10px'})
+                                          ], 
+                                                   style = {'display': 'flex', 
+                                                            'flexDirection': 'row', 
+                                                            'alignItems': 'center',
+                                                            'justifyContent': 'flex-start'}
+                                          ),
+
+                                          dcc.Graph(id='overlay-figure', 
+                                                    figure=figures["overlay"])
+                                ],
+                                         style={'padding': '8px', 'border': '1px solid #b59e5f', 'marginBottom': '8px'}
+                                ),
+
+                                # Div for the event study, the average exchange rate response to a type of event 
+                                # across every country, for a chosen number of years around it
+                                html.Div([html.H3("Exchange Rates Around Historical Events:", 
+                                                  style={"textDecoration": "underline"}),
+
+                                          html.Div([dcc.Dropdown(options = options["event-type"],
+                                                                 value = DEFAULT_EVENT_TYPE,
+                                                                 id='select-event-type', 
+                                                                 clearable=False,
+                                                                 style={'backgroundColor': '#182225',
+                                                                        'color': '#b59e5f',
+                                                                        'fontFamily': 'Unica One',
+                                                                        'width': '300px', 
+                                                                        'marginRight': '10px'}),
+
+                                                    dcc.Dropdown(options = [{"label": f"±{window} years", "value": window} 
+                                                                            for window in eventstudy.WINDOW_OPTIONS],
+                                                                 value = eventstudy.DEFAULT_WINDOW,
+                                                                 id='select-event-window', 
+                                                                 clearable=False,
+                                                                 style={'backgroundColor': '#182225',
+                                                                        'color': '#b59e5f',
+                                                                        'fontFamily': 'Unica One',
+                                                                        'width': '150px'})
+                                          ], 
+                                                   style = {'display': 'flex', 
+                                                            'flexDirection': 'row', 
+                                                            'justifyContent': 'flex-start'}
+                                          ),
+
+                                          # Shown while the figure is built in the background
+                                          html.Progress(id='event-study-progress', 
+                                                        className='background_progress', 
+                                                        style=HIDDEN),
+
+                                          dcc.Graph(id='event-study-figure', 
+                                                    figure=figures["event-study"])
+                                ],
+                                         style={'padding': '8px', 'border': '1px solid #b59e5f'}
+                                ),
+
+                                # Div for ranking every currency by its devaluation against the USD over a period
+                                html.Div([html.H3("Rank Currencies by Devaluation:", 
+                                                  style={"textDecoration": "underline"}),
+
+                                          html.Div([dcc.Textarea(id='rank-start-year',
+                                                                 style={'height':'35px',
+                                                                        'paddingTop': '8px',
+                                                                        'paddingLeft': '5px',
+                                                                        'boxSizing': 'border-box',
+                                                                        'fontFamily': 'Unica One', 
+                                                                        'backgroundColor': '#182225',
+                                                                        'color': '#FFFFFF',
+                                                                        'marginRight': '10px'},
+                                                                 placeholder = 'From year...', 
+                                                                 maxLength = 4),
+
+                                                    dcc.Textarea(id='rank-end-year',
+                                                                 style={'height':'35px',
+                                                                        'paddingTop': '8px',
+                                                                        'paddingLeft': '5px',
+                                                                        'boxSizing': 'border-box',
+                                                                        'fontFamily': 'Unica One', 
+                                                                        'backgroundColor': '#182225',
+                                                                        'color': '#FFFFFF'},
+                                                                 placeholder = 'To year...', 
+                                                                 maxLength = 4),
+
+                                                    html.Button('Rank!', 
+                                                                id='rank-button', 
+                                                                n_clicks=0,
+                                                                className='button_style'),
+
+                                                    # Shown while the ranking is built in the background
+                                                    html.Button('Cancel', 
+                                                                id='rank-cancel-button', 
+                                                                n_clicks=0,
+                                                                className='button_style',
+                                                                style=HIDDEN)
+                                          ], 
+                                                   style = {'display': 'flex', 
+                                                            'flexDirection': 'row', 
+                                                            'justifyContent': 'flex-start'}
+                                          ),
+
+                                          html.Progress(id='rank-progress', 
+                                                        value=0, 
+                                                        max=RANKING_STEPS, 
+                                                        className='background_progress', 
+                                                        style=HIDDEN),
+
+                                          html.Div(id='rank-output', 
+                                                   style={'maxHeight': '400px', 'overflowY': 'auto', 'padding': '8px'})
+                                ],
+                                         style={'padding': '8px'}
+                                ),
+
+                                # Holds the country the figures currently show, the figure callbacks listen to it
+                                dcc.Store(id='figure-country', data=DEFAULT_COUNTRY),
+
+                                # Holds the encoded exchange data in clientside mode, the clientside callbacks read it
+                                dcc.Store(id='exchange-data', data=exchange_data),
+
                                 # Final divider
                                 html.Img(src=PATH_PAGE_DIV,
                                          style={'width': '400px', 
@@ -270,12 +1184,16 @@ def create_layout(app: Dash) -> None:
 
     return None
 
+# The callbacks are registered on each app by register_callbacks, with the dependencies below, rather than with the 
+# global @callback decorator, since #1 and #2 can run either on the server or in the browser (clientside mode)
+
 # Callback #1: currency dropdown filtering based on country selection
-@callback(
+CURRENCY_OPTIONS_DEPENDENCIES = [
     Output("select-currency", "options"),
     Input("select-country", "value")
-)
+]
 
+@metrics.timed('callback.update_currency_options')
 def update_currency_options(selected_country: str) -> list:
     """
     The user selects a specific country from the select-country dropdown, so update the select-currency dropdown 
@@ -292,57 +1210,58 @@ def update_currency_options(selected_country: str) -> list:
     if selected_country is None:
         return []
     
-    # Filter the exchange_df dataframe to get the unique currency ranges for the selected country
-    filtered = exchange_df[exchange_df['country'] == selected_country]
-    unique_currency_ranges = filtered[['currency_name', 'currency_range']].drop_duplicates()
-    
-    # Create a list of dictionaries for the options in the dropdown
-    options = []
-
-    # Iterate through the unique currency ranges and create the options for the dropdown
-    for idx, row in unique_currency_ranges.iterrows():
-        options.append({"label": row['currency_range'], "value": row['currency_name']})
+    # Look up the precomputed currency options for the selected country
+    options = data.currency_options.get(selected_country, [])
 
     return options
 
-# Callback #2: exchange rate output, line graph, and timeline graph updates based on button clicks
+# Callback #2: exchange rate output and input resets based on button clicks
 # Merged two conflicting callbacks here with calback context as per:
 # https://community.plotly.com/t/how-to-use-dash-callback-context-in-dynamic-callbacks/78447/3
-@callback(
+# The figures are updated by their own callbacks (#3 and #4), which only fire when the figure-country store changes, 
+# so a submit that only changes the currency or year sends back the rate text and nothing else
+TWO_BUTTONS_DEPENDENCIES = [
     Output('exchange-output', 'children'),
     Output('select-country', 'value'),
     Output('select-currency', 'value'),
     Output('select-year', 'value'),
-    Output('line-figure', "figure"),
-    Output('line-graph-title', 'children'),
-    Output('timeline-figure', 'figure'),
-    Output('timeline-title', 'children'),
+    Output('select-convert-to', 'value'),
+    Output('figure-country', 'data'),
+    Output('select-amount', 'value'),
 
     Input('submit-val', 'n_clicks'),
     Input('reset-button', 'n_clicks'),
     State('select-country', 'value'),
     State('select-currency', 'value'),
     State('select-year', 'value'),
-    prevent_initial_call=True
-)
+    State('select-convert-to', 'value'),
+    State('figure-country', 'data'),
+    State('select-amount', 'value')
+]
 
+@metrics.timed('callback.two_buttons')
 def two_buttons(submit_val_clicks: int, 
                 reset_clicks: int, 
                 country: str, 
                 currency: str, 
-                year: str) -> list:
+                year: str,
+                convert_to: str,
+                figure_country: str,
+                amount: float = None) -> list:
     """
     The user has selected one of the two buttons (reset-button or submit-val button), so the Dash must be updated 
     accordingly. 
 
     If the reset-button is selected, the exchange-output header value, the select-country dropdown value, the 
-    select-currency dropdown value, the select-year text area value, the line-figure figure, the line-graph-title 
-    header value, the timeline-figure figure, and the timeline-title header value must be reset to the USA default 
-    or cleared altogether.
+    select-currency dropdown value, the select-year text area value, the select-convert-to dropdown value and the 
+    select-amount value must be cleared, and the figures must be reset to the USA default.
 
-    If the submit-val button is selected, the exchange-output header value must be retrieved and displayed, and the 
-    line-figure figure, the line-graph-title header value, the timeline-figure figure, and the timeline-title header 
-    value must all be updated with the given inputs.
+    If the submit-val button is selected, the exchange-output header value must be retrieved and displayed (along 
+    with the value of the select-amount amount, or one unit, in the select-convert-to currency, if one is selected), 
+    and the figures must show the selected country.
+
+    The figures themselves are switched by setting the figure-country store, which is only updated when the country 
+    actually changes, so the figure callbacks don't fire for the same country again.
 
     Arguments:
         submit_val_clicks (int): the binary value (0 or 1) for if the submit-val button is selected.
@@ -350,52 +1269,356 @@ def two_buttons(submit_val_clicks: int,
         country (str): the country selected by the user from the select-country dropdown.
         currency (str): the currency selected by the user from the select-currency dropdown.
         year (str): the year inputed by the user from the select-year textbox.
+        convert_to (str): the "country|currency" value selected by the user from the select-convert-to dropdown.
+        figure_country (str): the country the figures currently show, from the figure-country store.
+        amount (float): the amount to convert to the select-convert-to currency from the select-amount input, 
+                        defaults to None for one unit.
     
     Output:
-        (list): the list of 8 outputs to set the callback outputs to, consisting of the exchange-output header 
+        (list): the list of 7 outputs to set the callback outputs to, consisting of the exchange-output header 
                 value, the select-country dropdown value, the select-currency dropdown value, the select-year text 
-                area value, the line-figure figure, the line-graph-title header value, the timeline-figure figure, 
-                and the timeline-title header value.
+                area value, the select-convert-to dropdown value, the figure-country store value, and the 
+                select-amount value.
     """
     # We need to know the context of which button(s) were clicked
 
     # No button clicked, return no update for all outputs (default)
     if not ctx.triggered:
-        return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
+        return no_update, no_update, no_update, no_update, no_update, no_update, no_update
     
     # Button was clicked, get output and split it to get the button id
     triggered_id = ctx.triggered[0]["prop_id"].split(".")[0]
 
-    # If user selected reset button, reset all 8 fields
+    # If user selected reset button, reset all fields and go back to the USA figures
     if triggered_id == 'reset-button':
-        return "Exchange Rate:", None, None, "", make_line_fig(), "Currency Exchange in United States of America Over Time", make_timeline_fig(), "Timeline of Historical Events in United States of America"
+        return "Exchange Rate:", None, None, "", None, changed_country(figure_country, DEFAULT_COUNTRY), None
     
-    # If user selected submit button, update all 8 fields as needed
+    # If user selected submit button, update the fields as needed
     if triggered_id == 'submit-val':
         
         # Check for incomplete fields, return missing data alert
         if not country or not currency or not year:
-            return "Exchange rate: (missing data)", no_update, no_update, no_update, no_update, no_update, no_update, no_update
-        
-        # Initialize the figures
-        updated_line_fig = make_line_fig(price_country=country)
-        updated_timeline_fig = make_timeline_fig(crisis_country=country)
+            return "Exchange rate: (missing data)", no_update, no_update, no_update, no_update, no_update, no_update
 
         # No incomplete fields, now check validity of query (exists?)
         try:
-            rate = analysis.get_exchange_rate_val(exchange_df, country, currency, year)
+            rate, observed = analysis.get_exchange_rate_estimate(data.filled_rate_index, country, currency, year)
 
             # Query doesn't exist as a possibility, return no data alert
             if rate == 0.0: 
-                return (f"Exchange rate: no data for {country} and/or {currency} in {year}."), no_update, no_update, no_update, updated_line_fig, [f"Exchange Rate in {country}'s Currency Over Time", html.Br(), f"(Compared to the USD)"], updated_timeline_fig, [f"Timeline of Historical Events in {country}"]
+                return (f"Exchange rate: no data for {country} and/or {currency} in {year}."), no_update, no_update, no_update, no_update, changed_country(figure_country, country), no_update
 
-            # Query exists, now isolate the exchange rate
-            return f"Exchange rate: {rate} {currency} per USD", no_update, no_update, no_update, updated_line_fig, [f"Exchange Rate in {country}'s Currency Over Time", html.Br(), f"(Compared to the USD)"], updated_timeline_fig, [f"Timeline of Historical Events in {country}"]
+            # Query exists, now isolate the exchange rate, and convert it to the other currency if one was selected
+            # The year may be a gap in the currency's range, in which case the rate was estimated from nearby years
+            if observed:
+                output = f"Exchange rate: {rate} {currency} per USD"
+            else:
+                output = f"Exchange rate: {rate:.6g} {currency} per USD (estimated from nearby years, no data for {year})"
+            if convert_to:
+                output += get_conversion_text(country, currency, year, convert_to, amount)
+            return output, no_update, no_update, no_update, no_update, changed_country(figure_country, country), no_update
         
         # Everything else failed, invalid input was likely given
         except Exception as e:
-            return "Exchange rate: Please enter a valid four-digit year.", no_update, no_update, no_update, no_update, no_update, no_update, no_update
+            return "Exchange rate: Please enter a valid four-digit year.", no_update, no_update, no_update, no_update, no_update, no_update
     
     # Just in case, return no update for all outputs (default)
-    return no_update, no_update, no_update, no_update, no_update, no_update, no_update, no_update
+    return no_update, no_update, no_update, no_update, no_update, no_update, no_update
+
+def get_conversion_text(country: str, 
+                        currency: str, 
+                        year: str, 
+                        convert_to: str,
+                        amount: float = None) -> str:
+    """
+    Helper function that converts an amount of the selected currency into the select-convert-to currency, and 
+    formats it for the exchange-output header. Another currency of the same country is converted at the legal 
+    factors of the redenominations between the years each currency was in use (the years closest to the selected 
+    year), any other currency through both currencies' USD rates in the selected year.
+
+    Arguments:
+        country (str): the country selected by the user from the select-country dropdown.
+        currency (str): the currency selected by the user from the select-currency dropdown.
+        year (str): the year inputed by the user from the select-year textbox.
+        convert_to (str): the "country|currency" value selected by the user from the select-convert-to dropdown.
+        amount (float): the amount to convert from the select-amount input, defaults to None for one unit.
+    
+    Output:
+        (str): the conversion text to append to the exchange rate.
+    """
+    to_country, to_currency = convert_to.split(CONVERT_TO_SEPARATOR)
+    amount = 1 if amount is None else amount
+    snapshot = data
+
+    # A currency the country's currency was redenominated into, or from, whose segment of the country's chain is 
+    # the one in use closest to the selected year
+    if to_country == country and to_currency != currency:
+        chains = snapshot.redenomination_chains
+        from_year = redenomination.get_currency_year(chains, country, currency, year)
+        to_year = redenomination.get_currency_year(chains, country, to_currency, year)
+        if from_year is not None and to_year is not None:
+            try:
+                converted = redenomination.convert(chains, amount, country, from_year, to_year)
+
+            # A change of currency between them has no known factor, say which
+            except ValueError as e:
+                return f" ({e}, can't convert {currency} to {to_currency})"
+            return f" ({amount:.6g} {currency} = {converted:.6g} {to_currency} by redenomination)"
+
+    matrix = conversion.get_rate_matrix(snapshot.rate_index, snapshot.exchange_data_version)
+    converted = conversion.convert(matrix, amount, (country, currency), (to_country, to_currency), year)
+
+    # The currency to convert to has no rate in that year
+    if pd.isna(converted):
+        return f" (no data for {to_currency} ({to_country}) in {year})"
+    
+    return f" ({amount:.6g} {currency} = {converted:.6g} {to_currency} ({to_country}))"
+
+def changed_country(figure_country: str, 
+                    country: str):
+    """
+    Helper function that gives the new value of the figure-country store, which only changes when the figures 
+    need to show a different country.
+
+    Arguments:
+        figure_country (str): the country the figures currently show.
+        country (str): the country the figures should show.
+    
+    Output:
+        (str | no_update): the country to show, or no_update if the figures already show it.
+    """
+    if country == figure_country:
+        return no_update
+    return country
+
+# Callback #3: line graph and its title, only when the country shown in the figures, the nominal/real toggle or the 
+# base year changes
+LINE_FIGURE_DEPENDENCIES = [
+    Output('line-figure', 'figure'),
+    Output('line-graph-title', 'children'),
+    Input('figure-country', 'data'),
+    Input('select-rate-mode', 'value'),
+    Input('select-base-year', 'value')
+]
+
+@metrics.timed('callback.update_line_figure')
+def update_line_figure(country: str, 
+                       rate_mode: str = "nominal", 
+                       base_year: int = realrates.DEFAULT_BASE_YEAR) -> list:
+    """
+    The country shown in the figures, or the kind of rates shown, has changed, so update the exchange rate line 
+    graph and its title. Real rates are looked up from the prebuilt real rate table, not computed here.
+
+    Arguments:
+        country (str): the country to show, from the figure-country store.
+        rate_mode (str): "nominal" or "real", from the select-rate-mode toggle.
+        base_year (int): the year whose prices the real rates are shown in, from the select-base-year dropdown.
+    
+    Output:
+        (list): the line-figure figure and the line-graph-title header value.
+    """
+    if rate_mode == "real":
+        return get_real_line_fig(country, int(base_year)), [f"Real Exchange Rate in {country}'s Currency Over Time", html.Br(), f"(Compared to the USD, in {base_year} prices)"]
+    return get_line_fig(price_country=country), [f"Exchange Rate in {country}'s Currency Over Time", html.Br(), f"(Compared to the USD)"]
+
+# Callback #4: timeline graph and its title, only when the country shown in the figures changes
+TIMELINE_FIGURE_DEPENDENCIES = [
+    Output('timeline-figure', 'figure'),
+    Output('timeline-title', 'children'),
+    Input('figure-country', 'data')
+]
 
+@metrics.timed('callback.update_timeline_figure')
+def update_timeline_figure(country: str) -> list:
+    """
+    The country shown in the figures has changed, so update the historical events timeline and its title.
+
+    Arguments:
+        country (str): the country to show, from the figure-country store.
+    
+    Output:
+        (list): the timeline-figure figure and the timeline-title header value.
+    """
+    return get_timeline_fig(crisis_country=country), [f"Timeline of Historical Events in {country}"]
+
+# Callback #5: stats panel of the country's currencies, only when the country shown in the figures changes
+STATS_PANEL_DEPENDENCIES = [
+    Output('stats-panel', 'children'),
+    Input('figure-country', 'data')
+]
+
+@metrics.timed('callback.update_stats_panel')
+def update_stats_panel(country: str) -> html.Table:
+    """
+    The country shown in the figures has changed, so update the stats panel under the line graph.
+
+    Arguments:
+        country (str): the country to show, from the figure-country store.
+    
+    Output:
+        (html.Table): the stats-panel table.
+    """
+    return make_stats_panel(country)
+
+# Callback #6: devaluation ranking over the period the user entered
+RANKING_DEPENDENCIES = [
+    Output('rank-output', 'children'),
+    Input('rank-button', 'n_clicks'),
+    State('rank-start-year', 'value'),
+    State('rank-end-year', 'value')
+]
+
+@metrics.timed('callback.update_ranking')
+def update_ranking(rank_clicks: int, 
+                   start_year: str, 
+                   end_year: str) -> html.Div:
+    """
+    The user has pressed the rank-button, so rank every currency by its devaluation between the entered years.
+
+    Arguments:
+        rank_clicks (int): the number of times the rank-button was pressed.
+        start_year (str): the year inputed by the user in the rank-start-year textbox.
+        end_year (str): the year inputed by the user in the rank-end-year textbox.
+    
+    Output:
+        (html.Div): the rank-output ranking table, or a message if the years aren't valid.
+    """
+    return make_ranking_table(start_year, end_year)
+
+@metrics.timed('callback.update_ranking')
+def update_ranking_in_background(set_progress, 
+                                 rank_clicks: int, 
+                                 start_year: str, 
+                                 end_year: str) -> html.Div:
+    """
+    The background callback version of update_ranking, which reports its progress to the rank-progress bar.
+
+    Arguments:
+        set_progress (callable): sets the rank-progress value and max, passed in by Dash.
+        rank_clicks, start_year, end_year: see update_ranking.
+    
+    Output:
+        (html.Div): the rank-output ranking table, or a message if the years aren't valid.
+    """
+    return make_ranking_table(start_year, end_year, set_progress)
+
+# While the ranking runs in the background: its progress, the outputs shown while running, and the cancel button
+RANKING_BACKGROUND_OPTIONS = dict(
+    progress=[Output('rank-progress', 'value'), Output('rank-progress', 'max')],
+    progress_default=[0, RANKING_STEPS],
+    running=[(Output('rank-button', 'disabled'), True, False),
+             (Output('rank-cancel-button', 'style'), {'display': 'inline-block'}, HIDDEN),
+             (Output('rank-progress', 'style'), {'display': 'block'}, HIDDEN)],
+    cancel=[Input('rank-cancel-button', 'n_clicks')],
+    # Requests for the same years are the same job whatever the number of clicks, so they are coalesced
+    cache_args_to_ignore=[0]
+)
+
+# Callback #7: event study figure, cached per event type and window
+EVENT_STUDY_DEPENDENCIES = [
+    Output('event-study-figure', 'figure'),
+    Input('select-event-type', 'value'),
+    Input('select-event-window', 'value')
+]
+
+@metrics.timed('callback.update_event_study_figure')
+def update_event_study_figure(event_type: str, 
+                              window: int) -> dict:
+    """
+    The user has selected an event type or window, so update the event study figure. The figures of every event 
+    type and window are cached, so this is a lookup after the first time.
+
+    Arguments:
+        event_type (str): the event type selected by the user from the select-event-type dropdown.
+        window (int): the number of years selected by the user from the select-event-window dropdown.
+    
+    Output:
+        (dict): the event-study-figure figure.
+    """
+    if event_type is None or window is None:
+        return no_update
+    
+    return get_event_study_fig(event_type, int(window))
+
+# While the event study runs in the background, show its progress bar; changing the selection cancels the old job
+EVENT_STUDY_BACKGROUND_OPTIONS = dict(
+    running=[(Output('event-study-progress', 'style'), {'display': 'block'}, HIDDEN)]
+)
+
+# Callback #8: overlay chart, when the selected countries or scale change or the user zooms in or out
+OVERLAY_DEPENDENCIES = [
+    Output('overlay-figure', 'figure'),
+    Input('select-overlay', 'value'),
+    Input('overlay-scale', 'value'),
+    Input('overlay-figure', 'relayoutData')
+]
+
+@metrics.timed('callback.update_overlay_figure')
+def update_overlay_figure(countries: list, 
+                          scale: str, 
+                          relayout_data: dict) -> dict:
+    """
+    The user has changed the countries to compare or the scale, or zoomed the overlay chart, so rebuild the overlay 
+    chart. The points of each trace are picked for the visible years, so zooming in shows more detail.
+
+    Arguments:
+        countries (list): the countries selected by the user from the select-overlay dropdown.
+        scale (str): "linear" or "log", selected by the user from the overlay-scale radio items.
+        relayout_data (dict): the relayoutData of the overlay-figure graph, with the visible years after a zoom.
+    
+    Output:
+        (dict | no_update): the overlay-figure figure, or no_update if the relayout wasn't a zoom.
+    """
+    x_range = get_relayout_x_range(relayout_data)
+
+    # A relayout that didn't change the visible years (ex. the initial autosize) needs no new figure
+    if ctx.triggered_id == 'overlay-figure' and x_range is False:
+        return no_update
+    
+    return get_overlay_fig(countries or [], log_scale=scale == "log", x_range=x_range or None)
+
+def register_callbacks(app: Dash, 
+                       clientside_mode: bool = False,
+                       background_manager: background.LocalManager = None) -> None:
+    """
+    Register the callbacks on the app. The currency dropdown filtering and exchange rate callbacks (#1 and #2) are 
+    registered either as the Python functions above or as their clientside versions in assets/clientside.js, which 
+    read the exchange-data store. The figure, stats panel, ranking, event study and overlay callbacks (#3 to #8) 
+    always run on the server, and the heavy ranking and event study callbacks (#6 and #7) run as background 
+    callbacks if given a manager, so they don't hold up a request thread.
+
+    Arguments:
+        app (Dash): the app to register the callbacks on.
+        clientside_mode (bool): whether to register the clientside versions of #1 and #2, defaults to False.
+        background_manager (background.LocalManager): the manager to run #6 and #7 in the background with, defaults 
+                                                      to None to run them in the request.
+    
+    """
+    if clientside_mode:
+        app.clientside_callback(ClientsideFunction('currency_capsule', 'update_currency_options'),
+                                *CURRENCY_OPTIONS_DEPENDENCIES, 
+                                State('exchange-data', 'data'))
+        app.clientside_callback(ClientsideFunction('currency_capsule', 'two_buttons'),
+                                *TWO_BUTTONS_DEPENDENCIES, 
+                                State('exchange-data', 'data'),
+                                prevent_initial_call=True)
+    else:
+        app.callback(*CURRENCY_OPTIONS_DEPENDENCIES)(update_currency_options)
+        app.callback(*TWO_BUTTONS_DEPENDENCIES, prevent_initial_call=True)(two_buttons)
+
+    app.callback(*LINE_FIGURE_DEPENDENCIES, prevent_initial_call=True)(update_line_figure)
+    app.callback(*TIMELINE_FIGURE_DEPENDENCIES, prevent_initial_call=True)(update_timeline_figure)
+    app.callback(*STATS_PANEL_DEPENDENCIES, prevent_initial_call=True)(update_stats_panel)
+    if background_manager is not None:
+        app.callback(*RANKING_DEPENDENCIES, prevent_initial_call=True, 
+                     background=True, manager=background_manager, interval=background.POLL_INTERVAL,
+                     **RANKING_BACKGROUND_OPTIONS)(update_ranking_in_background)
+        app.callback(*EVENT_STUDY_DEPENDENCIES, prevent_initial_call=True,
+                     background=True, manager=background_manager, interval=background.POLL_INTERVAL,
+                     **EVENT_STUDY_BACKGROUND_OPTIONS)(update_event_study_figure)
+    else:
+        app.callback(*RANKING_DEPENDENCIES, prevent_initial_call=True)(update_ranking)
+        app.callback(*EVENT_STUDY_DEPENDENCIES, prevent_initial_call=True)(update_event_study_figure)
+    app.callback(*OVERLAY_DEPENDENCIES, prevent_initial_call=True)(update_overlay_figure)
+
+    return None
@@ -0,0 +1,233 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import analysis
+from src import datastore
+
+# Number of rows read, converted and written at a time, which bounds the memory used regardless of file size
+CHUNK_SIZE = 100_000
+
+def is_parquet(path: str) -> bool:
+    """
+    Helper function that tells whether a file path is a Parquet file, from its extension.
+
+    """
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+def read_chunks(path: str,
+                chunksize: int):
+    """
+    Read a CSV or Parquet file in fixed-size chunks. Parquet support needs the optional pyarrow package.
+
+    Arguments:
+        path (str): the path to the file to read.
+        chunksize (int): the number of rows per chunk.
+
+    Output:
+        (generator): the DataFrame chunks of the file, in order.
+    """
+    if not is_parquet(path):
+        yield from pd.read_csv(path, chunksize=chunksize)
+        return
+
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('Reading Parquet files requires pyarrow, install it with: pip install pyarrow') from e
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize):
+        yield batch.to_pandas()
+
+def format_years(values: pd.Series,
+                 years: np.ndarray) -> pd.Series:
+    """
+    Helper function that turns a CSV chunk's year column back into integers where the CSV reader made it float
+    because of a missing year, so 1950 isn't written as 1950.0. A column with any other value is left as read.
+
+    """
+    if pd.api.types.is_float_dtype(values) and np.array_equal(np.isnan(years), values.isna().to_numpy()):
+        return values.astype('Int64')
+    return values
+
+class ChunkWriter:
+    """
+    Appends DataFrame chunks to a CSV or Parquet file as they are converted, so nothing but the current chunk is
+    kept in memory. The file is only created once the first chunk arrives.
+    """
+    def __init__(self, path: str):
+        """
+        Arguments:
+            path (str): the path of the CSV or Parquet file to write.
+        """
+        self.path = path
+        self.rows = 0
+        self._parquet_writer = None
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """
+        Append a chunk to the file.
+
+        Arguments:
+            chunk (pd.DataFrame): the rows to append, with the same columns for every chunk.
+        """
+        if is_parquet(self.path):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet_writer is None:
+                self._parquet_writer = pq.ParquetWriter(self.path, table.schema)
+            self._parquet_writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+
+        self.rows += len(chunk)
+        return None
+
+    def close(self) -> None:
+        """
+        Finish the file.
+
+        """
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+            self._parquet_writer = None
+
+        return None
+
+def convert_file(input_path: str,
+                 output_path: str,
+                 unmatched_path: str = None,
+                 rate_index: pd.Series = None,
+                 chunksize: int = CHUNK_SIZE,
+                 country_col: str = 'country',
+                 currency_col: str = 'currency',
+                 year_col: str = 'year',
+                 amount_col: str = 'amount') -> dict:
+    """
+    Convert a (country, currency, year, amount) file of historical local currency amounts into USD, streaming it in
+    fixed-size chunks. Each chunk is joined against the exchange rate index in one vectorized lookup and written out
+    before the next one is read, so memory use stays constant regardless of file size.
+
+    Arguments:
+        input_path (str): the CSV or Parquet file to convert.
+        output_path (str): the CSV or Parquet file to write the matched rows to, with the input columns plus
+                           exchange_rate (units per USD) and usd_amount.
+        unmatched_path (str): the CSV or Parquet file to write the rows with no exchange rate to, along with their row
+                              number in the input, defaults to the output path with an _unmatched suffix. Rows with a
+                              missing or invalid key (ex. a year of "19x0") are written there too.
+        rate_index (pd.Series): the prebuilt index from analysis.build_rate_index, built from the clean exchange data
+                                if not given.
+        chunksize (int): the number of rows per chunk, defaults to CHUNK_SIZE.
+        country_col (str): the name of the country column in the input, defaults to "country".
+        currency_col (str): the name of the currency column in the input, defaults to "currency".
+        year_col (str): the name of the year column in the input, defaults to "year".
+        amount_col (str): the name of the amount column in the input, defaults to "amount".
+
+    Output:
+        (dict): the number of rows read, matched and unmatched, the elapsed seconds and the rows per second. If the
+                conversion fails, neither output file is left behind.
+    """
+    start = time.perf_counter()
+
+    if rate_index is None:
+        rate_index = analysis.build_rate_index(datastore.load_frame(datastore.PATH_CURRENCY))
+
+    if unmatched_path is None:
+        root, ext = os.path.splitext(output_path)
+        unmatched_path = f'{root}_unmatched{ext}'
+
+    # Remove the outputs of any earlier run, so an old unmatched file isn't mistaken for this run's
+    for path in (output_path, unmatched_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    matched_writer = ChunkWriter(output_path)
+    unmatched_writer = ChunkWriter(unmatched_path)
+    rows = 0
+
+    try:
+        for chunk in read_chunks(input_path, chunksize):
+            # Parse the years once, a missing or invalid year is NaN and its key has no rate
+            years = analysis.coerce_years(chunk[year_col].to_numpy())
+            rates = analysis.get_exchange_rate_vals(None,
+                                                    chunk[country_col].to_numpy(),
+                                                    chunk[currency_col].to_numpy(),
+                                                    years,
+                                                    rate_index)
+            # A rate of 0 means no data, the same as in the app, so those rows count as unmatched too
+            found = rates > 0
+
+            # Rates are units of local currency per USD, so dividing the amount by the rate gives USD. The matched
+            # years are all valid, so they are written as integers even if the chunk had missing ones.
+            matched = chunk[found].assign(**{year_col: years[found].astype(np.int64)},
+                                          exchange_rate=rates[found],
+                                          usd_amount=chunk[amount_col].to_numpy()[found] / rates[found])
+            if len(matched):
+                matched_writer.write(matched)
+
+            # Report the rows with no rate instead of converting them with a sentinel value
+            unmatched = chunk[~found]
+            if not is_parquet(input_path):
+                unmatched = unmatched.assign(**{year_col: format_years(unmatched[year_col], years[~found])})
+            if len(unmatched):
+                unmatched_writer.write(unmatched.assign(input_row=rows + np.flatnonzero(~found)))
+
+            rows += len(chunk)
+    except Exception:
+        # Don't leave a partial output behind, which could be taken for a finished conversion
+        matched_writer.close()
+        unmatched_writer.close()
+        for path in (output_path, unmatched_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    finally:
+        matched_writer.close()
+        unmatched_writer.close()
+
+    elapsed = time.perf_counter() - start
+    return {'rows': rows,
+            'matched': matched_writer.rows,
+            'unmatched': unmatched_writer.rows,
+            'unmatched_path': unmatched_path if unmatched_writer.rows else None,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed else 0.0}
+
+def main() -> None:
+    """
+    Command line entry point: python -m src.bulk INPUT OUTPUT
+
+    """
+    parser = argparse.ArgumentParser(description='Convert a file of historical local currency amounts into USD.')
+    parser.add_argument('input_path', help='the CSV or Parquet file with country, currency, year and amount columns')
+    parser.add_argument('output_path', help='the CSV or Parquet file to write the converted rows to')
+    parser.add_argument('--unmatched', dest='unmatched_path', default=None,
+                        help='where to write rows with no exchange rate, defaults to OUTPUT with an _unmatched suffix')
+    parser.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help=f'rows per chunk, defaults to {CHUNK_SIZE}')
+    parser.add_argument('--country-col', default='country')
+    parser.add_argument('--currency-col', default='currency')
+    parser.add_argument('--year-col', default='year')
+    parser.add_argument('--amount-col', default='amount')
+    args = parser.parse_args()
+
+    stats = convert_file(args.input_path, args.output_path, args.unmatched_path,
+                         chunksize=args.chunksize,
+                         country_col=args.country_col,
+                         currency_col=args.currency_col,
+                         year_col=args.year_col,
+                         amount_col=args.amount_col)
+
+    print(f"Converted {stats['matched']} of {stats['rows']} rows in {stats['seconds']:.2f} s "
+          f"({stats['rows_per_second']:,.0f} rows/s)")
+    if stats['unmatched']:
+        print(f"{stats['unmatched']} rows had no exchange rate, see {stats['unmatched_path']}")
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Largest the encoded exchange data embedded in the page may be, in bytes of JSON
+CLIENTSIDE_DATA_BUDGET = 150_000
+
+def encode_exchange_data(filled_rate_index: pd.DataFrame,
+                         currency_options: dict,
+                         redenomination_chains=None) -> dict:
+    """
+    Encode the gap-filled exchange rates compactly for the browser, so the currency dropdown filtering and the rate
+    lookup can run as clientside callbacks. Countries and currencies are dictionary-encoded into integer codes, and
+    since the filled index has every year of a currency's range, each (country, currency) series is stored as its
+    first year and its list of rates, so a year's rate is found by subtracting the first year.
+
+    Arguments:
+        filled_rate_index (pd.DataFrame): the prebuilt index from analysis.build_filled_rate_index.
+        currency_options (dict): the select-currency dropdown options per country, from
+                                 analysis.build_currency_options.
+        redenomination_chains (redenomination.RedenominationChains): the prebuilt chains from
+                                                                     redenomination.build_redenomination_chains,
+                                                                     defaults to None for no redenominations.
+
+    Output:
+        (dict): the JSON-serializable encoding, with the keys:
+                countries (list): the country names, indexed by country code.
+                currencies (list): the currency names, indexed by currency code.
+                series (list): one [country code, currency code, first year, rates, estimated offsets] list per
+                               series, where estimated offsets are the positions in rates that were estimated
+                               rather than observed.
+                options (dict): the select-currency dropdown options per country.
+                redenominations (dict): the [currency, first year, last year, chain, unit value] of each segment
+                                        of the chain of every country that changed currency, in year order.
+    """
+    countries = filled_rate_index.index.get_level_values('country')
+    currencies = filled_rate_index.index.get_level_values('currency_name')
+    years = filled_rate_index.index.get_level_values('year').to_numpy()
+    country_codes, country_names = pd.factorize(countries)
+    currency_codes, currency_names = pd.factorize(currencies)
+
+    # Estimated rates are only ever shown with 6 significant digits, so don't ship more than that
+    rates = filled_rate_index['exchange_rate'].to_numpy()
+    observed = filled_rate_index['observed'].to_numpy()
+    rates = np.where(observed, rates, [float(f'{rate:.6g}') for rate in rates])
+
+    # The index is sorted by (country, currency, year), so each series is a contiguous run of rows
+    series_codes = country_codes.astype(np.int64) * len(currency_names) + currency_codes
+    boundaries = np.flatnonzero(series_codes[1:] != series_codes[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    stops = np.concatenate((boundaries, [len(series_codes)]))
+
+    series = []
+    for start, stop in zip(starts.tolist(), stops.tolist()):
+        series.append([int(country_codes[start]),
+                       int(currency_codes[start]),
+                       int(years[start]),
+                       rates[start:stop].tolist(),
+                       np.flatnonzero(~observed[start:stop]).tolist()])
+
+    # Only countries that changed currency can convert by redenomination, so ship just their segments
+    redenominations = {}
+    if redenomination_chains is not None:
+        runs = redenomination_chains.runs
+        changed = runs['country'].duplicated(keep=False).to_numpy()
+        for country, currency, start, end, chain_number, unit_value in zip(*(runs[column][changed].tolist()
+                                                                             for column in runs.columns)):
+            redenominations.setdefault(country, []).append([currency, start, end, chain_number, unit_value])
+
+    return {'countries': country_names.tolist(),
+            'currencies': currency_names.tolist(),
+            'series': series,
+            'options': currency_options,
+            'redenominations': redenominations}
+
+def get_encoded_size(data: dict) -> int:
+    """
+    Get the size of the encoded exchange data as it is sent to the browser.
+
+    Arguments:
+        data (dict): the encoding from encode_exchange_data.
+
+    Output:
+        (int): the number of bytes of compact JSON.
+    """
+    return len(json.dumps(data, separators=(',', ':')).encode('utf-8'))
@@ -0,0 +1,118 @@
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+class RateMatrix(NamedTuple):
+    """
+    The exchange data pivoted into a dense year x (country, currency) matrix of local currency units per USD, with
+    NaN wherever a currency has no rate for a year.
+    """
+    years: np.ndarray
+    currencies: pd.MultiIndex
+    rates: np.ndarray
+
+# The most recently built matrix and the data version it was built from, so it is only rebuilt on a data change
+_matrix_cache = {}
+_matrix_lock = threading.Lock()
+
+def build_rate_matrix(rate_index: pd.Series) -> RateMatrix:
+    """
+    Pivot the keyed exchange rate index into a dense year x (country, currency) matrix, filling every year between
+    the first and last year in the data so that a year's row is found by subtracting the first year. Rates of 0 (the
+    data's marker for no rate) are treated as missing, so they never turn into conversions to 0 or infinity.
+
+    Arguments:
+        rate_index (pd.Series): the prebuilt index from analysis.build_rate_index.
+
+    Output:
+        (RateMatrix): the years, the (country, currency_name) column labels and the matrix of rates.
+    """
+    wide = rate_index.where(rate_index > 0).unstack(['country', 'currency_name'])
+    years = np.arange(wide.index.min(), wide.index.max() + 1)
+    wide = wide.reindex(years)
+    return RateMatrix(years=years, currencies=wide.columns, rates=wide.to_numpy(dtype=np.float64))
+
+def get_rate_matrix(rate_index: pd.Series,
+                    version) -> RateMatrix:
+    """
+    Get the rate matrix for a version of the data, building it only if the data changed since the last call.
+
+    Arguments:
+        rate_index (pd.Series): the prebuilt index from analysis.build_rate_index.
+        version (hashable): a stamp that changes whenever the exchange data does.
+
+    Output:
+        (RateMatrix): the rate matrix for that version of the data.
+    """
+    with _matrix_lock:
+        if _matrix_cache.get('version') != version:
+            _matrix_cache['matrix'] = build_rate_matrix(rate_index)
+            _matrix_cache['version'] = version
+        return _matrix_cache['matrix']
+
+def get_year_rates(matrix: RateMatrix,
+                   year: int) -> np.ndarray:
+    """
+    Helper function that gets the row of the rate matrix for a year.
+
+    Arguments:
+        matrix (RateMatrix): the rate matrix.
+        year (int): the year to get the rates for.
+
+    Output:
+        (np.ndarray): the rates of every currency in that year (units per USD), all NaN if the year is out of range.
+    """
+    row = int(year) - matrix.years[0]
+    if row < 0 or row >= len(matrix.years):
+        return np.full(len(matrix.currencies), np.nan)
+    return matrix.rates[row]
+
+def convert(matrix: RateMatrix,
+            amount,
+            from_currency: tuple,
+            to_currency: tuple,
+            year: int):
+    """
+    Convert an amount of one currency into another currency in the same year, going through the USD rates of both.
+
+    Arguments:
+        matrix (RateMatrix): the rate matrix.
+        amount (float | np.ndarray): the amount (or array of amounts) of from_currency to convert.
+        from_currency (tuple): the (country, currency_name) pair to convert from.
+        to_currency (tuple): the (country, currency_name) pair to convert to.
+        year (int): the year of the conversion.
+
+    Output:
+        (float | np.ndarray): the converted amount(s) of to_currency, NaN if either currency has no rate that year.
+    """
+    columns = matrix.currencies.get_indexer([from_currency, to_currency])
+    if (columns < 0).any():
+        return np.multiply(amount, np.nan)
+
+    from_rate, to_rate = get_year_rates(matrix, year)[columns]
+
+    # from_rate units of from_currency and to_rate units of to_currency are both worth one USD
+    return np.multiply(amount, to_rate / from_rate)
+
+def cross_rate_table(matrix: RateMatrix,
+                     year: int) -> pd.DataFrame:
+    """
+    Build the full table of cross rates between every pair of currencies that have a rate in a year.
+
+    Arguments:
+        matrix (RateMatrix): the rate matrix.
+        year (int): the year of the table.
+
+    Output:
+        (pd.DataFrame): the square table where the row is the currency converted from and the column the currency
+                        converted to, giving units of the column currency per unit of the row currency.
+    """
+    rates = get_year_rates(matrix, year)
+    available = ~np.isnan(rates)
+    rates = rates[available]
+    currencies = matrix.currencies[available]
+
+    # Outer division: units of column currency per USD over units of row currency per USD
+    return pd.DataFrame(rates[np.newaxis, :] / rates[:, np.newaxis], index=currencies, columns=currencies)
@@ -0,0 +1,235 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Set the path to the data files and the directory that holds their compiled, column-per-file counterparts
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+COMPILED_DIR = os.path.join(DATA_DIR, 'compiled')
+
+PATH_CURRENCY = os.path.join(DATA_DIR, 'clean_exchange_data.csv')
+PATH_CRISIS = os.path.join(DATA_DIR, 'clean_crisis_data.csv')
+PATH_INFLATION = os.path.join(DATA_DIR, 'clean_inflation_data.csv')
+
+# Bump this whenever the on-disk layout changes so that older stores are treated as stale
+STORE_VERSION = 2
+
+def get_store_dir(csv_path: str,
+                  compiled_dir: str = COMPILED_DIR) -> str:
+    """
+    Given the path to a clean CSV, get the directory where its compiled column store lives.
+
+    Arguments:
+        csv_path (str): the path to the clean CSV file.
+        compiled_dir (str): the parent directory of all compiled stores, defaults to data/compiled.
+
+    Output:
+        (str): the directory of the compiled store for that CSV, named after the CSV file.
+    """
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(compiled_dir, name)
+
+def hash_file(path: str) -> str:
+    """
+    Helper function that hashes the raw bytes of a file, used to tell whether a compiled store still matches the
+    CSV it was built from even if the file's modification time has changed (ex. after a git checkout).
+
+    Arguments:
+        path (str): the path to the file to hash.
+
+    Output:
+        (str): the hex SHA-256 digest of the file contents.
+    """
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def save_array(path: str,
+               array: np.ndarray) -> None:
+    """
+    Helper function that writes a column file to a temporary file and moves it into place, so a DataFrame still
+    memory-mapping the previous file (ex. the data a running server loaded before a reload) keeps reading it
+    instead of seeing it truncated and rewritten.
+
+    """
+    with open(path + '.tmp', 'wb') as f:
+        np.save(f, array)
+    os.replace(path + '.tmp', path)
+
+    return None
+
+def compile_csv(csv_path: str,
+                compiled_dir: str = COMPILED_DIR) -> str:
+    """
+    Parse a clean CSV once and write it out as a column store: numeric columns become one .npy file each, and text
+    columns (country, currency_name, event, the notes, etc.) are dictionary-encoded into an integer codes .npy file
+    plus the sorted unique values, stored variable-length as one .npy file of their UTF-8 bytes back to back and one
+    of their end offsets. A manifest records the column order, the dtypes, and the source CSV's size, modification
+    time and hash so stale stores can be detected.
+
+    Arguments:
+        csv_path (str): the path to the clean CSV file to compile.
+        compiled_dir (str): the parent directory of all compiled stores, defaults to data/compiled.
+
+    Output:
+        store_dir (str): the directory the compiled store was written to.
+    """
+    df = pd.read_csv(csv_path)
+    store_dir = get_store_dir(csv_path, compiled_dir)
+    os.makedirs(store_dir, exist_ok=True)
+
+    columns = []
+    for name in df.columns:
+        col = df[name]
+
+        # Numeric columns are stored as-is so they can be memory-mapped straight back into the DataFrame
+        if pd.api.types.is_numeric_dtype(col):
+            save_array(os.path.join(store_dir, f'{name}.npy'), col.to_numpy())
+            columns.append({'name': name, 'kind': 'numeric'})
+            continue
+
+        # Text columns are dictionary-encoded, missing values (NaN) get the code -1. The values are sorted, so the
+        # loaded categorical sorts and compares like the text it replaces.
+        codes, uniques = pd.factorize(col, sort=True, use_na_sentinel=True)
+        code_dtype = np.int8 if len(uniques) < 2**7 else np.int16 if len(uniques) < 2**15 else np.int32
+        save_array(os.path.join(store_dir, f'{name}.codes.npy'), codes.astype(code_dtype))
+
+        # The values are stored variable-length rather than as fixed-width unicode, which pads every value to the
+        # longest one (ex. a few long crisis notes made the notes' values file megabytes)
+        encoded = [value.encode('utf-8') for value in uniques]
+        offsets = np.cumsum([len(value) for value in encoded], dtype=np.int64)
+        save_array(os.path.join(store_dir, f'{name}.values.npy'), np.frombuffer(b''.join(encoded), dtype=np.uint8))
+        save_array(os.path.join(store_dir, f'{name}.offsets.npy'), offsets)
+        columns.append({'name': name, 'kind': 'dictionary'})
+
+    stat = os.stat(csv_path)
+    manifest = {'version': STORE_VERSION,
+                'source_size': stat.st_size,
+                'source_mtime_ns': stat.st_mtime_ns,
+                'source_sha256': hash_file(csv_path),
+                'rows': len(df),
+                'columns': columns}
+
+    # Write the manifest last, so a half-written store is never picked up by a loader
+    manifest_path = os.path.join(store_dir, 'manifest.json')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+    return store_dir
+
+def read_manifest(csv_path: str,
+                  compiled_dir: str = COMPILED_DIR) -> dict | None:
+    """
+    Read the manifest of a CSV's compiled store, if the store is present and still matches the CSV.
+
+    Arguments:
+        csv_path (str): the path to the clean CSV file.
+        compiled_dir (str): the parent directory of all compiled stores, defaults to data/compiled.
+
+    Output:
+        manifest (dict | None): the parsed manifest, or None if the store is missing or stale.
+    """
+    manifest_path = os.path.join(get_store_dir(csv_path, compiled_dir), 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != STORE_VERSION:
+        return None
+
+    # Cheap check first: same size and modification time means the CSV hasn't been touched
+    stat = os.stat(csv_path)
+    if stat.st_size != manifest['source_size']:
+        return None
+    if stat.st_mtime_ns == manifest['source_mtime_ns']:
+        return manifest
+
+    # The CSV was touched, so fall back to comparing contents
+    if hash_file(csv_path) != manifest['source_sha256']:
+        return None
+    return manifest
+
+def load_values(store_dir: str,
+                name: str) -> pd.Index:
+    """
+    Helper function that reads the unique values of a dictionary-encoded column back from their UTF-8 bytes and
+    end offsets.
+
+    """
+    blob = np.load(os.path.join(store_dir, f'{name}.values.npy')).tobytes()
+    offsets = np.load(os.path.join(store_dir, f'{name}.offsets.npy')).tolist()
+    return pd.Index([blob[start:stop].decode('utf-8') for start, stop in zip([0] + offsets[:-1], offsets)])
+
+def load_compiled(csv_path: str,
+                  manifest: dict,
+                  compiled_dir: str = COMPILED_DIR) -> pd.DataFrame:
+    """
+    Load a compiled column store back into a DataFrame, memory-mapping every numeric column file. Dictionary-encoded
+    columns are loaded as categoricals straight from their codes and values, without decoding them into one string
+    per row, so the result has the values of pd.read_csv of the source CSV with its text columns compacted as in
+    analysis.compact_text_columns.
+
+    Arguments:
+        csv_path (str): the path to the clean CSV file the store was built from.
+        manifest (dict): the store's manifest, as returned by read_manifest.
+        compiled_dir (str): the parent directory of all compiled stores, defaults to data/compiled.
+
+    Output:
+        (pd.DataFrame): the loaded DataFrame.
+    """
+    store_dir = get_store_dir(csv_path, compiled_dir)
+
+    data = {}
+    for column in manifest['columns']:
+        name = column['name']
+        if column['kind'] == 'numeric':
+            data[name] = np.load(os.path.join(store_dir, f'{name}.npy'), mmap_mode='r')
+        else:
+            codes = np.load(os.path.join(store_dir, f'{name}.codes.npy'))
+            data[name] = pd.Categorical.from_codes(codes, load_values(store_dir, name))
+
+    return pd.DataFrame(data)
+
+def load_frame(csv_path: str,
+               compiled_dir: str = COMPILED_DIR) -> pd.DataFrame:
+    """
+    Load one of the clean data files, using its compiled column store when it is present and up to date, and
+    falling back to parsing the CSV when it is missing or stale.
+
+    Arguments:
+        csv_path (str): the path to the clean CSV file.
+        compiled_dir (str): the parent directory of all compiled stores, defaults to data/compiled.
+
+    Output:
+        (pd.DataFrame): the loaded DataFrame.
+    """
+    manifest = read_manifest(csv_path, compiled_dir)
+    if manifest is None:
+        return pd.read_csv(csv_path)
+    return load_compiled(csv_path, manifest, compiled_dir)
+
+def main() -> None:
+    """
+    Command line entry point, compiles the clean CSVs into column stores: python -m src.datastore
+
+    """
+    parser = argparse.ArgumentParser(description='Compile the clean CSVs into memory-mappable column stores.')
+    parser.add_argument('csv_paths', nargs='*', default=[PATH_CURRENCY, PATH_CRISIS],
+                        help='the clean CSV files to compile, defaults to the exchange and crisis data')
+    parser.add_argument('--compiled-dir', default=COMPILED_DIR,
+                        help='where to write the compiled stores, defaults to data/compiled')
+    args = parser.parse_args()
+
+    for csv_path in args.csv_paths:
+        store_dir = compile_csv(csv_path, args.compiled_dir)
+        print(f'Compiled {csv_path} -> {store_dir}')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,621 @@
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from src import datastore
+
+# The raw MeasuringWorth exchange rate download, and where the cached output of each pipeline stage is kept
+PATH_RAW_EXCHANGE = os.path.join(datastore.DATA_DIR, 'exchange_data.csv')
+STAGE_DIR = os.path.join(datastore.COMPILED_DIR, 'etl')
+
+# Number of raw rows parsed at a time
+CHUNK_SIZE = 50_000
+
+# Currency names that are spelled inconsistently in the raw data, as (country, raw name) -> clean name
+CURRENCY_NAME_FIXES = {
+    ('Argentina', 'Old Pesos Argentino'): 'Old Pesos Argentinos',
+    ('Argentina', '(New) Pesos Argentino'): '(New) Pesos Argentinos',
+    ('Argentina', 'New Pesos Argentino'): 'New Pesos Argentinos',
+    ('Brazil', 'Milreis'): 'Mil-réis',
+    ('Brazil', 'Reals'): 'Reais',
+    ('Denmark', 'Krones'): 'Krone',
+    ('Norway', 'Kroner'): 'Krone',
+    ('United Kingdom', 'British Pound'): 'British Pounds',
+    ('Venezuela', 'Bolivars'): 'Bolívar',
+    ('Venezuela', 'Bolivar'): 'Bolívar',
+}
+
+# The raw data prices currencies in USD, so the USA itself is added as a constant rate of 1 over these years
+USD_ROWS = {'country': 'United States of America',
+            'currency_name': 'United States Dollar',
+            'first_year': 1813,
+            'last_year': 2010}
+
+# A currency still in use in this year or later is labelled as "present" in its currency_range
+PRESENT_YEAR = 2025
+
+# The raw Global Crises Data by Country file (Reinhart and Rogoff), which isn't kept in the repository
+PATH_RAW_CRISIS = os.path.join(datastore.DATA_DIR, 'global_crisis_data.csv')
+
+# Short names for the raw crisis columns that are used
+CRISIS_COLUMN_NAMES = {
+    'Banking Crisis ': 'banking_crisis',
+    'Banking_Crisis_Notes': 'banking_notes',
+    'Systemic Crisis': 'systemic_crisis',
+    'Domestic_Debt_In_Default': 'domestic_debt',
+    'Domestic_Debt_ Notes/Sources': 'domestic_notes',
+    'SOVEREIGN EXTERNAL DEBT 1: ...': 'external_debt_1',
+    'SOVEREIGN EXTERNAL DEBT 2: ...': 'external_debt_2',
+    'Defaults_External_Notes': 'external_notes',
+    'Currency Crises': 'currency_crisis',
+    'Inflation Crises': 'inflation_crisis',
+    'Independence': 'independence',
+    'Gold Standard': 'gold_standard',
+    'national currency': 'national_currency'
+}
+INFLATION_COLUMN = 'Inflation, Annual percentages of average consumer prices'
+
+# The crisis flag columns and the event recorded for a year when the flag is 1, in the order they are recorded
+CRISIS_FLAG_EVENTS = {'banking_crisis': 'Banking Crisis',
+                      'systemic_crisis': 'Systemic Crisis',
+                      'currency_crisis': 'Currency Crisis',
+                      'inflation_crisis': 'Inflation Crisis'}
+
+# Countries named differently in the crisis data than in the exchange data
+CRISIS_COUNTRY_NAMES = {'United States': 'United States of America'}
+
+# Matches one period of the national currency field, ex. "1878-1964-Algerian franc" or "1964-present-dinar"
+CURRENCY_PERIOD_PATTERN = r'^(\d{4})-(\d{4}|present)[-–](.*)'
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """
+    Helper function that hashes the contents of a DataFrame: its column names, dtypes and every value.
+
+    Arguments:
+        df (pd.DataFrame): the DataFrame to hash.
+
+    Output:
+        (str): the hex SHA-256 digest of the contents.
+    """
+    digest = hashlib.sha256(repr([(name, str(dtype)) for name, dtype in df.dtypes.items()]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+def get_stage_key(name: str,
+                  build,
+                  input_hash: str,
+                  params: dict) -> str:
+    """
+    Helper function that gets the cache key of a stage run: a hash of the stage name, the source code of its
+    function, its parameters and the hash of its input, so a stage is rerun whenever any of them changes.
+
+    """
+    key = json.dumps([name, inspect.getsource(build), repr(sorted(params.items())), input_hash])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+def run_stage(name: str,
+              build,
+              input_hash: str,
+              load_input,
+              params: dict,
+              stage_dir: str,
+              manifest: dict,
+              force: bool = False) -> tuple:
+    """
+    Run one stage of a pipeline, or reuse its cached output if the stage, its parameters and its input are all
+    unchanged since it last ran.
+
+    Arguments:
+        name (str): the name of the stage, which names its cached output file.
+        build (callable): the stage function, called as build(input, **params).
+        input_hash (str): the content hash of the stage's input.
+        load_input (callable): the function with no arguments that returns the input, only called if the stage runs.
+        params (dict): the keyword arguments of build.
+        stage_dir (str): the directory of the cached stage outputs.
+        manifest (dict): the record of the cached stage outputs, updated in place when the stage runs.
+        force (bool): whether to run the stage even if its cached output is up to date, defaults to False.
+
+    Output:
+        (tuple): a function with no arguments that returns the stage's output, the content hash of the output, and
+                 whether the stage ran.
+    """
+    key = get_stage_key(name, build, input_hash, params)
+    path = os.path.join(stage_dir, f'{name}.pkl')
+    record = manifest.get(name, {})
+
+    if not force and record.get('key') == key and os.path.exists(path):
+        return (lambda: pd.read_pickle(path)), record['output_hash'], False
+
+    output = build(load_input(), **params)
+    output_hash = hash_frame(output)
+    output.to_pickle(path + '.tmp')
+    os.replace(path + '.tmp', path)
+    manifest[name] = {'key': key, 'output_hash': output_hash}
+
+    return (lambda: output), output_hash, True
+
+def read_stage_manifest(stage_dir: str) -> dict:
+    """
+    Helper function that reads the record of the cached stage outputs, empty if there is none yet.
+
+    """
+    path = os.path.join(stage_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def write_stage_manifest(stage_dir: str, manifest: dict) -> None:
+    """
+    Helper function that writes the record of the cached stage outputs.
+
+    """
+    path = os.path.join(stage_dir, 'manifest.json')
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+    return None
+
+def parse_raw_exchange(raw_path: str,
+                       chunksize: int = CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Parse the raw MeasuringWorth exchange rate file, reading it in chunks. Each raw row looks like
+    ("Argentina, 1600 - 2025", 1916, "0.9666 Gold Pesos"): the country carries a date range suffix, and the currency
+    column holds the rate followed by the currency name.
+
+    Arguments:
+        raw_path (str): the path to the raw exchange rate CSV.
+        chunksize (int): the number of rows parsed at a time, defaults to CHUNK_SIZE.
+
+    Output:
+        (pd.DataFrame): the country, year, exchange_rate and currency_name of every complete row, in file order.
+    """
+    chunks = []
+    for chunk in pd.read_csv(raw_path, chunksize=chunksize):
+        # Split "0.9666 Gold Pesos" into the rate and the name, and "Argentina, 1600 - 2025" into the country
+        rate_and_name = chunk['currency'].str.split(' ', n=1, expand=True).reindex(columns=[0, 1])
+        parsed = pd.DataFrame({'country': chunk['country'].str.split(',', n=1).str[0].str.strip(),
+                               'year': chunk['year'],
+                               'exchange_rate': rate_and_name[0],
+                               'currency_name': rate_and_name[1].str.strip()})
+
+        # The file ends with empty rows, and a row without a rate or a name can't be used
+        parsed = parsed.dropna()
+        chunks.append(parsed.astype({'year': int, 'exchange_rate': float}))
+
+    return pd.concat(chunks, ignore_index=True)
+
+def normalize_currency_names(exchange_df: pd.DataFrame,
+                             name_fixes: dict = CURRENCY_NAME_FIXES) -> pd.DataFrame:
+    """
+    Make each currency's name consistent, so every row of a currency has the same name.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the parsed exchange data.
+        name_fixes (dict): the dictionary of (country, raw name) to clean name, defaults to CURRENCY_NAME_FIXES.
+
+    Output:
+        (pd.DataFrame): the exchange data with the names fixed.
+    """
+    # Look every (country, name) pair up in the fixes at once, keeping the name where there is no fix
+    keys = pd.MultiIndex.from_arrays([exchange_df['country'], exchange_df['currency_name']])
+    fixed = pd.Series(name_fixes).reindex(keys).to_numpy()
+    names = np.where(pd.isna(fixed), exchange_df['currency_name'].to_numpy(), fixed)
+
+    return exchange_df.assign(currency_name=pd.array(names, dtype=exchange_df['currency_name'].dtype))
+
+def add_usd_rows(exchange_df: pd.DataFrame,
+                 usd_rows: dict = USD_ROWS) -> pd.DataFrame:
+    """
+    Add the USA's constant rate of 1 USD per USD, and sort the rows by country and year.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the exchange data.
+        usd_rows (dict): the country, currency name, first year and last year of the USD rows, defaults to USD_ROWS.
+
+    Output:
+        (pd.DataFrame): the exchange data with the USD rows, sorted by country then year, keeping the file order of
+                        rows with the same country and year.
+    """
+    years = np.arange(usd_rows['first_year'], usd_rows['last_year'] + 1)
+    usd_df = pd.DataFrame({'country': usd_rows['country'],
+                           'year': years,
+                           'exchange_rate': 1.0,
+                           'currency_name': usd_rows['currency_name']})
+
+    exchange_df = pd.concat([exchange_df, usd_df], ignore_index=True)
+    return exchange_df.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+
+def add_currency_ranges(exchange_df: pd.DataFrame,
+                        present_year: int = PRESENT_YEAR) -> pd.DataFrame:
+    """
+    Add the currency_range column used as the select-currency dropdown label, the currency name followed by the
+    years it was in use, ex. "Gold Pesos (1916-1933)", "Euro (1999-present)" or "Reichsmark (1945)".
+
+    Arguments:
+        exchange_df (pd.DataFrame): the exchange data.
+        present_year (int): a currency whose last year is this or later is labelled as in use to the present,
+                            defaults to PRESENT_YEAR.
+
+    Output:
+        (pd.DataFrame): the exchange data with the currency_range column.
+    """
+    years = exchange_df.groupby(['country', 'currency_name'])['year']
+    first = years.transform('min').astype(str)
+    last = years.transform('max')
+
+    last_label = np.where(last >= present_year, 'present', last.astype(str))
+    span = np.where(first == last.astype(str), first, first + '-' + last_label)
+    currency_range = exchange_df['currency_name'] + ' (' + span + ')'
+
+    return exchange_df.assign(currency_range=currency_range)
+
+def publish(clean_df: pd.DataFrame,
+            output_path: str,
+            compiled_dir: str) -> tuple:
+    """
+    Write the clean CSV and compile its column store, each only if it changed, so an unchanged refresh leaves the
+    files the app loads untouched.
+
+    Arguments:
+        clean_df (pd.DataFrame): the clean data.
+        output_path (str): the path of the clean CSV.
+        compiled_dir (str): the parent directory of the compiled stores.
+
+    Output:
+        (tuple): whether the CSV was written, and whether the store was compiled.
+    """
+    csv_bytes = clean_df.to_csv(index=False).encode('utf-8')
+
+    written = False
+    if not os.path.exists(output_path) or datastore.hash_file(output_path) != hashlib.sha256(csv_bytes).hexdigest():
+        with open(output_path + '.tmp', 'wb') as f:
+            f.write(csv_bytes)
+        os.replace(output_path + '.tmp', output_path)
+        written = True
+
+    compiled = False
+    if datastore.read_manifest(output_path, compiled_dir) is None:
+        datastore.compile_csv(output_path, compiled_dir)
+        compiled = True
+
+    return written, compiled
+
+def is_published(manifest: dict,
+                 content_hash: str,
+                 output_path: str,
+                 compiled_dir: str) -> bool:
+    """
+    Helper function that tells whether a pipeline output was already published to a path: the CSV there was
+    written from the same content and hasn't been touched since, and its compiled store is up to date.
+
+    """
+    record = manifest.get('published', {}).get(os.path.abspath(output_path))
+    if record is None or record['output_hash'] != content_hash or not os.path.exists(output_path):
+        return False
+
+    stat = os.stat(output_path)
+    if (stat.st_size, stat.st_mtime_ns) != (record['size'], record['mtime_ns']):
+        return False
+    return datastore.read_manifest(output_path, compiled_dir) is not None
+
+def run_pipeline(name: str,
+                 stages: list,
+                 raw_path: str,
+                 output_path: str,
+                 compiled_dir: str,
+                 stage_dir: str,
+                 force: bool = False) -> dict:
+    """
+    Run the stages of a pipeline from a raw file to a clean CSV and its compiled column store. Each stage's output
+    is cached with the content hash of its input, so a rerun skips every stage whose input, code and parameters are
+    unchanged, and a stage whose output comes out the same as before lets every later stage be skipped too.
+
+    Arguments:
+        name (str): the name of the pipeline, which names its directory of cached stage outputs.
+        stages (list): the (name, function, parameters) of each stage, in order. The first stage gets the raw file
+                       path, and every later stage the DataFrame output by the one before it.
+        raw_path (str): the path to the raw file.
+        output_path (str): the path of the clean CSV to write.
+        compiled_dir (str): the parent directory of the compiled stores.
+        stage_dir (str): the parent directory of the cached stage outputs.
+        force (bool): whether to rerun every stage, defaults to False.
+
+    Output:
+        (dict): the dictionary of stage name to whether it ran and its seconds, plus whether the CSV was written and
+                the store compiled.
+    """
+    stage_dir = os.path.join(stage_dir, name)
+    os.makedirs(stage_dir, exist_ok=True)
+    manifest = read_stage_manifest(stage_dir)
+    report = {}
+
+    # The first stage's input is the raw file itself, which is only read if the stage runs
+    load, content_hash = (lambda: raw_path), datastore.hash_file(raw_path)
+
+    for stage_name, build, params in stages:
+        start = time.perf_counter()
+        load, content_hash, ran = run_stage(stage_name, build, content_hash, load, params, stage_dir, manifest, force)
+        report[stage_name] = {'ran': ran, 'seconds': time.perf_counter() - start}
+
+    write_stage_manifest(stage_dir, manifest)
+
+    # Publishing is skipped too if the final output is the one already published there, and still intact
+    start = time.perf_counter()
+    written, compiled = False, False
+    if force or not is_published(manifest, content_hash, output_path, compiled_dir):
+        written, compiled = publish(load(), output_path, compiled_dir)
+        stat = os.stat(output_path)
+        manifest.setdefault('published', {})[os.path.abspath(output_path)] = {'output_hash': content_hash,
+                                                                              'size': stat.st_size,
+                                                                              'mtime_ns': stat.st_mtime_ns}
+        write_stage_manifest(stage_dir, manifest)
+    report['publish'] = {'ran': written or compiled, 'seconds': time.perf_counter() - start,
+                         'csv_written': written, 'store_compiled': compiled}
+
+    return report
+
+def run_exchange_pipeline(raw_path: str = PATH_RAW_EXCHANGE,
+                          output_path: str = datastore.PATH_CURRENCY,
+                          compiled_dir: str = datastore.COMPILED_DIR,
+                          stage_dir: str = STAGE_DIR,
+                          force: bool = False) -> dict:
+    """
+    Build the clean exchange data from the raw MeasuringWorth file: parse it, fix the currency names, add the USD
+    rows and the currency ranges, then write the clean CSV and its compiled column store, see run_pipeline.
+
+    Arguments:
+        raw_path (str): the path to the raw exchange rate CSV, defaults to data/exchange_data.csv.
+        output_path (str): the path of the clean CSV to write, defaults to data/clean_exchange_data.csv.
+        compiled_dir (str): the parent directory of the compiled stores, defaults to data/compiled.
+        stage_dir (str): the parent directory of the cached stage outputs, defaults to data/compiled/etl.
+        force (bool): whether to rerun every stage, defaults to False.
+
+    Output:
+        (dict): the report of each stage, see run_pipeline.
+    """
+    stages = [('parse', parse_raw_exchange, {'chunksize': CHUNK_SIZE}),
+              ('names', normalize_currency_names, {'name_fixes': CURRENCY_NAME_FIXES}),
+              ('usd', add_usd_rows, {'usd_rows': USD_ROWS}),
+              ('ranges', add_currency_ranges, {'present_year': PRESENT_YEAR})]
+    return run_pipeline('exchange', stages, raw_path, output_path, compiled_dir, stage_dir, force)
+
+def read_raw_crisis(raw_path: str) -> pd.DataFrame:
+    """
+    Read the raw crisis file, giving the columns that are used short names and making the flag columns numeric 
+    (anything that isn't a number, ex. "n/a", becomes NaN).
+
+    Arguments:
+        raw_path (str): the path to the raw Global Crises Data by Country CSV.
+
+    Output:
+        (pd.DataFrame): the raw crisis data, one row per country and year.
+    """
+    raw_df = pd.read_csv(raw_path).rename(columns=CRISIS_COLUMN_NAMES)
+
+    numeric_columns = [*CRISIS_FLAG_EVENTS, 'independence', 'gold_standard']
+    if INFLATION_COLUMN in raw_df.columns:
+        numeric_columns.append(INFLATION_COLUMN)
+    return raw_df.assign(**{column: pd.to_numeric(raw_df[column], errors='coerce') for column in numeric_columns})
+
+def parse_currency_periods(raw_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Parse each country's national currency field, ex. "1830-1877-French coins, 1878-1964-Algerian franc, 
+    1964-present-dinar", into its currency periods. A country's first non-empty field is used.
+
+    Arguments:
+        raw_df (pd.DataFrame): the raw crisis data, from read_raw_crisis.
+
+    Output:
+        (pd.DataFrame): the Country, start_year and currency_name of every period that parses, in the order of the 
+                        countries and then of the periods in the field.
+    """
+    fields = raw_df.dropna(subset=['Country', 'national_currency']).drop_duplicates('Country')
+    periods = fields.set_index('Country')['national_currency'].str.split(',').explode().str.strip()
+
+    parts = periods.str.extract(CURRENCY_PERIOD_PATTERN).dropna()
+    return pd.DataFrame({'Country': parts.index.to_numpy(),
+                         'start_year': parts[0].astype(int).to_numpy(),
+                         'currency_name': parts[2].str.strip().to_numpy()})
+
+def get_transitions(raw_df: pd.DataFrame,
+                    column: str) -> tuple:
+    """
+    Helper function that compares each row's value of a column with the value in the country's previous row.
+
+    Output:
+        (tuple): the current values, the previous values, and whether each row has a previous row and its value 
+                 differs (a missing value always counts as different).
+    """
+    current = raw_df[column]
+    previous = raw_df.groupby('Country', sort=False)[column].shift()
+    has_previous = raw_df.groupby('Country', sort=False).cumcount() > 0
+    return current, previous, has_previous & (current != previous)
+
+def derive_crisis_events(raw_df: pd.DataFrame,
+                         country_names: dict = CRISIS_COUNTRY_NAMES) -> pd.DataFrame:
+    """
+    Derive the clean crisis data, one row per event, from the raw crisis data, which has one row of flags per 
+    country and year. The events are: each crisis flag that is 1, a change of the independence flag from the 
+    country's previous year, a change of the gold standard flag to 1 (adoption) or from 1 to 0 (suspension), and 
+    the first year of each of the country's currencies. Each event row carries the year's debt notes.
+
+    Arguments:
+        raw_df (pd.DataFrame): the raw crisis data, from read_raw_crisis.
+        country_names (dict): the countries to rename to match the exchange data, defaults to CRISIS_COUNTRY_NAMES.
+
+    Output:
+        (pd.DataFrame): the country, year, event, event_notes, domestic_notes and external_notes of every event, 
+                        sorted by country and year, and within a year in the order the events are listed above.
+    """
+    # Currency periods come from every row of a country, but events only from rows with a country and a year
+    periods = parse_currency_periods(raw_df)
+    raw_df = raw_df[raw_df['Country'].notna() & raw_df['Year'].notna()].reset_index(drop=True)
+    events = []
+
+    # Crises: one event per flag that is 1, the banking and inflation crises carry a note
+    flags = raw_df[list(CRISIS_FLAG_EVENTS)].melt(ignore_index=False, var_name='flag', value_name='value')
+    flags = flags[flags['value'] == 1]
+    inflation_notes = 'Inflation level: ' + raw_df[INFLATION_COLUMN].astype(str)
+    notes = {'banking_crisis': raw_df['banking_notes'],
+             'inflation_crisis': inflation_notes.where(raw_df[INFLATION_COLUMN].notna())}
+    for rank, (flag, event) in enumerate(CRISIS_FLAG_EVENTS.items()):
+        rows = flags.index[flags['flag'] == flag]
+        flag_notes = notes[flag].reindex(rows) if flag in notes else None
+        events.append(pd.DataFrame({'row': rows, 'rank': rank, 'sub': 0, 'event': event, 'event_notes': flag_notes}))
+
+    # Independence: any change from the country's previous row
+    current, _, changed = get_transitions(raw_df, 'independence')
+    gained = np.where(current == 1, 'Gain of Independence', 'Loss of Independence')
+    rows = np.flatnonzero(changed)
+    events.append(pd.DataFrame({'row': rows, 'rank': len(CRISIS_FLAG_EVENTS), 'sub': 0, 'event': gained[rows]}))
+
+    # Gold standard: a change to 1 is an adoption, a change from 1 to 0 a suspension, any other change isn't an event
+    current, previous, changed = get_transitions(raw_df, 'gold_standard')
+    adopted = (changed & (current == 1)).to_numpy()
+    suspended = (changed & (current == 0) & (previous == 1)).to_numpy()
+    rows = np.flatnonzero(adopted | suspended)
+    events.append(pd.DataFrame({'row': rows, 'rank': len(CRISIS_FLAG_EVENTS) + 1, 'sub': 0,
+                                'event': np.where(adopted[rows], 'Gold Standard Adoption', 'Gold Standard Suspension')}))
+
+    # Currency changes: every row whose year is the first year of one of the country's currency periods
+    periods['sub'] = np.arange(len(periods))
+    years = pd.DataFrame({'row': np.arange(len(raw_df)), 'Country': raw_df['Country'],
+                          'start_year': raw_df['Year'].astype(int)})
+    changes = years.merge(periods, on=['Country', 'start_year'])
+    events.append(pd.DataFrame({'row': changes['row'], 'rank': len(CRISIS_FLAG_EVENTS) + 2, 'sub': changes['sub'],
+                                'event': 'Currency Change',
+                                'event_notes': 'New currency: ' + changes['currency_name']}))
+
+    # Put the events in row order, then in the order above within a row, and attach the row's country, year and notes
+    events = pd.concat(events, ignore_index=True).sort_values(['row', 'rank', 'sub'], kind='stable')
+    rows = events['row'].to_numpy()
+    crisis_df = pd.DataFrame({'country': raw_df['Country'].to_numpy()[rows],
+                              'year': raw_df['Year'].to_numpy()[rows],
+                              'event': events['event'].to_numpy(),
+                              'event_notes': events['event_notes'].to_numpy(),
+                              'domestic_notes': raw_df['domestic_notes'].to_numpy()[rows],
+                              'external_notes': raw_df['external_notes'].to_numpy()[rows]})
+    crisis_df = crisis_df.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+
+    # Strip stray whitespace from the text, and name the countries the same way as the exchange data
+    for column in ['country', 'event', 'event_notes', 'domestic_notes', 'external_notes']:
+        if not crisis_df[column].isna().all():
+            crisis_df[column] = crisis_df[column].str.strip()
+    crisis_df['country'] = crisis_df['country'].replace(country_names)
+
+    return crisis_df
+
+def extract_inflation(raw_df: pd.DataFrame,
+                      country_names: dict = CRISIS_COUNTRY_NAMES) -> pd.DataFrame:
+    """
+    Extract the yearly inflation of every country from the raw crisis data, which the real exchange rates are built
+    from (see realrates.build_real_rates). Years without an inflation figure are kept, with a missing value, since
+    they break the country's price index.
+
+    Arguments:
+        raw_df (pd.DataFrame): the raw crisis data, from read_raw_crisis.
+        country_names (dict): the countries to rename to match the exchange data, defaults to CRISIS_COUNTRY_NAMES.
+
+    Output:
+        (pd.DataFrame): the country, year and inflation (annual % change in average consumer prices) of every 
+                        country and year, sorted by country and year.
+    """
+    raw_df = raw_df[raw_df['Country'].notna() & raw_df['Year'].notna()]
+    inflation = raw_df[INFLATION_COLUMN] if INFLATION_COLUMN in raw_df.columns else np.nan
+    inflation_df = pd.DataFrame({'country': raw_df['Country'].str.strip().replace(country_names),
+                                 'year': raw_df['Year'].astype(int),
+                                 'inflation': inflation})
+
+    # A country and year listed twice keeps its first figure
+    inflation_df = inflation_df.drop_duplicates(['country', 'year'])
+    return inflation_df.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+
+def run_crisis_pipeline(raw_path: str = PATH_RAW_CRISIS,
+                        output_path: str = datastore.PATH_CRISIS,
+                        compiled_dir: str = datastore.COMPILED_DIR,
+                        stage_dir: str = STAGE_DIR,
+                        force: bool = False) -> dict:
+    """
+    Build the clean crisis data from the raw Global Crises Data by Country file: read it, derive the events, then 
+    write the clean CSV and its compiled column store, see run_pipeline.
+
+    Arguments:
+        raw_path (str): the path to the raw crisis CSV, defaults to data/global_crisis_data.csv.
+        output_path (str): the path of the clean CSV to write, defaults to data/clean_crisis_data.csv.
+        compiled_dir (str): the parent directory of the compiled stores, defaults to data/compiled.
+        stage_dir (str): the parent directory of the cached stage outputs, defaults to data/compiled/etl.
+        force (bool): whether to rerun every stage, defaults to False.
+
+    Output:
+        (dict): the report of each stage, see run_pipeline.
+    """
+    stages = [('read', read_raw_crisis, {}),
+              ('events', derive_crisis_events, {'country_names': CRISIS_COUNTRY_NAMES})]
+    return run_pipeline('crisis', stages, raw_path, output_path, compiled_dir, stage_dir, force)
+
+def run_inflation_pipeline(raw_path: str = PATH_RAW_CRISIS,
+                           output_path: str = datastore.PATH_INFLATION,
+                           compiled_dir: str = datastore.COMPILED_DIR,
+                           stage_dir: str = STAGE_DIR,
+                           force: bool = False) -> dict:
+    """
+    Build the clean inflation data from the raw Global Crises Data by Country file: read it, extract each country's
+    yearly inflation, then write the clean CSV and its compiled column store, see run_pipeline.
+
+    Arguments:
+        raw_path (str): the path to the raw crisis CSV, defaults to data/global_crisis_data.csv.
+        output_path (str): the path of the clean CSV to write, defaults to data/clean_inflation_data.csv.
+        compiled_dir (str): the parent directory of the compiled stores, defaults to data/compiled.
+        stage_dir (str): the parent directory of the cached stage outputs, defaults to data/compiled/etl.
+        force (bool): whether to rerun every stage, defaults to False.
+
+    Output:
+        (dict): the report of each stage, see run_pipeline.
+    """
+    stages = [('read', read_raw_crisis, {}),
+              ('inflation', extract_inflation, {'country_names': CRISIS_COUNTRY_NAMES})]
+    return run_pipeline('inflation', stages, raw_path, output_path, compiled_dir, stage_dir, force)
+
+def main() -> None:
+    """
+    Command line entry point: python -m src.etl exchange, python -m src.etl crisis, or python -m src.etl inflation
+
+    """
+    pipelines = {'exchange': (run_exchange_pipeline, PATH_RAW_EXCHANGE, datastore.PATH_CURRENCY),
+                 'crisis': (run_crisis_pipeline, PATH_RAW_CRISIS, datastore.PATH_CRISIS),
+                 'inflation': (run_inflation_pipeline, PATH_RAW_CRISIS, datastore.PATH_INFLATION)}
+
+    parser = argparse.ArgumentParser(description='Build the clean data files from the raw downloads.')
+    parser.add_argument('dataset', choices=list(pipelines), help='the dataset to build')
+    parser.add_argument('--raw', dest='raw_path', default=None,
+                        help='the raw CSV, defaults to data/exchange_data.csv or data/global_crisis_data.csv')
+    parser.add_argument('--output', dest='output_path', default=None,
+                        help='the clean CSV to write, defaults to data/clean_exchange_data.csv, '
+                             'data/clean_crisis_data.csv or data/clean_inflation_data.csv')
+    parser.add_argument('--force', action='store_true', help='rerun every stage even if its output is cached')
+    args = parser.parse_args()
+
+    run, raw_path, output_path = pipelines[args.dataset]
+    raw_path = args.raw_path or raw_path
+    if not os.path.exists(raw_path):
+        parser.error(f'the raw file {raw_path} was not found, download it there or pass its path with --raw')
+
+    start = time.perf_counter()
+    report = run(raw_path, args.output_path or output_path, force=args.force)
+
+    for name, stage in report.items():
+        print(f"{name:<8} {'ran' if stage['ran'] else 'skipped':<8} {stage['seconds'] * 1000:8.1f} ms")
+    print(f'Done in {time.perf_counter() - start:.2f} s')
+
+    return None
+
+if __name__ == '__main__':
+    main()
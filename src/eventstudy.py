@@ -0,0 +1,188 @@
+import threading
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.conversion import RateMatrix
+
+# Largest number of years before and after an event the response is measured over, and the windows the page offers
+MAX_WINDOW = 10
+WINDOW_OPTIONS = (1, 2, 3, 5, 10)
+DEFAULT_WINDOW = 5
+
+# Oldest exchange rate the as-of join will use for an event, in years before the event
+ASOF_TOLERANCE = 5
+
+# Years are packed into the low bits of the (country, year) join keys
+YEAR_BITS = 16
+
+class EventStudy(NamedTuple):
+    """
+    Every crisis event aligned with the same country's exchange rates, computed once per version of the data.
+
+    version: the data version the study was built from.
+    events: the table of the aligned events: country, year, event, and the currency_name and base_year of the rate
+            the event was joined to.
+    offsets: the years relative to the event, from -MAX_WINDOW to MAX_WINDOW.
+    changes: the event x offset matrix of % change in the currency's USD value from the base year to each year
+             around the event, NaN where the currency has no rate that year.
+    """
+    version: tuple
+    events: pd.DataFrame
+    offsets: np.ndarray
+    changes: np.ndarray
+
+# The most recently built study and its response curves, so neither is recomputed until the data changes
+_study_cache = {}
+_curve_cache = {}
+_study_lock = threading.Lock()
+
+def align_events(exchange_df: pd.DataFrame,
+                 crisis_df: pd.DataFrame,
+                 tolerance: int = ASOF_TOLERANCE) -> pd.DataFrame:
+    """
+    Join every crisis event to the exchange rate of its country as of the event's year: the latest exchange data row
+    of the same country in or before that year. This is an as-of join over the sorted (country, year) keys of both
+    tables, done for all events at once with a binary search.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data.
+        crisis_df (pd.DataFrame): the full DataFrame of crisis data.
+        tolerance (int): the most years the joined exchange rate can be older than the event, defaults to
+                         ASOF_TOLERANCE.
+
+    Output:
+        (pd.DataFrame): the country, year, event, currency_name and base_year columns, one row per event that could
+                        be joined, in the order of crisis_df.
+    """
+    # Number the countries of the exchange data, events of a country without exchange data get -1
+    country_codes, countries = pd.factorize(exchange_df['country'])
+    countries = pd.Index(np.asarray(countries, dtype=object))
+    event_codes = countries.get_indexer(np.asarray(crisis_df['country'], dtype=object))
+
+    # Pack (country, year) into one sortable integer key per row; the stable sort keeps the data's row order within
+    # a year, so the as-of row of a year with two currencies is the later one
+    exchange_years = exchange_df['year'].to_numpy(dtype=np.int64)
+    exchange_keys = (country_codes.astype(np.int64) << YEAR_BITS) | exchange_years
+    order = np.argsort(exchange_keys, kind='stable')
+    exchange_keys = exchange_keys[order]
+
+    event_years = crisis_df['year'].to_numpy(dtype=np.int64)
+    event_keys = (event_codes.astype(np.int64) << YEAR_BITS) | event_years
+
+    # The position of the last key at or before each event's key
+    positions = np.searchsorted(exchange_keys, event_keys, side='right') - 1
+    matched = positions >= 0
+    positions = np.where(matched, positions, 0)
+    matched &= (event_codes >= 0) & ((exchange_keys[positions] >> YEAR_BITS) == event_codes)
+    matched &= event_years - exchange_years[order][positions] <= tolerance
+
+    rows = order[positions[matched]]
+    return pd.DataFrame({'country': np.asarray(crisis_df['country'], dtype=object)[matched],
+                         'year': event_years[matched],
+                         'event': np.asarray(crisis_df['event'], dtype=object)[matched],
+                         'currency_name': np.asarray(exchange_df['currency_name'], dtype=object)[rows],
+                         'base_year': exchange_years[rows]})
+
+def build_event_study(exchange_df: pd.DataFrame,
+                      crisis_df: pd.DataFrame,
+                      matrix: RateMatrix,
+                      version: tuple = None) -> EventStudy:
+    """
+    Align every crisis event with its country's exchange rates and measure the change in the currency's value in
+    each year around it, for all events at once.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data.
+        crisis_df (pd.DataFrame): the full DataFrame of crisis data.
+        matrix (RateMatrix): the rate matrix from conversion.get_rate_matrix.
+        version (tuple): the data version to stamp the study with, defaults to None.
+
+    Output:
+        (EventStudy): the aligned events and their changes around each event.
+    """
+    events = align_events(exchange_df, crisis_df)
+    offsets = np.arange(-MAX_WINDOW, MAX_WINDOW + 1)
+
+    # The rate matrix column of each event's currency, and its rate in the base year
+    columns = matrix.currencies.get_indexer(pd.MultiIndex.from_arrays([events['country'], events['currency_name']]))
+    base_rows = events['base_year'].to_numpy() - matrix.years[0]
+    base_rates = matrix.rates[base_rows, columns]
+    base_rates = np.where(base_rates > 0, base_rates, np.nan)
+
+    # The currency's rate in every year around the event, NaN outside the years of the data
+    rows = events['year'].to_numpy()[:, np.newaxis] + offsets - matrix.years[0]
+    inside = (rows >= 0) & (rows < len(matrix.years))
+    rates = np.where(inside, matrix.rates[np.clip(rows, 0, len(matrix.years) - 1), columns[:, np.newaxis]], np.nan)
+    rates = np.where(rates > 0, rates, np.nan)
+
+    # The rate is units per USD, so the value of a unit moves with its inverse
+    changes = (base_rates[:, np.newaxis] / rates - 1) * 100
+    return EventStudy(version=version, events=events, offsets=offsets, changes=changes)
+
+def get_event_study(exchange_df: pd.DataFrame,
+                    crisis_df: pd.DataFrame,
+                    matrix: RateMatrix,
+                    version: tuple) -> EventStudy:
+    """
+    Get the event study for a version of the data, building it only if the data changed since the last call.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data.
+        crisis_df (pd.DataFrame): the full DataFrame of crisis data.
+        matrix (RateMatrix): the rate matrix from conversion.get_rate_matrix.
+        version (tuple): a stamp that changes whenever the exchange or crisis data does.
+
+    Output:
+        (EventStudy): the event study for that version of the data.
+    """
+    with _study_lock:
+        if _study_cache.get('version') != version:
+            _study_cache['study'] = build_event_study(exchange_df, crisis_df, matrix, version)
+            _study_cache['version'] = version
+            _curve_cache.clear()
+        return _study_cache['study']
+
+def get_response_curve(study: EventStudy,
+                       event_type: str,
+                       window: int = DEFAULT_WINDOW) -> pd.DataFrame:
+    """
+    Get the average response of the exchange rate to one type of event, across every country, cached per
+    (event type, window) for the study's data version.
+
+    The average is the geometric mean of the changes in value (the mean of the log changes), which unlike the
+    arithmetic mean isn't dominated by the few hyperinflations where a currency loses nearly all of its value.
+
+    Arguments:
+        study (EventStudy): the study from get_event_study.
+        event_type (str): the event type, ex. "Banking Crisis".
+        window (int): the number of years before and after the event, at most MAX_WINDOW, defaults to DEFAULT_WINDOW.
+
+    Output:
+        (pd.DataFrame): the average and median % change in value and the number of events with data, indexed by
+                        the year relative to the event, from -window to window.
+    """
+    if not 1 <= window <= MAX_WINDOW:
+        raise ValueError(f"The window must be between 1 and {MAX_WINDOW} years, got {window}")
+
+    key = (study.version, event_type, window)
+    with _study_lock:
+        curve = _curve_cache.get(key)
+    if curve is not None:
+        return curve
+
+    # The events of that type, and the columns of the years inside the window
+    rows = study.events['event'].to_numpy() == event_type
+    columns = slice(MAX_WINDOW - window, MAX_WINDOW + window + 1)
+    changes = pd.DataFrame(study.changes[rows, columns], columns=study.offsets[columns])
+
+    log_changes = np.log1p(changes / 100)
+    curve = pd.DataFrame({'average': np.expm1(log_changes.mean()) * 100,
+                          'median': changes.median(),
+                          'events': changes.count()})
+    curve.index.name = 'offset'
+
+    with _study_lock:
+        _curve_cache[key] = curve
+    return curve
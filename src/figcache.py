@@ -0,0 +1,117 @@
+import json
+import threading
+from collections import OrderedDict
+
+class FigureCache:
+    """
+    A size-bounded, least-recently-used cache of fully built Plotly figures. Figures are stored as their serialized
+    JSON string, which is immutable, and every get returns a freshly parsed figure dict, so a caller can modify the
+    figure it gets back without corrupting the cache entry.
+
+    Keys are tuples such as ("line", country, version), where version changes whenever the data behind the figure
+    does, so stale figures are never served and simply age out of the cache.
+    """
+    def __init__(self, 
+                 maxsize: int = 128, 
+                 serialize=None):
+        """
+        Arguments:
+            maxsize (int): the maximum number of figures to keep, defaults to 128.
+            serialize (callable): the function turning a built go.Figure into the JSON string to store, defaults to 
+                                  go.Figure.to_json.
+        """
+        self.maxsize = maxsize
+        self.serialize = serialize or (lambda fig: fig.to_json())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, build) -> dict:
+        """
+        Get the figure for a key, building and caching it if it isn't cached yet.
+
+        Arguments:
+            key (tuple): the cache key of the figure.
+            build (callable): the function with no arguments that builds the go.Figure on a cache miss.
+
+        Output:
+            (dict): a new copy of the figure dict, safe for the caller to modify.
+        """
+        with self._lock:
+            fig_json = self._entries.get(key)
+            if fig_json is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return json.loads(fig_json)
+            self.misses += 1
+
+        # Build outside the lock, figure construction is slow and other keys shouldn't wait on it
+        fig_json = self.serialize(build())
+        self.put(key, fig_json)
+
+        return json.loads(fig_json)
+
+    def put(self, key: tuple, fig_json: str) -> None:
+        """
+        Store an already serialized figure, ex. one read from disk, so the next get of its key finds it.
+
+        Arguments:
+            key (tuple): the cache key of the figure.
+            fig_json (str): the figure, serialized like the cache's own figures.
+        """
+        with self._lock:
+            self._entries[key] = fig_json
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used figures once over the size bound
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return None
+
+    def discard(self, keys) -> int:
+        """
+        Remove the figures of some keys, ex. the keys of data that has since changed, which no get will ask for again.
+
+        Arguments:
+            keys (iterable): the cache keys of the figures to remove, keys that aren't cached are skipped.
+
+        Output:
+            (int): the number of figures removed.
+        """
+        with self._lock:
+            removed = 0
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    removed += 1
+
+        return removed
+
+    def clear(self) -> None:
+        """
+        Remove every cached figure, the counters are kept.
+
+        """
+        with self._lock:
+            self._entries.clear()
+
+        return None
+
+    def stats(self) -> dict:
+        """
+        Get the counters used to size the cache.
+
+        Output:
+            (dict): the hits, misses, evictions, hit rate, current size and maximum size of the cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'evictions': self.evictions,
+                    'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'size': len(self._entries),
+                    'maxsize': self.maxsize}
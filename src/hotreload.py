@@ -0,0 +1,310 @@
+import os
+import threading
+import time
+import warnings
+from typing import NamedTuple
+
+import pandas as pd
+
+from src import analysis
+from src import conversion
+from src import datastore
+from src import layoutcache
+from src import plots
+from src import realrates
+from src import redenomination
+from src import timeseries
+
+# Set this environment variable to 1 before starting the production server to reload the data whenever the clean
+# data files change, without restarting the workers
+HOT_RELOAD_ENV_VAR = 'CURRENCY_CAPSULE_HOT_RELOAD'
+ENABLED = os.environ.get(HOT_RELOAD_ENV_VAR, '') == '1'
+
+# Seconds between checks of the data files for a change
+POLL_INTERVAL = 5.0
+
+class DataSnapshot(NamedTuple):
+    """
+    The loaded data and everything derived from it, built together and published as one reference, so a request
+    that reads it once sees a single consistent version of the data even if a reload happens during the request.
+
+    files: the (path, modification time, size) of each data file, as they were before the data was read.
+    exchange_df, crisis_df: the exchange and crisis data, partitioned by country and with compact text columns.
+    inflation_df: the yearly inflation of each country, or None if it hasn't been built.
+    exchange_partitions, crisis_partitions: the country slices of exchange_df and crisis_df.
+    currency_options: the select-currency dropdown options per country.
+    rate_index, filled_rate_index: the keyed exchange rate index, and the same with the gaps filled in.
+    exchange_versions, crisis_versions, inflation_versions: the version of each country's rows in each data file.
+    exchange_data_version, crisis_data_version: a single version of all of the exchange and of all of the crisis data.
+    layout_stamp: the stamp of the data and code the default layout is built from.
+    real_rates: the real exchange rates of every row, see realrates.build_real_rates.
+    redenomination_chains: the chains of each country's currencies, see redenomination.build_redenomination_chains.
+    currency_stats: the analytics of every currency, see timeseries.build_currency_stats.
+    """
+    files: tuple
+    exchange_df: pd.DataFrame
+    crisis_df: pd.DataFrame
+    inflation_df: pd.DataFrame
+    exchange_partitions: dict
+    crisis_partitions: dict
+    currency_options: dict
+    rate_index: pd.Series
+    filled_rate_index: pd.DataFrame
+    exchange_versions: dict
+    crisis_versions: dict
+    inflation_versions: dict
+    exchange_data_version: int
+    crisis_data_version: int
+    layout_stamp: str
+    real_rates: realrates.RealRates
+    redenomination_chains: redenomination.RedenominationChains
+    currency_stats: timeseries.CurrencyStats
+
+def get_file_stamps(paths: tuple) -> tuple:
+    """
+    Helper function that gets the modification time and size of each data file, None for a file that isn't there,
+    which tells whether any of them has changed since the last check.
+
+    """
+    stamps = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stamps.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            stamps.append((path, None, None))
+    return tuple(stamps)
+
+def build_snapshot(path_currency: str = datastore.PATH_CURRENCY,
+                   path_crisis: str = datastore.PATH_CRISIS,
+                   path_inflation: str = datastore.PATH_INFLATION,
+                   gap_fill_method: str = 'linear',
+                   compiled_dir: str = datastore.COMPILED_DIR) -> DataSnapshot:
+    """
+    Load the data files and build everything the requests need from them: the country partitions, the indexes, the
+    versions and the precomputed tables.
+
+    Arguments:
+        path_currency (str): the path to the clean exchange data, defaults to datastore.PATH_CURRENCY.
+        path_crisis (str): the path to the clean crisis data, defaults to datastore.PATH_CRISIS.
+        path_inflation (str): the path to the clean inflation data, which is optional, defaults to
+                              datastore.PATH_INFLATION.
+        gap_fill_method (str): how to estimate the rate of a year with no data, one of analysis.GAP_FILL_METHODS,
+                               defaults to 'linear'.
+        compiled_dir (str): the parent directory of the compiled column stores, defaults to data/compiled.
+
+    Output:
+        (DataSnapshot): the data and everything derived from it.
+    """
+    # Stamp the files before reading them, so a file written during the read is seen as changed by the next check
+    files = get_file_stamps((path_currency, path_crisis, path_inflation))
+
+    # Load the data from the compiled column stores if they are up to date, otherwise parse the CSVs. The stores load
+    # their text columns as categoricals, which keeps them compact and shared between workers, so store the text
+    # columns of parsed CSVs the same way, for everything below to be built from the same types either way.
+    exchange_df = analysis.compact_text_columns(datastore.load_frame(path_currency, compiled_dir))
+    crisis_df = analysis.compact_text_columns(datastore.load_frame(path_crisis, compiled_dir))
+
+    # The yearly inflation of each country is optional, it is only there once built from the raw crisis file
+    # (python -m src.etl inflation), and without it there are no real exchange rates
+    inflation_df = datastore.load_frame(path_inflation, compiled_dir) if os.path.exists(path_inflation) else None
+
+    # Partition both frames by country once, so per-country subsets are slices instead of scans
+    exchange_df, exchange_partitions = analysis.partition_by_country(exchange_df)
+    crisis_df, crisis_partitions = analysis.partition_by_country(crisis_df)
+
+    # Wrap the timeline hover notes once, instead of on every timeline figure
+    crisis_df = plots.add_wrapped_notes(crisis_df)
+    currency_options = analysis.build_currency_options(exchange_df)
+
+    # Build the keyed exchange rate index once, so rate lookups don't scan exchange_df, and fill in the missing years
+    # inside each currency's range, so estimated rates are lookups too
+    rate_index = analysis.build_rate_index(exchange_df)
+    filled_rate_index = analysis.build_filled_rate_index(rate_index, gap_fill_method)
+
+    # Version each country's data, so cached figures are rebuilt only when their country's rows change
+    exchange_versions = analysis.build_country_versions(exchange_df, exchange_partitions)
+    crisis_versions = analysis.build_country_versions(crisis_df, crisis_partitions)
+    inflation_versions = {}
+    if inflation_df is not None:
+        inflation_versions = analysis.build_country_versions(*analysis.partition_by_country(inflation_df))
+
+    # A single version stamp for all of the exchange data, used to rebuild the conversion rate matrix only on a change,
+    # and the same for all of the crisis data, the event study is rebuilt only when either of them changes
+    exchange_data_version = hash(tuple(exchange_versions.items()))
+    crisis_data_version = hash(tuple(crisis_versions.items()))
+
+    # The stamp of the data and code the default layout is built from, a saved layout with another stamp is rebuilt
+    layout_stamp = layoutcache.get_layout_stamp(exchange_versions, crisis_versions, inflation_versions)
+
+    # Compute the real exchange rates, the redenomination chains and the analytics of every currency once, so the
+    # real mode, the conversions between a country's currencies and the stats panel are lookups. The rate matrix is
+    # built here rather than through conversion.get_rate_matrix, whose cache still serves the published data.
+    real_rates = realrates.build_real_rates(exchange_df, inflation_df)
+    redenomination_chains = redenomination.build_redenomination_chains(exchange_df)
+    currency_stats = timeseries.build_currency_stats(conversion.build_rate_matrix(rate_index))
+
+    # Store the wrapped notes added above compactly too
+    crisis_df = analysis.compact_text_columns(crisis_df)
+
+    return DataSnapshot(files=files, exchange_df=exchange_df, crisis_df=crisis_df, inflation_df=inflation_df,
+                        exchange_partitions=exchange_partitions, crisis_partitions=crisis_partitions,
+                        currency_options=currency_options, rate_index=rate_index,
+                        filled_rate_index=filled_rate_index, exchange_versions=exchange_versions,
+                        crisis_versions=crisis_versions, inflation_versions=inflation_versions,
+                        exchange_data_version=exchange_data_version, crisis_data_version=crisis_data_version,
+                        layout_stamp=layout_stamp, real_rates=real_rates,
+                        redenomination_chains=redenomination_chains, currency_stats=currency_stats)
+
+def get_changed_countries(previous: DataSnapshot,
+                          snapshot: DataSnapshot) -> set:
+    """
+    Find the countries whose exchange, crisis or inflation rows differ between two snapshots, including countries
+    added or removed.
+
+    Arguments:
+        previous (DataSnapshot): the snapshot being replaced.
+        snapshot (DataSnapshot): the snapshot replacing it.
+
+    Output:
+        (set): the countries with any changed rows.
+    """
+    changed = set()
+    for old, new in ((previous.exchange_versions, snapshot.exchange_versions),
+                     (previous.crisis_versions, snapshot.crisis_versions),
+                     (previous.inflation_versions, snapshot.inflation_versions)):
+        changed.update(country for country in old.keys() | new.keys() if old.get(country) != new.get(country))
+    return changed
+
+class DataWatcher:
+    """
+    Polls the data files for a change and, when one of them changes, builds a new snapshot of the data on its own
+    thread and hands it to a publish function, which swaps it in. Requests keep being served from the published
+    snapshot while the new one is built, so a reload never blocks them.
+
+    The thread belongs to the process that started it, so with a server that forks its workers after the app is
+    created (ex. gunicorn --preload), start is called again in each worker (ex. on its first request), and each
+    worker then watches the files and reloads its own data.
+    """
+    def __init__(self,
+                 build,
+                 publish,
+                 files: tuple,
+                 interval: float = POLL_INTERVAL):
+        """
+        Arguments:
+            build (callable): the function with no arguments that builds a new DataSnapshot, see build_snapshot.
+            publish (callable): the function given each new DataSnapshot, which swaps it in and returns the number
+                                of countries whose data changed, 0 if nothing changed and it kept the current one.
+            files (tuple): the file stamps of the published snapshot (DataSnapshot.files), the paths in them are
+                           the files watched.
+            interval (float): the seconds between checks of the files, defaults to POLL_INTERVAL.
+        """
+        self.build = build
+        self.publish = publish
+        self.files = files
+        self.interval = interval
+        self.checks = 0
+        self.reloads = 0
+        self.swaps = 0
+        self.failures = 0
+        self.last_reload_seconds = 0.0
+        self.total_reload_seconds = 0.0
+        self.last_changed_countries = 0
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """
+        Start watching the files on a daemon thread, unless this process is already watching them. Cheap enough to
+        call on every request.
+
+        """
+        if self._pid == os.getpid():
+            return None
+
+        with self._lock:
+            if self._pid != os.getpid():
+                self._stop.clear()
+                threading.Thread(target=self._watch, name='data-watcher', daemon=True).start()
+                self._pid = os.getpid()
+
+        return None
+
+    def stop(self) -> None:
+        """
+        Stop watching the files, after the check in progress, if any.
+
+        """
+        self._stop.set()
+        self._pid = None
+
+        return None
+
+    def _watch(self) -> None:
+        """
+        Helper function that checks the files every interval until stopped.
+
+        """
+        while not self._stop.wait(self.interval):
+            self.check()
+
+        return None
+
+    def check(self) -> bool:
+        """
+        Check the files once, and if any of them changed since the last check, build a new snapshot and publish it.
+        A snapshot that fails to build (ex. a file written by hand and read half way) is counted as a failure, the
+        published one is kept, and the files are tried again once they change again.
+
+        Output:
+            (bool): whether a new snapshot was swapped in.
+        """
+        with self._lock:
+            self.checks += 1
+            files = get_file_stamps(tuple(path for path, _, _ in self.files))
+            if files == self.files:
+                return False
+            self.files = files
+
+        start = time.perf_counter()
+        try:
+            snapshot = self.build()
+            changed = self.publish(snapshot)
+        except Exception as e:
+            warnings.warn(f"Reloading the data failed, still serving the data loaded before: {e!r}")
+            with self._lock:
+                self.failures += 1
+            return False
+        seconds = time.perf_counter() - start
+
+        with self._lock:
+            # The snapshot may have stamped a file written while this check was starting, that change is its own
+            self.files = snapshot.files
+            self.reloads += 1
+            if changed:
+                self.swaps += 1
+            self.last_reload_seconds = seconds
+            self.total_reload_seconds += seconds
+            self.last_changed_countries = changed
+
+        return changed > 0
+
+    def stats(self) -> dict:
+        """
+        Get the counters of the checks, reloads and swaps.
+
+        Output:
+            (dict): the checks, reloads (snapshots built after a change of the files), swaps (snapshots published,
+                    a reload with no changed rows isn't swapped in), failures, the last and total reload seconds,
+                    and the number of countries changed by the last reload.
+        """
+        with self._lock:
+            return {'checks': self.checks,
+                    'reloads': self.reloads,
+                    'swaps': self.swaps,
+                    'failures': self.failures,
+                    'last_reload_seconds': self.last_reload_seconds,
+                    'total_reload_seconds': self.total_reload_seconds,
+                    'last_changed_countries': self.last_changed_countries}
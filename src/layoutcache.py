@@ -0,0 +1,113 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import time
+
+from src import datastore
+
+# The pre-serialized default layout: the figures and dropdown options the page shows before the user selects anything
+PATH_DEFAULT_LAYOUT = os.path.join(datastore.COMPILED_DIR, 'default_layout.json')
+
+# Bump this whenever the file's layout changes so that older files are treated as stale
+LAYOUT_CACHE_VERSION = 1
+
+# The source files the layout is built by, a change to any of them makes the saved layout stale
+SOURCE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def get_layout_stamp(exchange_versions: dict,
+                     crisis_versions: dict,
+                     inflation_versions: dict = None,
+                     source_dir: str = SOURCE_DIR) -> str:
+    """
+    Build the stamp of everything the default layout is built from: the version of every country's exchange, crisis
+    and inflation data (see analysis.build_country_versions) and the source code. Unlike the in-memory data
+    versions, which use Python's per-process string hashing, the stamp is the same in every process, so it can be
+    saved with the layout and compared on the next start.
+
+    Arguments:
+        exchange_versions (dict): the dictionary of country to its exchange data version.
+        crisis_versions (dict): the dictionary of country to its crisis data version.
+        inflation_versions (dict): the dictionary of country to its inflation data version, defaults to None for no
+                                   inflation data.
+        source_dir (str): the directory of the source files, defaults to src/.
+
+    Output:
+        (str): the hex SHA-256 digest of the versions and the source files.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([LAYOUT_CACHE_VERSION, sorted(exchange_versions.items()),
+                              sorted(crisis_versions.items()),
+                              sorted((inflation_versions or {}).items())]).encode('utf-8'))
+    for path in sorted(glob.glob(os.path.join(source_dir, '*.py'))):
+        digest.update(datastore.hash_file(path).encode('ascii'))
+    return digest.hexdigest()
+
+def save_default_layout(figures: dict,
+                        options: dict,
+                        stamp: str,
+                        path: str = PATH_DEFAULT_LAYOUT) -> None:
+    """
+    Write the default layout to disk, replacing any older file at once so a starting server never reads half of it.
+
+    Arguments:
+        figures (dict): the dictionary of figure name to its serialized figure JSON, as the figure cache stores it.
+        options (dict): the dictionary of dropdown name to its options.
+        stamp (str): the stamp of the data and code the layout was built from, from get_layout_stamp.
+        path (str): the file to write, defaults to PATH_DEFAULT_LAYOUT.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump({'stamp': stamp, 'figures': figures, 'options': options}, f)
+    os.replace(temp_path, path)
+
+    return None
+
+def load_default_layout(stamp: str,
+                        path: str = PATH_DEFAULT_LAYOUT) -> dict:
+    """
+    Read the default layout from disk, if it was built from the same data and code as the running app.
+
+    Arguments:
+        stamp (str): the stamp of the running app's data and code, from get_layout_stamp.
+        path (str): the file to read, defaults to PATH_DEFAULT_LAYOUT.
+
+    Output:
+        (dict | None): the "figures" and "options" dictionaries, or None if the file is missing or stale.
+    """
+    try:
+        with open(path) as f:
+            layout = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if layout.get('stamp') != stamp:
+        return None
+    return layout
+
+def main() -> None:
+    """
+    Command line entry point, saves the default layout of the current data and code: python -m src.layoutcache
+
+    """
+    parser = argparse.ArgumentParser(description='Build the default layout of the app, so it starts without '
+                                                 'building its figures.')
+    parser.add_argument('--output', default=PATH_DEFAULT_LAYOUT,
+                        help='the file to write, defaults to data/compiled/default_layout.json')
+    args = parser.parse_args()
+
+    # Imported here, since building the layout needs the whole app and its data
+    from src import basicpage
+
+    start = time.perf_counter()
+    figures, options = basicpage.build_default_layout()
+    save_default_layout(figures, options, basicpage.data.layout_stamp, args.output)
+    print(f'Wrote {len(figures)} figures and {len(options)} dropdowns to {args.output} '
+          f'({os.path.getsize(args.output)} bytes) in {time.perf_counter() - start:.2f} s')
+
+    return None
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,179 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+# Set this environment variable to 1 before starting the app to turn the instrumentation on
+METRICS_ENV_VAR = 'CURRENCY_CAPSULE_METRICS'
+ENABLED = os.environ.get(METRICS_ENV_VAR, '') == '1'
+
+# Upper bounds of the histogram buckets, in seconds for timings and bytes for response sizes
+SECONDS_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+BYTES_BUCKETS = (100, 300, 1_000, 3_000, 10_000, 30_000, 100_000, 300_000, 1_000_000)
+
+# Prefix of every exported metric name
+PREFIX = 'currency_capsule'
+
+class Histogram:
+    """
+    A Prometheus-style histogram: the count of observations at or under each bucket bound, with their total count
+    and sum, kept per label value (ex. per stage).
+    """
+    def __init__(self, name: str, help_text: str, label: str, buckets: tuple):
+        """
+        Arguments:
+            name (str): the metric name, without the prefix.
+            help_text (str): the description exported with the metric.
+            label (str): the name of the label the observations are split by.
+            buckets (tuple): the increasing upper bounds of the buckets.
+        """
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float) -> None:
+        """
+        Record one observation.
+
+        Arguments:
+            label_value (str): the value of the label, ex. the stage name.
+            value (float): the observed value.
+        """
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # One count per bucket plus the +Inf bucket, then the sum
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+        return None
+
+    def render(self) -> list:
+        """
+        Get the histogram in the Prometheus text format, with cumulative bucket counts.
+
+        Output:
+            (list): the lines of text.
+        """
+        name = f'{PREFIX}_{self.name}'
+        lines = [f'# HELP {name} {self.help_text}', f'# TYPE {name} histogram']
+        with self._lock:
+            series = {label_value: list(counts) for label_value, counts in self._series.items()}
+
+        for label_value, counts in sorted(series.items()):
+            labels = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{labels}}} {counts[-1]}')
+            lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+# The histograms every instrumented process records into
+stage_seconds = Histogram('stage_seconds', 'Time spent in each callback and the helper stages it calls.',
+                          'stage', SECONDS_BUCKETS)
+request_seconds = Histogram('request_seconds', 'Time to answer each callback request, including JSON serialization.',
+                            'output', SECONDS_BUCKETS)
+response_bytes = Histogram('response_bytes', 'Size of each callback response body.', 'output', BYTES_BUCKETS)
+
+def timed(stage: str):
+    """
+    Decorator that records the time of every call of a function in the stage_seconds histogram. When the metrics
+    are disabled it returns the function itself, so the instrumentation costs nothing.
+
+    Arguments:
+        stage (str): the name the timings are recorded under, ex. "plots.plotly_line".
+
+    Output:
+        (callable): the decorator.
+    """
+    def decorator(function):
+        if not ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stage_seconds.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def render(collectors: tuple = ()) -> str:
+    """
+    Get every metric in the Prometheus text exposition format.
+
+    Arguments:
+        collectors (tuple): functions with no arguments that return extra samples to export, read each time the 
+                            metrics are scraped, as a list of (name, type, help, value) tuples where type is 
+                            "counter" or "gauge", defaults to none.
+
+    Output:
+        (str): the text served by /metrics.
+    """
+    lines = []
+    for histogram in (stage_seconds, request_seconds, response_bytes):
+        lines += histogram.render()
+
+    for collect in collectors:
+        for name, metric_type, help_text, value in collect():
+            lines += [f'# HELP {PREFIX}_{name} {help_text}',
+                      f'# TYPE {PREFIX}_{name} {metric_type}',
+                      f'{PREFIX}_{name} {value}']
+    return '\n'.join(lines) + '\n'
+
+def get_callback_output() -> str:
+    """
+    Helper function that gets the output of the callback a /_dash-update-component request is for, which names the
+    callback in the metrics.
+
+    """
+    from flask import request
+
+    try:
+        return request.get_json(silent=True, cache=True).get('output', 'unknown')
+    except AttributeError:
+        return 'unknown'
+
+def instrument_server(server,
+                      collectors: tuple = ()) -> None:
+    """
+    Time every callback request and measure its response, and add the /metrics route, on the app's Flask server.
+    Does nothing when the metrics are disabled. Each server process keeps its own metrics, so with several workers 
+    each scrape reports the worker that answered it.
+
+    Arguments:
+        server (Flask): the Flask server of the Dash app.
+        collectors (tuple): functions returning extra samples to export, see render, defaults to none.
+    """
+    if not ENABLED:
+        return None
+
+    from flask import Response, g, request
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        if request.path.endswith('/_dash-update-component') and 'metrics_start' in g:
+            output = json.dumps(get_callback_output())[1:-1]
+            request_seconds.observe(output, time.perf_counter() - g.metrics_start)
+            response_bytes.observe(output, response.calculate_content_length() or 0)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return Response(render(collectors), mimetype='text/plain; version=0.0.4')
+
+    return None
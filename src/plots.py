@@ -1,8 +1,52 @@
-import plotly.express as px
+import functools
+import json
+import re
+
 import plotly.graph_objects as go
 import numpy as np
 import pandas as pd
 
+from src import metrics
+
+# Create a color map for each type of event to separate them by color
+EVENT_COLORS = {
+    'Inflation Crisis': '#b59e5f',              # gold
+    'Gain of Independence': '#836d65',          # muted tan
+    'Gold Standard Adoption': '#006b54',        # muted teal
+    'Gold Standard Suspension': '#f5f5f0',      # ivory white
+    'Banking Crisis': '#280409',                # maroon
+    'Systemic Crisis': '#2a4d69',               # muted blue
+    'Currency Crisis': '#7c482b '               # muted orange
+}
+
+# Create a position map on the y axis for each type of event to separate them spatially, 0.1 units apart
+EVENT_Y_POSITIONS = {
+    'Banking Crisis': 1.2,
+    'Systemic Crisis': 1.1,
+    'Currency Crisis': 1.0,
+    'Inflation Crisis': 0.9,
+    'Gold Standard Adoption': 0.8,
+    'Gold Standard Suspension': 0.7,
+    'Gain of Independence': 0.6
+}
+
+# Every event type in the crisis data, the ones without a color or position above still get their own trace
+EVENTS = list(EVENT_Y_POSITIONS) + ['Currency Change']
+
+# The crisis columns shown when hovering over a timeline point, in customdata order
+HOVER_COLUMNS = ["event", "event_notes", "domestic_notes", "external_notes"]
+
+# Suffix of the pre-wrapped copies of the note columns, added to the crisis data by add_wrapped_notes
+WRAPPED_SUFFIX = "_wrapped"
+
+# Most points the overlay chart sends across all of its traces, and the fewest it keeps per trace
+OVERLAY_POINT_BUDGET = 2000
+MIN_POINTS_PER_TRACE = 40
+
+# Points per bucket above which downsample_lttb scans each bucket with NumPy instead of in Python
+LTTB_NUMPY_BUCKET_SIZE = 64
+
+@metrics.timed('plots.plotly_line')
 def plotly_line(x: np.ndarray, 
                 y: np.ndarray) -> go.Figure:
     """
@@ -10,6 +54,9 @@ def plotly_line(x: np.ndarray,
     the exchange rate line graph, so the x-axis is typically years for a certain country and the y-axis is typically 
     exchange rates for that country.
 
+    The figure is cloned from a prebuilt line graph template and filled with the data, which gives the same figure as 
+    plotly_line_express without running the plotly.express pipeline on every call.
+
     Arguments:
         x (np.ndarray): array of x-axis data, typically an array of years for a certain country.
         y (np.ndarray): array of y-axis data, typically an array of exchange rates for that country.
@@ -17,6 +64,42 @@ def plotly_line(x: np.ndarray,
     Output:
         fig (plots.go.Figure): the properly-formatted Plotly line graph figure object with the relevant data. 
     """
+    trace, layout_json = get_line_template()
+    trace = dict(trace, x=np.asarray(x), y=np.asarray(y))
+
+    # The template has already been validated, so skip validating it again
+    return go.Figure(data=[trace], layout=json.loads(layout_json), _validate=False)
+
+@functools.cache
+def get_line_template() -> tuple:
+    """
+    Build the line graph template once, the first time it is needed, by running plotly_line_express on placeholder 
+    data and keeping everything but the data.
+
+    Output:
+        trace (dict): the line trace properties, without x and y.
+        layout_json (str): the serialized figure layout, parsed again for every figure so figures don't share it.
+    """
+    fig = plotly_line_express(np.array([0]), np.array([0.0])).to_dict()
+    trace = {key: value for key, value in fig['data'][0].items() if key not in ('x', 'y')}
+    return trace, json.dumps(fig['layout'])
+
+def plotly_line_express(x: np.ndarray, 
+                        y: np.ndarray) -> go.Figure:
+    """
+    Given two arrays of data, generate, format, and output a line graph figure with plotly.express. This is the 
+    reference implementation that the line graph template is built from.
+
+    Arguments:
+        x (np.ndarray): array of x-axis data, typically an array of years for a certain country.
+        y (np.ndarray): array of y-axis data, typically an array of exchange rates for that country.
+    
+    Output:
+        fig (plots.go.Figure): the properly-formatted Plotly line graph figure object with the relevant data. 
+    """
+    # Imported here, plotly.express is slow to import and only needed to build the template once
+    import plotly.express as px
+
     # Generate basic line graph
     fig = px.line(x=x, y=y)
     
@@ -61,14 +144,16 @@ def plotly_line(x: np.ndarray,
 
     return fig
 
-# https://plotly.com/python/hover-text-and-formatting/
-# https://community.plotly.com/t/hovertemplate-with-customdata-or-hover-data-of-variable-shape/67901
+@metrics.timed('plots.plotly_scatter')
 def plotly_scatter(country_crisis_df: pd.DataFrame) -> go.Figure:
     """
     Given two arrays of data, generate, format, and output a scatter graph figure. This function is used in creating 
     the historical event timeline, so the x-axis is typically years for a certain country and the y-axis is 
     typically crisis data for that country.
 
+    The figure is cloned from a prebuilt timeline template with one trace per event type, filled with the data, 
+    which gives the same figure as plotly_scatter_express without running the plotly.express pipeline on every call.
+
     Arguments:
         country_crisis_df (pd.DataFrame): the y-axis data, consisting of crisis data for a given country, divided 
                                           into crisis event categorizations.
@@ -77,37 +162,77 @@ def plotly_scatter(country_crisis_df: pd.DataFrame) -> go.Figure:
         fig (plots.go.Figure): the properly-formatted Plotly scatter graph figure object functioning as a timeline 
                                with the relevant data. 
     """
-    # Create a color map for each type of event to separate them by color
-    color_map = {
-        'Inflation Crisis': '#b59e5f',              # gold
-        'Gain of Independence': '#836d65',          # muted tan
-        'Gold Standard Adoption': '#006b54',        # muted teal
-        'Gold Standard Suspension': '#f5f5f0',      # ivory white
-        'Banking Crisis': '#280409',                # maroon
-        'Systemic Crisis': '#2a4d69',               # muted blue
-        'Currency Crisis': '#7c482b '               # muted orange
-    }
-    
-    # Create a position map on the y axis for each type of event to separate them spatially, 0.1 units apart
-    event_y_positions = {
-        'Banking Crisis': 1.2,
-        'Systemic Crisis': 1.1,
-        'Currency Crisis': 1.0,
-        'Inflation Crisis': 0.9,
-        'Gold Standard Adoption': 0.8,
-        'Gold Standard Suspension': 0.7,
-        'Gain of Independence': 0.6
-    }
+    event_traces, layout_json = get_scatter_template()
+    events = country_crisis_df['event'].to_numpy()
+
+    # An event type the template doesn't know about, fall back to building the figure with plotly.express
+    if not set(events).issubset(event_traces):
+        return plotly_scatter_express(country_crisis_df)
+
+    # Use the notes with even linebreaks so that hovering over each point fits onto the screen, these are wrapped 
+    # once when the data is loaded (add_wrapped_notes), and only wrapped here if they weren't
+    notes = [country_crisis_df[column + WRAPPED_SUFFIX] if column + WRAPPED_SUFFIX in country_crisis_df 
+             else wrap_text(country_crisis_df[column]) for column in HOVER_COLUMNS[1:]]
+    customdata = np.column_stack([country_crisis_df['event'].to_numpy(dtype=object)] + 
+                                 [column.to_numpy(dtype=object) for column in notes])
+    x = country_crisis_df['year'].to_numpy(dtype=np.float64)
+    y = country_crisis_df['event'].map(EVENT_Y_POSITIONS).to_numpy(dtype=np.float64)
+
+    # One trace per event type, in the order the event types first appear in the data (like plotly.express does)
+    traces = []
+    for event in pd.unique(events):
+        rows = events == event
+        traces.append(dict(event_traces[event], x=x[rows], y=y[rows], customdata=customdata[rows]))
+
+    # The template has already been validated, so skip validating it again
+    return go.Figure(data=traces, layout=json.loads(layout_json), _validate=False)
+
+@functools.cache
+def get_scatter_template() -> tuple:
+    """
+    Build the timeline template once, the first time it is needed, by running plotly_scatter_express on a placeholder 
+    row of every event type and keeping everything but the data.
+
+    Output:
+        event_traces (dict): the dictionary of event type to its trace properties, without x, y and customdata.
+        layout_json (str): the serialized figure layout, parsed again for every figure so figures don't share it.
+    """
+    placeholder_df = pd.DataFrame({'year': np.zeros(len(EVENTS)), 'event': EVENTS})
+    for column in HOVER_COLUMNS[1:]:
+        placeholder_df[column] = ""
+
+    fig = plotly_scatter_express(placeholder_df).to_dict()
+    event_traces = {trace['name']: {key: value for key, value in trace.items() if key not in ('x', 'y', 'customdata')} 
+                    for trace in fig['data']}
+    return event_traces, json.dumps(fig['layout'])
 
+# https://plotly.com/python/hover-text-and-formatting/
+# https://community.plotly.com/t/hovertemplate-with-customdata-or-hover-data-of-variable-shape/67901
+def plotly_scatter_express(country_crisis_df: pd.DataFrame) -> go.Figure:
+    """
+    Given two arrays of data, generate, format, and output a scatter graph figure with plotly.express. This is the 
+    reference implementation that the timeline template is built from.
+
+    Arguments:
+        country_crisis_df (pd.DataFrame): the y-axis data, consisting of crisis data for a given country, divided 
+                                          into crisis event categorizations.
+    
+    Output:
+        fig (plots.go.Figure): the properly-formatted Plotly scatter graph figure object functioning as a timeline 
+                               with the relevant data. 
+    """
     # Map the event positionings onto the y-axis numerical values to apply this change
     country_crisis_df = country_crisis_df.copy()
-    country_crisis_df['y_axis'] = country_crisis_df['event'].map(event_y_positions)
+    country_crisis_df['y_axis'] = country_crisis_df['event'].map(EVENT_Y_POSITIONS)
 
     # Use lambda functions to insert even linebreaks so that hovering over each point fits onto the screen
     country_crisis_df['event_notes'] = country_crisis_df['event_notes'].apply(lambda x: insert_linebreaks(x))
     country_crisis_df['domestic_notes'] = country_crisis_df['domestic_notes'].apply(lambda x: insert_linebreaks(x))
     country_crisis_df['external_notes'] = country_crisis_df['external_notes'].apply(lambda x: insert_linebreaks(x))
 
+    # Imported here, plotly.express is slow to import and only needed to build the template once
+    import plotly.express as px
+
     # Create basic figure, update axes titles and hover_data, apply color mapping for different events
     fig = px.scatter(country_crisis_df,
                      x = "year",
@@ -115,7 +240,7 @@ def plotly_scatter(country_crisis_df: pd.DataFrame) -> go.Figure:
                      color="event", 
                      hover_data=["event", "event_notes", "domestic_notes", "external_notes"],
                      custom_data = ["event", "event_notes", "domestic_notes", "external_notes"],
-                     color_discrete_map=color_map)
+                     color_discrete_map=EVENT_COLORS)
 
     # Update the size of traces
     fig.update_traces(marker=dict(size=12))
@@ -123,8 +248,8 @@ def plotly_scatter(country_crisis_df: pd.DataFrame) -> go.Figure:
     # Update figure aesthetics (event names on the y-axis)
     fig.update_layout(yaxis=dict(
                       title=None,
-                      tickvals=list(event_y_positions.values()),
-                      ticktext=list(event_y_positions.keys()),
+                      tickvals=list(EVENT_Y_POSITIONS.values()),
+                      ticktext=list(EVENT_Y_POSITIONS.keys()),
                       showgrid=False),
                       
                       # Update figure aesthetics (colors and muting the legend, takes up too much space)
@@ -150,6 +275,229 @@ def plotly_scatter(country_crisis_df: pd.DataFrame) -> go.Figure:
 
     return fig
 
+@metrics.timed('plots.plotly_event_study')
+def plotly_event_study(curve: pd.DataFrame, 
+                       event_type: str) -> go.Figure:
+    """
+    Given the response curve of one event type, generate, format, and output the event study figure: the average and 
+    median change in a currency's value against the USD in the years around the event, across every country.
+
+    Arguments:
+        curve (pd.DataFrame): the average, median and events columns indexed by the year relative to the event, from 
+                              eventstudy.get_response_curve.
+        event_type (str): the event type the curve is for, ex. "Banking Crisis".
+    
+    Output:
+        fig (plots.go.Figure): the properly-formatted Plotly line graph figure object with the curve. 
+    """
+    x = curve.index.to_numpy()
+    events = curve['events'].to_numpy()
+
+    # The average is the main line, in the event's color, and the median a dotted line
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=x, y=curve['average'].to_numpy(), customdata=events, name="Average",
+                             mode='lines+markers',
+                             line=dict(color=EVENT_COLORS.get(event_type, '#280409').strip(), width=4)))
+    fig.add_trace(go.Scatter(x=x, y=curve['median'].to_numpy(), customdata=events, name="Median", 
+                             mode='lines', line=dict(color='#b59e5f', width=2, dash='dot')))
+
+    # Update figure aesthetics (hovering over a point gives the year, change and number of events behind it)
+    fig.update_traces(
+        hovertemplate="<b>Years from event:</b> %{x}<br>" +
+                      "<b>Change in USD value:</b> %{y:.1f}%<br>" +
+                      "<b>Events with data:</b> %{customdata}<br>" +
+                      "<extra></extra>"
+    )
+
+    fig.update_layout(
+        # Title the axes
+        xaxis_title=f"Years from {event_type}",
+        yaxis_title="Change in USD Value Since Event Year (%)",
+
+        # Update figure aesthetics (plot, background, font color)
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(24, 34, 37, 0.7)',
+        font=dict(color='#b59e5f'),
+        legend=dict(orientation='h', y=1.1),
+        margin=dict(t=3, b=30, l=30, r=30),
+
+        # Update figure aesthetics (gridlines look and color)
+        xaxis=dict(color='#b59e5f', 
+                   gridcolor='#b59e5f', 
+                   gridwidth=1, 
+                   griddash='dot',
+                   dtick=1),
+        yaxis=dict(color='#b59e5f', 
+                   zeroline=True,
+                   zerolinecolor='#b59e5f',
+                   zerolinewidth=1, 
+                   gridcolor='#b59e5f', 
+                   gridwidth=1, 
+                   griddash='dot')
+    )
+
+    # Update figure aesthetics (generate a vertical line at the year of the event)
+    fig.add_vline(x=0, line_color='#b59e5f', annotation_text=event_type)
+
+    return fig
+
+def downsample_lttb(x: np.ndarray, 
+                    y: np.ndarray, 
+                    max_points: int) -> np.ndarray:
+    """
+    Pick the points of a line that best keep its shape with the largest-triangle-three-buckets algorithm: the first 
+    and last points are kept, the points in between are split into max_points - 2 equal buckets, and from each bucket 
+    the point forming the largest triangle with the point kept from the previous bucket and the average of the next 
+    bucket is kept.
+
+    Arguments:
+        x (np.ndarray): array of x-axis data, in increasing order.
+        y (np.ndarray): array of y-axis data, without missing values.
+        max_points (int): the most points to keep, at least 3.
+    
+    Output:
+        (np.ndarray): the sorted positions of the points to keep, all of them if there are max_points or fewer.
+    """
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # Bucket boundaries for the points between the first and the last, and the average point of every bucket
+    edges = 1 + np.arange(max_points - 1) * (n - 2) // (max_points - 2)
+    counts = np.diff(edges)
+    average_x = np.append(np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts, x[-1])
+    average_y = np.append(np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts, y[-1])
+
+    # Each bucket depends on the point kept from the one before it, so the buckets are walked in order
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+
+    # Buckets of a few points are faster to scan as Python floats, the overhead of a NumPy call per bucket dominates
+    if (n - 2) / (max_points - 2) <= LTTB_NUMPY_BUCKET_SIZE:
+        x, y, edges = x.tolist(), y.tolist(), edges.tolist()
+        average_x, average_y = average_x.tolist(), average_y.tolist()
+        for bucket in range(max_points - 2):
+            previous_x, previous_y = x[previous], y[previous]
+            next_x, next_y = average_x[bucket + 1], average_y[bucket + 1]
+            largest = -1.0
+            for point in range(edges[bucket], edges[bucket + 1]):
+                area = abs((previous_x - next_x) * (y[point] - previous_y) - 
+                           (previous_x - x[point]) * (next_y - previous_y))
+                if area > largest:
+                    largest, previous = area, point
+            selected[bucket + 1] = previous
+        return selected
+
+    for bucket in range(max_points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        areas = np.abs((x[previous] - average_x[bucket + 1]) * (y[start:stop] - y[previous]) - 
+                       (x[previous] - x[start:stop]) * (average_y[bucket + 1] - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+@metrics.timed('plots.plotly_overlay')
+def plotly_overlay(series: dict, 
+                   log_scale: bool = False, 
+                   x_range: tuple = None, 
+                   point_budget: int = OVERLAY_POINT_BUDGET) -> go.Figure:
+    """
+    Given the exchange rate series of several countries, generate, format, and output one line graph overlaying all 
+    of them, with WebGL (Scattergl) traces. To keep the figure's size and render time bounded however many series 
+    are shown, the points inside the visible years are shared out between the traces and each trace is downsampled 
+    to its share with downsample_lttb.
+
+    Arguments:
+        series (dict): the dictionary of trace name (ex. the country) to its (x, y) arrays of years and exchange rates.
+        log_scale (bool): whether to show the exchange rates on a log scale, where rates of 0 are left out, defaults 
+                          to False.
+        x_range (tuple): the (first, last) visible years, when zoomed in, the points outside it are left out except 
+                         the nearest one on each side, defaults to None for all years.
+        point_budget (int): the most points to send across all traces, at least MIN_POINTS_PER_TRACE per trace, 
+                            defaults to OVERLAY_POINT_BUDGET.
+    
+    Output:
+        fig (plots.go.Figure): the properly-formatted Plotly line graph figure object with the relevant data. 
+    """
+    trace_template, layout_json = get_overlay_template()
+    max_points = max(MIN_POINTS_PER_TRACE, point_budget // max(len(series), 1))
+
+    traces = []
+    for name, (x, y) in series.items():
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = ~np.isnan(y) & (y > 0) if log_scale else ~np.isnan(y)
+        x, y = x[keep], y[keep]
+
+        # Only the visible years, plus the nearest point on each side so the lines run to the edges
+        if x_range is not None:
+            start = max(np.searchsorted(x, x_range[0], side='left') - 1, 0)
+            stop = np.searchsorted(x, x_range[1], side='right') + 1
+            x, y = x[start:stop], y[start:stop]
+
+        # Downsample the line as it is drawn, which on a log scale is the shape of the log of the rates
+        points = downsample_lttb(x, np.log10(y) if log_scale else y, max_points)
+        traces.append(dict(trace_template, x=x[points], y=y[points], name=name))
+
+    # The template has already been validated, so skip validating it again
+    fig = go.Figure(data=traces, layout=json.loads(layout_json), _validate=False)
+    if log_scale:
+        fig.update_yaxes(type='log')
+    if x_range is not None:
+        fig.update_xaxes(range=list(x_range))
+    return fig
+
+@functools.cache
+def get_overlay_template() -> tuple:
+    """
+    Build the overlay chart template once, the first time it is needed, with the same look as the line graph.
+
+    Output:
+        trace (dict): the Scattergl trace properties, without x, y and name.
+        layout_json (str): the serialized figure layout, parsed again for every figure so figures don't share it.
+    """
+    fig = go.Figure(go.Scattergl(x=[0], y=[0.0], mode='lines'))
+    fig.update_traces(
+        line=dict(width=2),
+        hovertemplate="<b>%{fullData.name}</b><br>" +
+                      "<b>Year:</b> %{x}<br>" +
+                      "<b>Exchange Rate:</b> %{y}<br>" +
+                      "<extra></extra>"
+    )
+
+    fig.update_layout(
+        # Title the axes
+        xaxis_title="Year",
+        yaxis_title="Currency Exchange Rate (relative to USD)",
+
+        # Update figure aesthetics (plot, background, font color)
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(24, 34, 37, 0.7)',
+        font=dict(color='#b59e5f'),
+        margin=dict(t=3, b=30, l=30, r=30),
+
+        # Keep the user's zoom when the selected countries or the scale change
+        uirevision='overlay',
+
+        # Update figure aesthetics (gridlines look and color)
+        xaxis=dict(color='#b59e5f', 
+                   gridcolor='#b59e5f', 
+                   gridwidth=1, 
+                   griddash='dot'),
+        yaxis=dict(color='#b59e5f', 
+                   gridcolor='#b59e5f', 
+                   gridwidth=1, 
+                   griddash='dot')
+    )
+
+    fig = fig.to_dict()
+    trace = {key: value for key, value in fig['data'][0].items() if key not in ('x', 'y')}
+    return trace, json.dumps(fig['layout'])
+
 def insert_linebreaks(text: str, 
                       char_interval: int = 50) -> str:
     """
@@ -173,3 +521,39 @@ def insert_linebreaks(text: str,
     return '<br>'.join(text[i:i+char_interval] for i in range(0, len(text), char_interval))
 
    
+
+def wrap_text(text: pd.Series, 
+              char_interval: int = 50) -> pd.Series:
+    """
+    The vectorized version of insert_linebreaks, which inserts HTML linebreaks every char_interval number of 
+    characters into a whole column of text at once.
+
+    Arguments:
+        text (pd.Series): the column of text to format, missing values become blank strings.
+        char_interval (int): the interval for the number of characters after which to insert a line break, defaults 
+                             to 50.
+    
+    Output:
+        (pd.Series): the formatted column of text, the same as applying insert_linebreaks to every value.
+    """
+    # Every run of char_interval characters that is followed by more text gets a linebreak after it. The text is made
+    # plain before filling, since a categorical column (as loaded from a compiled store) can't take a new value.
+    return text.astype(object).fillna("").str.replace(f"(.{{{char_interval}}})(?=.)", r"\1<br>", 
+                                                      regex=True, flags=re.DOTALL)
+
+def add_wrapped_notes(crisis_df: pd.DataFrame, 
+                      char_interval: int = 50) -> pd.DataFrame:
+    """
+    Add the pre-wrapped copies of the note columns shown when hovering over the timeline points, so the timeline 
+    doesn't have to wrap them on every request. This function is used once when the data is loaded.
+
+    Arguments:
+        crisis_df (pd.DataFrame): the full DataFrame of crisis data.
+        char_interval (int): the interval for the number of characters after which to insert a line break, defaults 
+                             to 50.
+    
+    Output:
+        (pd.DataFrame): the crisis DataFrame with an extra "<column>_wrapped" column for every note column.
+    """
+    return crisis_df.assign(**{column + WRAPPED_SUFFIX: wrap_text(crisis_df[column], char_interval) 
+                               for column in HOVER_COLUMNS[1:]})
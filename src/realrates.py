@@ -0,0 +1,135 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# The base years the real exchange rates can be shown in the prices of, and the one shown first
+BASE_YEARS = (1900, 1950, 1980, 2000)
+DEFAULT_BASE_YEAR = 2000
+
+# The country whose currency the exchange rates are quoted against
+USD_COUNTRY = 'United States of America'
+
+class RealRates(NamedTuple):
+    """
+    The inflation-adjusted (real) exchange rates of every exchange data row, computed once when the data is loaded.
+    A real rate is the exchange rate (units per USD) in the prices of a base year: the nominal rate times the US
+    price level and divided by the country's price level, both relative to the base year. It stays flat when a
+    currency loses value only as fast as its prices rise faster than US prices.
+
+    base_years: the base years there is a column of real rates for.
+    rates: the dictionary of base year to the array of real rates, row for row with the exchange data, NaN where
+           either price index doesn't reach back (or forward) from the base year to the row's year.
+    countries: the countries with a price index, the others have no real rates.
+    """
+    base_years: tuple
+    rates: dict
+    countries: frozenset
+
+def build_price_index(inflation_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Chain each country's yearly inflation into a price index, as whole-column operations. A year with no inflation
+    figure (or a gap in the years) breaks the chain, since the price level on one side of it can't be compared to
+    the other: the years after it start a new chain, and only years on the same chain have comparable indexes.
+
+    Arguments:
+        inflation_df (pd.DataFrame): the country, year and inflation (annual % change in average consumer prices)
+                                     of every country and year, from python -m src.etl inflation.
+
+    Output:
+        (pd.DataFrame): the country, year, chain (a number shared by the years of one unbroken chain) and
+                        log_price (the log price level relative to the start of the chain) of every row.
+    """
+    df = inflation_df[['country', 'year', 'inflation']].dropna(subset=['country', 'year'])
+    df = df.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+    countries = df['country'].to_numpy()
+    years = df['year'].to_numpy(dtype=np.int64)
+
+    # The log growth of prices from the year before, unknown for a missing figure or a fall of 100% or more
+    inflation = df['inflation'].to_numpy(dtype=np.float64)
+    growth = np.log1p(np.where(inflation > -100, inflation, np.nan) / 100)
+
+    # A chain starts at each country's first year, after a gap in the years, and at each year with unknown growth
+    starts = np.ones(len(df), dtype=bool)
+    starts[1:] = (countries[1:] != countries[:-1]) | (years[1:] != years[:-1] + 1)
+    starts |= np.isnan(growth)
+    chain = np.cumsum(starts) - 1
+
+    # The growth into a chain's first year links it to the year before, which isn't on the chain
+    linked_growth = np.where(starts, 0.0, growth)
+    log_price = pd.Series(linked_growth).groupby(chain).cumsum().to_numpy()
+
+    return pd.DataFrame({'country': countries, 'year': years, 'chain': chain, 'log_price': log_price})
+
+def build_real_rates(exchange_df: pd.DataFrame,
+                     inflation_df: pd.DataFrame,
+                     base_years: tuple = BASE_YEARS,
+                     usd_country: str = USD_COUNTRY) -> RealRates:
+    """
+    Compute the real exchange rate of every exchange data row in the prices of every base year at once, by joining
+    the country's and the US price indexes to the rows, so switching a figure to real rates is a lookup.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data, after partition_by_country, since the real
+                                    rates are kept row for row with it.
+        inflation_df (pd.DataFrame): the yearly inflation of every country, see build_price_index, or None if there
+                                     is no inflation data, which gives no real rates.
+        base_years (tuple): the base years to compute the real rates in, defaults to BASE_YEARS.
+        usd_country (str): the country of the USD, defaults to USD_COUNTRY.
+
+    Output:
+        (RealRates): the real rates of every row, for every base year.
+    """
+    if inflation_df is None:
+        missing = np.full(len(exchange_df), np.nan)
+        return RealRates(base_years=tuple(base_years), rates={year: missing for year in base_years},
+                         countries=frozenset())
+
+    prices = build_price_index(inflation_df)
+    usd_prices = prices[prices['country'] == usd_country].drop(columns='country')
+
+    # Join the country's and the US price index of each row's year, in the rows' order
+    rows = exchange_df[['country', 'year']].astype({'country': object})
+    rows = rows.merge(prices, on=['country', 'year'], how='left')
+    rows = rows.merge(usd_prices, on='year', how='left', suffixes=('', '_usd'))
+    nominal = exchange_df['exchange_rate'].to_numpy(dtype=np.float64)
+
+    rates = {}
+    for base_year in base_years:
+        # The price indexes of the base year, each country's joined to its rows and the US one for every row
+        base = prices[prices['year'] == base_year].drop(columns='year')
+        base_rows = rows[['country']].merge(base, on='country', how='left')
+        usd_base = usd_prices[usd_prices['year'] == base_year]
+        usd_chain = usd_base['chain'].iloc[0] if len(usd_base) else np.nan
+        usd_log_price = usd_base['log_price'].iloc[0] if len(usd_base) else np.nan
+
+        # Prices are only comparable with the base year on the same unbroken chain
+        comparable = ((rows['chain'].to_numpy() == base_rows['chain'].to_numpy())
+                      & (rows['chain_usd'].to_numpy() == usd_chain))
+        log_adjustment = ((rows['log_price_usd'].to_numpy() - usd_log_price)
+                          - (rows['log_price'].to_numpy() - base_rows['log_price'].to_numpy()))
+        rates[base_year] = np.where(comparable, nominal * np.exp(log_adjustment), np.nan)
+
+    return RealRates(base_years=tuple(base_years), rates=rates, countries=frozenset(prices['country']))
+
+def get_country_real_data(real_rates: RealRates,
+                          exchange_df: pd.DataFrame,
+                          country: str,
+                          base_year: int,
+                          partitions: dict) -> list:
+    """
+    Given a country and a base year, look up the Series of years for that country and its real exchange rates, the
+    real rate counterpart of analysis.get_country_exchange_data.
+
+    Arguments:
+        real_rates (RealRates): the prebuilt real rates from build_real_rates.
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data the real rates were built from.
+        country (str): the selected country.
+        base_year (int): the base year of the prices, one of real_rates.base_years.
+        partitions (dict): the country slices of exchange_df from partition_by_country.
+
+    Output:
+        (list): the years for the country and its real exchange rates, NaN where they can't be computed.
+    """
+    rows = partitions.get(country, slice(0, 0))
+    return exchange_df['year'].iloc[rows], real_rates.rates[base_year][rows]
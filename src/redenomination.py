@@ -0,0 +1,244 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+# The legal conversion at each change of a country's currency in the exchange data: units of the old currency per
+# unit of the new one (ex. 100 Old Francs became 1 Franc in 1960). Renamings of the same currency are 1. Changes
+# missing here (ex. China's, across the years the exchange data skips) break the country's chain of currencies.
+REDENOMINATION_FACTORS = {
+    ('Argentina', 'Gold Pesos', 'Pesos Moneda Nacional'): 0.44,
+    ('Argentina', 'Pesos Moneda Nacional', 'Pesos'): 100,
+    ('Argentina', 'Pesos', 'Old Pesos Argentinos'): 10_000,
+    ('Argentina', 'Old Pesos Argentinos', 'Australes'): 1_000,
+    ('Argentina', 'Australes', '(New) Pesos Argentinos'): 10_000,
+    ('Argentina', '(New) Pesos Argentinos', 'New Pesos Argentinos'): 1,
+    ('Australia', 'Australian Pound', 'Australian Dollar'): 0.5,
+    ('Austria', 'Kronen', 'Old Shillings'): 10_000,
+    ('Austria', 'Old Shillings', 'Shillings'): 1.5,
+    ('Belgium', 'Francs', 'Belgas'): 5,
+    ('Belgium', 'Belgas', 'Francs'): 0.2,
+    ('Brazil', 'Mil-réis', 'Old Cruzeiros'): 1,
+    ('Brazil', 'Old Cruzeiros', '(New) Cruzeiros'): 1_000,
+    ('Brazil', '(New) Cruzeiros', 'Cruzados'): 1_000,
+    ('Brazil', 'Cruzados', 'New Cruzados'): 1_000,
+    ('Brazil', 'New Cruzados', '(Again New) Cruzados'): 1,
+    ('Brazil', '(Again New) Cruzados', 'Cruzeiros Reais'): 1_000,
+    ('Brazil', 'Cruzeiros Reais', 'Reais'): 2_750,
+    ('Chile', 'Old Peso', 'Escudos'): 1_000,
+    ('Chile', 'Escudos', 'Pesos'): 1_000,
+    ('Chile', 'Pesos', 'Peso'): 1,
+    ('Chile', 'Peso', 'Pesos'): 1,
+    ('Chile', 'Pesos', "Peso (New People's Currency)"): 1,
+    ('Finland', 'Old Markkaa', '(New) Markkaa'): 100,
+    ('France', 'Old Francs', 'Francs'): 100,
+    ('Germany', 'Mark', 'Reichsmark'): 1e12,
+    ('Germany', 'Reichsmark', 'Deutsche mark'): 10,
+    ('Greece', 'Old Drachmas', 'Drachmas'): 5e13,
+    ('Israel', 'Israeli Pounds', 'Old Sheqalim'): 10,
+    ('Israel', 'Old Sheqalim', 'New Shequalim'): 1_000,
+    ('Malaysia', 'Straits Settlements Dollar', 'Malayan Dollar'): 1,
+    ('Malaysia', 'Malayan Dollar', 'Malaysian Dollar'): 1,
+    ('Malaysia', 'Malaysian Dollar', 'Ringgit'): 1,
+    ('Mexico', 'Old Pesos', 'Pesos'): 1_000,
+    ('Mexico', 'Pesos', 'Peso'): 1,
+    ('New Zealand', 'New Zealand Pounds', 'New Zealand Dollar'): 0.5,
+    ('Peru', 'Soles', 'Intis'): 1_000,
+    ('Peru', 'Intis', 'New Soles'): 1_000_000,
+    ('South Africa', 'South African Pounds', 'Rand'): 0.5,
+}
+
+class RedenominationChains(NamedTuple):
+    """
+    The chains linking each country's successive currencies, computed once when the data is loaded. Each run of
+    years of one currency is a segment of its country's chain, and segments linked by known redenominations share a
+    chain number. Each segment has a unit value: what one unit of its currency is worth in units of the first
+    currency of its chain, so converting between the currencies of two years is a ratio of their unit values.
+
+    runs: the table of every segment, in country and year order: country, currency_name, start and end (its first
+          and last year), chain and unit_value.
+    chain: the chain number of each segment.
+    unit_value: the value of one unit of each segment's currency, in units of the first currency of its chain.
+    currency_runs: the dictionary of (country, currency_name) to the segments of that currency, a currency can come
+                   back (ex. Belgium's Francs, before and after the Belgas).
+    links: the table of every change of currency: country, year (the first year of the new currency),
+           from_currency, to_currency and factor (units of the old currency per unit of the new one, NaN if unknown).
+    in_use: the dictionary of (country, year) to the segment in use that year, over the years of each segment.
+    in_use_index: the same segments in use, indexed by a (country, year) MultiIndex, for looking up many at once.
+    """
+    runs: pd.DataFrame
+    chain: np.ndarray
+    unit_value: np.ndarray
+    currency_runs: dict
+    links: pd.DataFrame
+    in_use: dict
+    in_use_index: pd.Series
+
+def build_redenomination_chains(exchange_df: pd.DataFrame,
+                                factors: dict = REDENOMINATION_FACTORS) -> RedenominationChains:
+    """
+    Find every change of currency in the exchange data, a run of years of one currency followed by a run of
+    another in the same country, and chain each country's runs through the legal factor of each change. A change
+    without a known factor starts a new chain, since the amounts on either side of it can't be compared.
+
+    Arguments:
+        exchange_df (pd.DataFrame): the full DataFrame of exchange data.
+        factors (dict): the units of the old currency per unit of the new one, keyed by (country, old currency,
+                        new currency), defaults to REDENOMINATION_FACTORS.
+
+    Output:
+        (RedenominationChains): the segments, chains, unit values and links of every currency.
+    """
+    df = exchange_df[['country', 'currency_name', 'year']].astype({'country': object, 'currency_name': object})
+    df = df.sort_values(['country', 'year'], kind='stable', ignore_index=True)
+    countries = df['country'].to_numpy()
+    currencies = df['currency_name'].to_numpy()
+    years = df['year'].to_numpy(dtype=np.int64)
+
+    # A run of one currency starts at a country's first row and wherever the currency changes
+    new_country = np.ones(len(df), dtype=bool)
+    new_country[1:] = countries[1:] != countries[:-1]
+    starts = new_country.copy()
+    starts[1:] |= currencies[1:] != currencies[:-1]
+    runs = np.flatnonzero(starts)
+    stops = np.append(runs[1:], len(df))
+    run_country, run_currency = countries[runs], currencies[runs]
+    run_start, run_end = years[runs], years[stops - 1]
+
+    # Each run that isn't its country's first is a change from the run before it
+    first_run = new_country[runs]
+    changes = np.flatnonzero(~first_run)
+    links = pd.DataFrame({'country': run_country[changes],
+                          'year': run_start[changes],
+                          'from_currency': run_currency[changes - 1],
+                          'to_currency': run_currency[changes]})
+    links['factor'] = [factors.get(key, np.nan) for key in
+                       zip(links['country'], links['from_currency'], links['to_currency'])]
+
+    # A country's first run, and each run after an unknown change, starts a new chain. Within a chain, the unit
+    # value of a run is the product of the factors of the changes since the chain started.
+    factor = np.ones(len(runs))
+    factor[changes] = links['factor'].to_numpy()
+    chain = np.cumsum(first_run | np.isnan(factor)) - 1
+    unit_value = pd.Series(np.where(np.isnan(factor), 1.0, factor)).groupby(chain).cumprod().to_numpy()
+
+    run_table = pd.DataFrame({'country': run_country, 'currency_name': run_currency, 'start': run_start,
+                              'end': run_end, 'chain': chain, 'unit_value': unit_value})
+    currency_runs = {}
+    for run, key in enumerate(zip(run_country.tolist(), run_currency.tolist())):
+        currency_runs.setdefault(key, []).append(run)
+
+    # The run in use in every year of each run, including the years inside a run with no rate
+    lengths = run_end - run_start + 1
+    offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    in_use_years = np.repeat(run_start, lengths) + np.arange(lengths.sum()) - offsets
+    in_use_index = pd.Series(np.repeat(np.arange(len(runs)), lengths),
+                             index=pd.MultiIndex.from_arrays([np.repeat(run_country, lengths), in_use_years],
+                                                             names=['country', 'year']))
+    in_use = dict(zip(in_use_index.index.tolist(), in_use_index.tolist()))
+
+    return RedenominationChains(runs=run_table, chain=chain, unit_value=unit_value, currency_runs=currency_runs,
+                                links=links, in_use=in_use, in_use_index=in_use_index)
+
+def get_currency_year(chains: RedenominationChains,
+                      country: str,
+                      currency: str,
+                      year: int) -> int | None:
+    """
+    Find the year closest to a given year in which a country used a currency, so an amount of that currency can be
+    placed on its country's chain (ex. Belgium's Francs of 1950, rather than its Francs of 1920).
+
+    Arguments:
+        chains (RedenominationChains): the prebuilt chains from build_redenomination_chains.
+        country (str): the country.
+        currency (str): the currency.
+        year (int): the year.
+
+    Output:
+        (int | None): the year itself if the currency was in use then, else the nearest year it was, or None if the
+                      country never used it.
+    """
+    year = int(year)
+    runs = chains.currency_runs.get((country, currency))
+    if runs is None:
+        return None
+
+    # Clip the year into each run of the currency and keep the closest
+    starts, ends = chains.runs['start'].to_numpy()[runs], chains.runs['end'].to_numpy()[runs]
+    clipped = np.clip(year, starts, ends)
+    return int(clipped[np.argmin(np.abs(clipped - year))])
+
+def convert(chains: RedenominationChains,
+            amount: float,
+            country: str,
+            from_year: int,
+            to_year: int) -> float:
+    """
+    Convert an amount of the currency a country used in one year into the currency it used in another year, at the
+    legal factors of the redenominations between the two years, in constant time.
+
+    Arguments:
+        chains (RedenominationChains): the prebuilt chains from build_redenomination_chains.
+        amount (float): the amount to convert, in the currency in use in from_year.
+        country (str): the country.
+        from_year (int): the year of the currency to convert from.
+        to_year (int): the year of the currency to convert to.
+
+    Output:
+        (float): the amount in the currency in use in to_year. Raises a ValueError saying why if the country had no
+                 currency in either year, or if a change of currency between the two years has no known factor (ex.
+                 China's, across the years the exchange data skips).
+    """
+    source = chains.in_use.get((country, int(from_year)))
+    target = chains.in_use.get((country, int(to_year)))
+    if source is None or target is None:
+        missing = from_year if source is None else to_year
+        raise ValueError(f"No currency of {country} in {missing}")
+
+    # Both years on one chain, the factors between them are in the unit values
+    if chains.chain[source] == chains.chain[target]:
+        return amount * chains.unit_value[source] / chains.unit_value[target]
+
+    # Otherwise name the first change between them that starts a new chain, which is the one with no known factor
+    first, last = sorted((source, target))
+    run = first + 1 + int(np.flatnonzero(np.diff(chains.chain[first:last + 1]))[0])
+    currencies = chains.runs['currency_name']
+    raise ValueError(f"No known factor for the change from {currencies.iat[run - 1]} to {currencies.iat[run]} in "
+                     f"{chains.runs['start'].iat[run]}")
+
+def convert_many(chains: RedenominationChains,
+                 amounts,
+                 countries,
+                 from_years,
+                 to_years) -> np.ndarray:
+    """
+    Convert many amounts between the currencies their countries used in two years at once, see convert. Instead of
+    raising, a conversion that convert can't make (no currency in either year, or a change with no known factor
+    between them) gives NaN.
+
+    Arguments:
+        chains (RedenominationChains): the prebuilt chains from build_redenomination_chains.
+        amounts (array-like): the amounts to convert, each in the currency in use in its from_year.
+        countries (array-like): the country of each amount.
+        from_years (array-like): the year of the currency each amount is in.
+        to_years (array-like): the year of the currency to convert each amount to.
+
+    Output:
+        (np.ndarray): the converted amounts, NaN where the conversion can't be made.
+    """
+    # The segment in use in each year, -1 where the country had no currency that year (or the year isn't one)
+    countries = np.asarray(countries, dtype=object)
+    segments = []
+    for years in (from_years, to_years):
+        years = np.asarray(years, dtype=np.float64)
+        years = np.where(np.isfinite(years) & (years == np.floor(years)), years, -1).astype(np.int64)
+        positions = chains.in_use_index.index.get_indexer(pd.MultiIndex.from_arrays([countries, years]))
+        segments.append(np.where(positions >= 0, chains.in_use_index.to_numpy()[positions], -1))
+    source, target = segments
+    found = (source >= 0) & (target >= 0)
+    source, target = np.where(found, source, 0), np.where(found, target, 0)
+
+    # Both years on one chain, the factors between them are in the unit values
+    linked = found & (chains.chain[source] == chains.chain[target])
+    converted = np.asarray(amounts, dtype=np.float64) * chains.unit_value[source] / chains.unit_value[target]
+    return np.where(linked, converted, np.nan)
@@ -0,0 +1,162 @@
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from src.conversion import RateMatrix
+
+# Number of years of yearly changes the rolling volatility is measured over, and the fewest it needs
+VOLATILITY_WINDOW = 10
+VOLATILITY_MIN_YEARS = 5
+
+class CurrencyStats(NamedTuple):
+    """
+    The analytics of every (country, currency) series, computed once when the data is loaded. Changes are in the
+    currency's value against the USD (the inverse of the exchange rate), so a negative change is a devaluation.
+
+    years, currencies: the rows and columns of the yearly matrices, the same as the rate matrix's.
+    yoy_change: the year x currency matrix of % change in value from the year before, NaN if either year has no rate.
+    volatility: the year x currency matrix of the rolling standard deviation of the yearly log changes, in %.
+    summary: the table of one row per (country, currency_name): first_year, last_year, max_drawdown (the largest
+             % fall in value from a previous high), drawdown_peak_year, drawdown_trough_year, worst_change (the largest
+             single-year % fall), worst_year, latest_change and latest_volatility (as of last_year).
+    summary_columns: the columns of the summary as arrays, so one series' row is read without DataFrame indexing.
+    """
+    years: np.ndarray
+    currencies: pd.MultiIndex
+    yoy_change: np.ndarray
+    volatility: np.ndarray
+    summary: pd.DataFrame
+    summary_columns: dict
+
+def build_currency_stats(matrix: RateMatrix,
+                         window: int = VOLATILITY_WINDOW) -> CurrencyStats:
+    """
+    Compute the analytics of every (country, currency) series at once, as whole-matrix operations over the rate
+    matrix, so serving them is a lookup. Rates of 0 are treated as missing.
+
+    Arguments:
+        matrix (RateMatrix): the rate matrix from conversion.get_rate_matrix.
+        window (int): the number of years the rolling volatility is measured over, defaults to VOLATILITY_WINDOW.
+
+    Output:
+        (CurrencyStats): the yearly matrices and the summary table.
+    """
+    rates = np.where(matrix.rates > 0, matrix.rates, np.nan)
+    rows = np.arange(len(matrix.years))[:, np.newaxis]
+    observed = ~np.isnan(rates)
+
+    # Yearly change in value: the rate is units per USD, so the value of a unit moves with its inverse
+    ratio = np.full_like(rates, np.nan)
+    ratio[1:] = rates[:-1] / rates[1:]
+    yoy_change = (ratio - 1) * 100
+    volatility = (pd.DataFrame(np.log(ratio))
+                  .rolling(window, min_periods=min(VOLATILITY_MIN_YEARS, window))
+                  .std()
+                  .to_numpy() * 100)
+
+    # Drawdown: the fall in value from the highest value so far, which is when the rate was at its lowest so far
+    lowest_rate = np.fmin.accumulate(rates, axis=0)
+    drawdown = (1 - lowest_rate / rates) * 100
+    peak_row = np.maximum.accumulate(np.where(rates == lowest_rate, rows, -1), axis=0)
+
+    # Each series' first and last observed rows, and the rows of its largest drawdown and single-year fall
+    has_data = observed.any(axis=0)
+    has_change = ~np.isnan(yoy_change).all(axis=0)
+    columns = np.arange(len(matrix.currencies))
+    first_row = observed.argmax(axis=0)
+    last_row = len(matrix.years) - 1 - observed[::-1].argmax(axis=0)
+    trough_row = np.nanargmax(np.where(observed, drawdown, -np.inf), axis=0)
+    worst_row = np.nanargmin(np.where(np.isnan(yoy_change), np.inf, yoy_change), axis=0)
+
+    # Years are stored as nullable 16-bit integers and values as 32-bit floats, missing where a series has no data
+    def year_at(row, valid):
+        return pd.arrays.IntegerArray(matrix.years[row].astype(np.int16), mask=~valid)
+
+    def value_at(values, row, valid):
+        return np.where(valid, values[row, columns], np.nan).astype(np.float32)
+
+    summary = pd.DataFrame({
+        'first_year': year_at(first_row, has_data),
+        'last_year': year_at(last_row, has_data),
+        'max_drawdown': value_at(drawdown, trough_row, has_data),
+        'drawdown_peak_year': year_at(peak_row[trough_row, columns], has_data),
+        'drawdown_trough_year': year_at(trough_row, has_data),
+        'worst_change': value_at(yoy_change, worst_row, has_change),
+        'worst_year': year_at(worst_row, has_change),
+        'latest_change': value_at(yoy_change, last_row, has_data),
+        'latest_volatility': value_at(volatility, last_row, has_data),
+    }, index=matrix.currencies)
+
+    return CurrencyStats(years=matrix.years,
+                         currencies=matrix.currencies,
+                         yoy_change=yoy_change.astype(np.float32),
+                         volatility=volatility.astype(np.float32),
+                         summary=summary,
+                         summary_columns={column: summary[column].array for column in summary.columns})
+
+def get_currency_summary(stats: CurrencyStats,
+                         country: str,
+                         currency: str) -> dict:
+    """
+    Look up the summary of one (country, currency) series.
+
+    Arguments:
+        stats (CurrencyStats): the prebuilt analytics from build_currency_stats.
+        country (str): the country.
+        currency (str): the currency of that country.
+
+    Output:
+        (dict): the summary columns of the series, with None for missing values, or an empty dict if there is no
+                such series.
+    """
+    try:
+        position = stats.summary.index.get_loc((country, currency))
+    except KeyError:
+        return {}
+
+    # Read each column on its own, so the years stay integers
+    summary = {}
+    for column, values in stats.summary_columns.items():
+        value = values[position]
+        summary[column] = None if pd.isna(value) else value.item()
+    return summary
+
+def rank_devaluations(matrix: RateMatrix,
+                      start_year: int,
+                      end_year: int) -> pd.DataFrame:
+    """
+    Rank every (country, currency) series by how much value it lost against the USD over a period, from its first
+    to its last observed year inside the period. Series observed in fewer than two years of the period are left out.
+
+    Arguments:
+        matrix (RateMatrix): the rate matrix from conversion.get_rate_matrix.
+        start_year (int): the first year of the period.
+        end_year (int): the last year of the period.
+
+    Output:
+        (pd.DataFrame): the country, currency_name, from_year, to_year and change (% change in value) columns, one
+                        row per series, from the largest devaluation to the largest gain.
+    """
+    # Only the rows of the period, clipped to the years in the data
+    start_row = max(int(start_year) - matrix.years[0], 0)
+    stop_row = min(int(end_year) - matrix.years[0] + 1, len(matrix.years))
+    rates = matrix.rates[start_row:stop_row]
+    observed = ~np.isnan(rates) & (np.nan_to_num(rates) > 0)
+
+    # Each series' first and last observed rows in the period, none if the period has no years in the data
+    if len(rates) == 0:
+        observed = np.zeros((1, len(matrix.currencies)), dtype=bool)
+    first_row = observed.argmax(axis=0)
+    last_row = len(observed) - 1 - observed[::-1].argmax(axis=0)
+    columns = np.flatnonzero(observed.any(axis=0) & (last_row > first_row))
+    first_row, last_row = first_row[columns], last_row[columns]
+
+    ranking = pd.DataFrame({
+        'country': matrix.currencies.get_level_values('country')[columns],
+        'currency_name': matrix.currencies.get_level_values('currency_name')[columns],
+        'from_year': matrix.years[start_row + first_row],
+        'to_year': matrix.years[start_row + last_row],
+        'change': (rates[first_row, columns] / rates[last_row, columns] - 1) * 100,
+    })
+    return ranking.sort_values('change', kind='stable', ignore_index=True)
@@ -0,0 +1,246 @@
+import base64
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Responses smaller than this many bytes are sent uncompressed, compressing them saves less than it costs
+COMPRESS_MIN_BYTES = 1024
+
+# Compression levels: gzip from 1 (fastest) to 9 (smallest), brotli from 0 to 11
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Only text-like responses are compressed, images and fonts already are
+COMPRESSIBLE_MIMETYPES = ('application/json', 'application/javascript', 'text/javascript', 'text/css', 'text/html',
+                          'text/plain', 'image/svg+xml')
+
+# Compressed copies of the static responses (scripts, styles), which are the same for every request
+STATIC_CACHE_SIZE = 64
+
+# The typed array dtypes plotly.js decodes, from the smallest, that numeric arrays can be stored as without loss
+INTEGER_DTYPES = ('i1', 'u1', 'i2', 'u2', 'i4', 'u4')
+
+def encode_typed_array(values: np.ndarray) -> dict:
+    """
+    Encode a numeric array in Plotly's typed array form, base64 bytes of the smallest dtype that holds every value
+    exactly: an integer dtype for whole numbers, 32-bit floats if the values round trip through them, otherwise
+    64-bit floats.
+
+    Arguments:
+        values (np.ndarray): the numeric array, of any shape.
+
+    Output:
+        (dict): the {"dtype", "bdata"} typed array, with "shape" too for arrays of more than one dimension.
+    """
+    values = np.asarray(values)
+    dtype = 'f8'
+    if values.size and np.isfinite(values).all() and (values == np.round(values)).all():
+        for candidate in INTEGER_DTYPES:
+            limits = np.iinfo(candidate)
+            if values.min() >= limits.min and values.max() <= limits.max:
+                dtype = candidate
+                break
+    elif np.array_equal(values.astype('f4').astype('f8'), values.astype('f8'), equal_nan=True):
+        dtype = 'f4'
+
+    encoded = {'dtype': dtype, 'bdata': base64.b64encode(values.astype(dtype).tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        encoded['shape'] = ','.join(str(length) for length in values.shape)
+    return encoded
+
+def decode_typed_array(encoded: dict) -> np.ndarray:
+    """
+    Decode one of Plotly's typed arrays back into a NumPy array.
+
+    Arguments:
+        encoded (dict): the {"dtype", "bdata"} typed array, with an optional "shape".
+
+    Output:
+        (np.ndarray): the array.
+    """
+    values = np.frombuffer(base64.b64decode(encoded['bdata']), dtype=encoded['dtype'])
+    if 'shape' in encoded:
+        values = values.reshape([int(length) for length in str(encoded['shape']).split(',')])
+    return values
+
+def compact_array(values: np.ndarray):
+    """
+    Get the shortest lossless JSON form of a numeric array: the smallest typed array (see encode_typed_array), or a
+    plain list of numbers when that is shorter, which it is for short arrays and for numbers with few digits (ex.
+    1.25 is 4 characters as text, but a 64-bit float is 10.7 characters of base64).
+
+    Arguments:
+        values (np.ndarray): the numeric array, of any shape.
+
+    Output:
+        (dict | list): the typed array, or the list of numbers.
+    """
+    values = np.asarray(values)
+    encoded = encode_typed_array(values)
+
+    # Only one-dimensional arrays of finite numbers can be sent as a list, JSON has no NaN
+    if values.ndim != 1 or not np.isfinite(values).all():
+        return encoded
+    numbers = values.astype(np.int64 if encoded['dtype'] in INTEGER_DTYPES else np.float64).tolist()
+    if len(json.dumps(numbers, separators=(',', ':'))) < len(json.dumps(encoded, separators=(',', ':'))):
+        return numbers
+    return encoded
+
+def is_typed_array(value) -> bool:
+    """
+    Helper function that tells if a figure property is one of Plotly's typed arrays.
+
+    """
+    return isinstance(value, dict) and 'bdata' in value and 'dtype' in value
+
+def compact_trace_arrays(value):
+    """
+    Re-encode every numeric array inside a trace (x, y, customdata, marker sizes, ...) in its shortest lossless form
+    (see compact_array), both the typed arrays Plotly already made from 64-bit NumPy arrays and plain lists of
+    numbers. Lists with any text or missing values are left as they are.
+
+    Arguments:
+        value: a trace dict, or any property inside one.
+
+    Output:
+        the same structure, with its numeric arrays compacted.
+    """
+    if is_typed_array(value):
+        return compact_array(decode_typed_array(value))
+    if isinstance(value, dict):
+        return {key: compact_trace_arrays(item) for key, item in value.items()}
+    if isinstance(value, list):
+        if value and all(isinstance(item, (int, float)) and not isinstance(item, bool) for item in value):
+            return compact_array(np.array(value, dtype=np.float64))
+        return [compact_trace_arrays(item) for item in value]
+    return value
+
+def compact_figure(fig: dict) -> dict:
+    """
+    Compact the numeric trace arrays of a figure dict for sending to the browser, see compact_trace_arrays. The
+    layout is left as it is, its few short arrays (ex. tick values) are smaller as JSON.
+
+    Arguments:
+        fig (dict): the figure dict, ex. from go.Figure.to_plotly_json or json.loads(fig.to_json()).
+
+    Output:
+        (dict): a new figure dict with the same data and layout.
+    """
+    return dict(fig, data=[compact_trace_arrays(trace) for trace in fig.get('data', [])])
+
+def decode_figure(fig: dict) -> dict:
+    """
+    Turn every typed array in a figure dict back into a plain list of numbers, which is how figures were sent before
+    typed arrays. Used to measure the typed array savings.
+
+    Arguments:
+        fig (dict): the figure dict.
+
+    Output:
+        (dict): a new figure dict with lists in place of the typed arrays.
+    """
+    def decode(value):
+        if is_typed_array(value):
+            return decode_typed_array(value).tolist()
+        if isinstance(value, dict):
+            return {key: decode(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [decode(item) for item in value]
+        return value
+    return decode(fig)
+
+def get_brotli():
+    """
+    Helper function that gets the brotli module if it is installed, responses are only gzipped without it.
+
+    """
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+def choose_encoding(accept_encoding: str, brotli=None):
+    """
+    Helper function that picks the compression to use from a request's Accept-Encoding header: brotli if the
+    client accepts it and it is installed, otherwise gzip if the client accepts it.
+
+    Output:
+        (str | None): "br", "gzip" or None for no compression.
+    """
+    accepted = {part.split(';')[0].strip().lower() for part in (accept_encoding or '').split(',')}
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+def compress(data: bytes, encoding: str, brotli=None) -> bytes:
+    """
+    Compress a response body.
+
+    Arguments:
+        data (bytes): the response body.
+        encoding (str): "br" or "gzip".
+        brotli (module): the brotli module, needed for "br".
+
+    Output:
+        (bytes): the compressed body.
+    """
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+def compress_responses(server,
+                       min_bytes: int = COMPRESS_MIN_BYTES) -> None:
+    """
+    Compress the responses of the app's Flask server (the callback responses, the page, its scripts and styles) with
+    brotli or gzip, whichever the browser accepts, when they are at least min_bytes. Brotli needs the brotli package
+    (pip install brotli), without it responses are gzipped. The compressed copies of the static responses are kept,
+    so each script is only compressed once.
+
+    Arguments:
+        server (Flask): the Flask server of the Dash app.
+        min_bytes (int): the smallest response to compress, defaults to COMPRESS_MIN_BYTES.
+    """
+    from flask import request
+
+    brotli = get_brotli()
+    static_cache = OrderedDict()
+    static_lock = threading.Lock()
+
+    @server.after_request
+    def compress_response(response):
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), brotli)
+        if (encoding is None or response.status_code != 200 or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        # Files (ex. the assets) are sent straight from disk, read them into memory so they can be compressed
+        response.direct_passthrough = False
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+
+        # Static responses carry an ETag that identifies their content, reuse their compressed copy
+        etag = response.get_etag()[0]
+        key = (request.path, etag, encoding) if etag else None
+        with static_lock:
+            compressed = static_cache.get(key) if key else None
+        if compressed is None:
+            compressed = compress(data, encoding, brotli)
+            if key:
+                with static_lock:
+                    static_cache[key] = compressed
+                    while len(static_cache) > STATIC_CACHE_SIZE:
+                        static_cache.popitem(last=False)
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    return None
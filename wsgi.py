@@ -0,0 +1,13 @@
+from src import background
+from src import basicpage
+from src import hotreload
+
+# The WSGI entry point for production servers, run with: gunicorn --preload --workers 4 wsgi:server
+# With --preload, the app and all of its data are built once here, before the workers are forked from this process
+# Responses are compressed here, unless a proxy in front of the server already compresses them
+# The ranking and event study run in the background with CURRENCY_CAPSULE_BACKGROUND=1, only with a single worker
+# process since the jobs are kept in the process that started them: gunicorn --preload --workers 1 --threads 8 wsgi:server
+# With CURRENCY_CAPSULE_HOT_RELOAD=1, each worker reloads the data when the clean data files change, no restart needed
+app = basicpage.create_app(compress=True, background_mode=background.ENABLED, hot_reload=hotreload.ENABLED)
+basicpage.preload()
+server = app.server